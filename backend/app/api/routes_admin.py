@@ -5,6 +5,9 @@ from ..deps import get_db, get_current_user
 from ..models.user import User
 from ..models.listing import Listing
 from ..schemas import AdminUserUpdate, AdminUserRead, AdminListingRead
+from ..serialization import ADMIN_LISTING_ROWS, ADMIN_USER_ROWS
+from ..services.pagination import PageParams, paginate_rows
+from ..user_cache import invalidate_user
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -19,6 +22,7 @@ def ensure_admin(user: User):
 
 @router.get("/users", response_model=list[AdminUserRead])
 def list_users(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -27,8 +31,9 @@ def list_users(
     """
     ensure_admin(current_user)
 
-    users = db.query(User).order_by(User.created_at.desc()).all()
-    return users
+    return paginate_rows(
+        db.query(*ADMIN_USER_ROWS.columns), User.created_at, User.id, page, ADMIN_USER_ROWS
+    )
 
 
 @router.patch("/users/{user_id}", response_model=AdminUserRead)
@@ -58,11 +63,15 @@ def update_user(
     db.add(user)
     db.commit()
     db.refresh(user)
+
+    # роль/активность читаются из кэша в get_current_user — сбрасываем запись
+    invalidate_user(user.id)
     return user
 
 
 @router.get("/listings", response_model=list[AdminListingRead])
 def admin_list_listings(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     city: str | None = Query(default=None),
@@ -75,7 +84,7 @@ def admin_list_listings(
     """
     ensure_admin(current_user)
 
-    query = db.query(Listing)
+    query = db.query(*ADMIN_LISTING_ROWS.columns)
 
     if city:
         query = query.filter(Listing.city == city)
@@ -84,5 +93,6 @@ def admin_list_listings(
     if is_active is not None:
         query = query.filter(Listing.is_active == is_active)
 
-    listings = query.order_by(Listing.created_at.desc()).all()
-    return listings
+    return paginate_rows(
+        query, Listing.created_at, Listing.id, page, ADMIN_LISTING_ROWS
+    )
@@ -0,0 +1,98 @@
+"""
+Async-версии горячих роутов (settings.async_db_enabled).
+
+Подключаются в main.py раньше sync-роутеров с теми же путями и поэтому
+перехватывают запросы. Контракт (пути, тела, ответы) тот же; логика не
+дублируется — sync-обработчик выполняется через AsyncSession.run_sync, а
+ввод-вывод идёт через asyncpg и не занимает поток threadpool на время
+ожидания БД.
+
+Асинхронно здесь только ожидание БД. Всё остальное, что делает
+обработчик между запросами (разбор строк ORM, ранжирование ленты,
+выпуск JWT), выполняется прямо в event loop и на это время задерживает
+остальные запросы воркера. Сколько именно — гистограмма
+async_handler_loop_seconds в /metrics (по роутам); если она растёт,
+тяжёлые роуты стоит оставить на sync-стеке.
+"""
+import time
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..deps import get_async_db, get_current_user_async
+from ..metrics import current_stats
+from ..models.user import User
+from ..schemas import FeedActionCreate, ListingRead, TelegramAuth, Token
+from ..services.pagination import PageParams
+from . import routes_auth, routes_feed, routes_listings
+
+router = APIRouter()
+
+
+async def run_handler(db: AsyncSession, handler, **kwargs):
+    """
+    Вызывает sync-обработчик роута с sync-фасадом AsyncSession вместо Session.
+    Время в event loop (run_sync минус SQL) пишется в метрики запроса.
+    """
+    stats = current_stats()
+    db_time = stats.db_time if stats is not None else 0.0
+    started = time.perf_counter()
+    try:
+        return await db.run_sync(lambda session: handler(db=session, **kwargs))
+    finally:
+        if stats is not None:
+            on_loop = time.perf_counter() - started - (stats.db_time - db_time)
+            stats.loop_time = (stats.loop_time or 0.0) + max(on_loop, 0.0)
+
+
+@router.get("/feed/next", response_model=Optional[ListingRead], include_in_schema=False)
+async def get_next_listing(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return await run_handler(
+        db, routes_feed.get_next_listing, current_user=current_user
+    )
+
+
+@router.post("/feed/action", include_in_schema=False)
+async def save_feed_action(
+    action_in: FeedActionCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    return await run_handler(
+        db,
+        routes_feed.save_feed_action,
+        action_in=action_in,
+        background_tasks=background_tasks,
+        current_user=current_user,
+    )
+
+
+@router.post("/auth/telegram/login-or-register", response_model=Token, include_in_schema=False)
+async def telegram_login_or_register(
+    payload: TelegramAuth,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_handler(
+        db, routes_auth.telegram_login_or_register, payload=payload
+    )
+
+
+@router.get("/listings/", response_model=list[ListingRead], include_in_schema=False)
+async def list_listings(
+    request: Request,
+    city: Optional[str] = Query(default=None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_handler(
+        db,
+        routes_listings.list_listings,
+        request=request,
+        city=city,
+        page=page,
+    )
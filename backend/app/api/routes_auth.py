@@ -1,8 +1,11 @@
+import time
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from ..deps import get_db, get_current_user
+from ..config import settings
+from ..deps import get_db, get_current_user, oauth2_scheme
 from ..models.user import User
 from ..schemas import (
     UserRegister,
@@ -11,7 +14,13 @@ from ..schemas import (
     TelegramAuth,
     UserRead,
 )
-from ..security import get_password_hash, verify_password, create_access_token
+from ..security import (
+    get_password_hash,
+    verify_password,
+    create_access_token,
+    decode_access_token,
+)
+from ..user_cache import invalidate_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -85,6 +94,28 @@ def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 
+@router.post("/refresh", response_model=Token)
+def refresh_token(
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Выдать новый токен по ещё действующему (бот продлевает токены заранее,
+    чтобы не гонять полный login-or-register). Время входа переносится в
+    новый токен: через session_max_age_minutes после входа — только логин.
+    """
+    auth_time = (decode_access_token(token) or {}).get("auth_time")
+    if auth_time is None or time.time() >= auth_time + settings.session_max_age_minutes * 60:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session expired, log in again",
+        )
+    access_token = create_access_token(
+        {"sub": str(current_user.id), "auth_time": auth_time}
+    )
+    return Token(access_token=access_token)
+
+
 @router.post("/telegram/login-or-register", response_model=Token)
 def telegram_login_or_register(
     payload: TelegramAuth,
@@ -112,6 +143,7 @@ def telegram_login_or_register(
             db.add(user)
             db.commit()
             db.refresh(user)
+            invalidate_user(user.id)
 
     # 3. Если всё равно нет — создаём
     if user is None:
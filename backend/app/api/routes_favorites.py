@@ -6,12 +6,16 @@ from ..models.favorite import Favorite
 from ..models.listing import Listing
 from ..models.user import User
 from ..schemas import FavoriteCreate, FavoriteRead, ListingRead
+from ..serialization import LISTING_ROWS
+from ..services.feed_writer import insert_favorites
+from ..services.pagination import PageParams, paginate_rows
 
 router = APIRouter(prefix="/favorites", tags=["favorites"])
 
 
 @router.get("/", response_model=list[ListingRead])
 def list_favorites(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -19,13 +23,12 @@ def list_favorites(
     Список объявлений, добавленных в избранное текущим пользователем.
     """
     query = (
-        db.query(Listing)
+        db.query(*LISTING_ROWS.columns)
         .join(Favorite, Favorite.listing_id == Listing.id)
         .filter(Favorite.user_id == current_user.id)
         .filter(Listing.is_active.is_(True))
-        .order_by(Favorite.created_at.desc())
     )
-    return query.all()
+    return paginate_rows(query, Favorite.created_at, Favorite.id, page, LISTING_ROWS)
 
 
 @router.post("/", response_model=FavoriteRead)
@@ -36,27 +39,19 @@ def add_favorite(
 ):
     """
     Добавить объявление в избранное текущего пользователя.
+    Если оно уже там — возвращается существующая запись.
     """
-    existing = (
+    # ON CONFLICT: параллельные запросы не упираются в uq_favorites_user_listing
+    insert_favorites(db, [{"user_id": current_user.id, "listing_id": fav_in.listing_id}])
+    db.commit()
+    return (
         db.query(Favorite)
         .filter(
             Favorite.user_id == current_user.id,
             Favorite.listing_id == fav_in.listing_id,
         )
-        .first()
-    )
-
-    if existing:
-        return existing
-
-    fav = Favorite(
-        user_id=current_user.id,
-        listing_id=fav_in.listing_id,
+        .one()
     )
-    db.add(fav)
-    db.commit()
-    db.refresh(fav)
-    return fav
 
 
 @router.delete("/{listing_id}")
@@ -1,20 +1,24 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, BackgroundTasks, Depends, Query
 from sqlalchemy.orm import Session
 
+from ..config import settings
 from ..deps import get_db, get_current_user
-from ..models.listing import Listing
-from ..models.preferences import TenantPreference
-from ..models.feed_action import FeedAction
-from ..models.favorite import Favorite
-from ..models.lead import Lead
 from ..models.user import User
-from ..schemas import ListingRead, FeedActionCreate
+from ..schemas import ListingRead, FeedActionCreate, FeedActionBatch, FeedBatch
+from ..serialization import LISTING_ROWS, dumps, json_response
+from ..services.feed import record_feed_action
+from ..services.feed_queue import feed_queue, next_listing, next_listings, refill_queue
+from ..services.feed_writer import feed_action_buffer, write_feed_actions
+from ..services.pagination import decode_ids_cursor, encode_ids_cursor
 
 router = APIRouter(prefix="/feed", tags=["feed"])
 
+# сколько последних выданных id помнит курсор /feed/batch: колода клиента,
+# которую он ещё не досвайпал, обычно не длиннее пары пачек
+FEED_CURSOR_MAX_IDS = 500
+
 
 @router.get("/next", response_model=Optional[ListingRead])
 def get_next_listing(
@@ -23,63 +27,42 @@ def get_next_listing(
 ):
     """
     Вернуть следующее подходящее объявление для текущего пользователя.
+    Берётся из предрасчитанной очереди кандидатов (см. services.feed_queue).
     """
-    user_id = current_user.id
+    listing = next_listing(db, current_user.id)
+    return None if listing is None else json_response(LISTING_ROWS.dump_one(listing))
 
-    # 1. Предпочтения пользователя
-    pref: TenantPreference | None = (
-        db.query(TenantPreference)
-        .filter(TenantPreference.user_id == user_id)
-        .first()
-    )
 
-    # 2. Объявления, которые уже были в ленте (лайк/дизлайк/фаворит)
-    seen_subq = (
-        db.query(FeedAction.listing_id)
-        .filter(FeedAction.user_id == user_id)
-        .subquery()
-    )
+@router.get("/batch", response_model=FeedBatch)
+def get_listing_batch(
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Следующие `limit` объявлений ленты одной пачкой + курсор на продолжение.
+    Порядок тот же, что у /feed/next (очередь services.feed_queue); курсор
+    исключает уже выданные в колоду, но ещё не свайпнутые объявления.
+    """
+    handed_out = decode_ids_cursor(cursor) if cursor else []
+    items = next_listings(db, current_user.id, limit, skip=handed_out)
 
-    # 3. Базовый запрос по активным объявлениям
-    query = db.query(Listing).filter(Listing.is_active.is_(True))
-
-    # 4. Фильтры по предпочтениям
-    if pref:
-        if pref.city:
-            query = query.filter(Listing.city == pref.city)
-        if pref.deal_type:
-            query = query.filter(Listing.deal_type == pref.deal_type)
-        if pref.property_type:
-            query = query.filter(Listing.property_type == pref.property_type)
-        if pref.price_min is not None:
-            query = query.filter(Listing.price >= pref.price_min)
-        if pref.price_max is not None:
-            query = query.filter(Listing.price <= pref.price_max)
-
-    # 5. Исключаем уже просмотренные
-    query = query.filter(~Listing.id.in_(select(seen_subq.c.listing_id)))
-
-    # 6. Сортируем по свежести
-    query = query.order_by(Listing.created_at.desc())
-
-    listing = query.first()
-
-    # fallback: если ничего не нашли по предпочтениям
-    if listing is None:
-        fallback_query = (
-            db.query(Listing)
-            .filter(Listing.is_active.is_(True))
-            .filter(~Listing.id.in_(select(seen_subq.c.listing_id)))
-            .order_by(Listing.created_at.desc())
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_ids_cursor(
+            handed_out + [row.id for row in items], FEED_CURSOR_MAX_IDS
         )
-        listing = fallback_query.first()
 
-    return listing
+    return json_response(
+        dumps({"items": LISTING_ROWS.to_dicts(items), "next_cursor": next_cursor})
+    )
 
 
 @router.post("/action")
 def save_feed_action(
     action_in: FeedActionCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -88,59 +71,65 @@ def save_feed_action(
     Параллельно:
     - favorite -> добавляем в избранное
     - like -> создаём лид (если его ещё нет)
+    С FEED_WRITE_BUFFER_ENABLED запись уходит в буфер и делается в фоне пачкой.
     """
     user_id = current_user.id
+    if settings.feed_write_buffer_enabled:
+        feed_action_buffer.add(user_id, action_in)
+    else:
+        record_feed_action(db, user_id, action_in)
+        db.commit()
 
-    action = FeedAction(
-        user_id=user_id,
-        listing_id=action_in.listing_id,
-        action=action_in.action,
-        source=action_in.source,
-    )
-    db.add(action)
-
-    # favorite -> избранное
-    if action_in.action == "favorite":
-        existing_fav = (
-            db.query(Favorite)
-            .filter(
-                Favorite.user_id == user_id,
-                Favorite.listing_id == action_in.listing_id,
-            )
-            .first()
-        )
-        if existing_fav is None:
-            fav = Favorite(
-                user_id=user_id,
-                listing_id=action_in.listing_id,
-            )
-            db.add(fav)
-
-    # like -> лид
-    if action_in.action == "like":
-        existing_lead = (
-            db.query(Lead)
-            .filter(
-                Lead.tenant_id == user_id,
-                Lead.listing_id == action_in.listing_id,
-            )
-            .first()
-        )
-        if existing_lead is None:
-            listing = (
-                db.query(Listing)
-                .filter(Listing.id == action_in.listing_id)
-                .first()
-            )
-            owner_id = listing.owner_id if listing else None
-
-            lead = Lead(
-                tenant_id=user_id,
-                listing_id=action_in.listing_id,
-                owner_id=owner_id,
-                status="new",
-            )
-            db.add(lead)
+    if feed_queue.mark_seen(user_id, action_in.listing_id):
+        background_tasks.add_task(refill_queue, user_id)
 
-    db.commit()
     return {"status": "ok"}
+
+
+@router.post("/actions/batch")
+def save_feed_actions_batch(
+    batch: FeedActionBatch,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Сохранить пачку действий (офлайн-клиент, очередь бота) одной транзакцией.
+    Побочные эффекты те же, что у /feed/action.
+    """
+    user_id = current_user.id
+    write_feed_actions(db, [(user_id, action_in) for action_in in batch.actions])
+    db.commit()
+
+    refill = False
+    for action_in in batch.actions:
+        refill = feed_queue.mark_seen(user_id, action_in.listing_id) or refill
+    if refill:
+        background_tasks.add_task(refill_queue, user_id)
+
+    return {"status": "ok", "count": len(batch.actions)}
+
+
+@router.post("/action/next", response_model=Optional[ListingRead])
+def save_feed_action_and_get_next(
+    action_in: FeedActionCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Свайп за один запрос: сохранить действие (как /feed/action)
+    и сразу вернуть следующее объявление (как /feed/next) в одной транзакции.
+    """
+    user_id = current_user.id
+    record_feed_action(db, user_id, action_in)
+    db.flush()
+
+    # из очереди — только после commit: если он упадёт, карточка останется
+    listing = next_listing(db, user_id, skip={action_in.listing_id})
+    db.commit()
+
+    if feed_queue.mark_seen(user_id, action_in.listing_id):
+        background_tasks.add_task(refill_queue, user_id)
+
+    return None if listing is None else json_response(LISTING_ROWS.dump_one(listing))
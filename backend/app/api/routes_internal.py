@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..deps import get_db, require_internal_token
+from ..schemas import ListingAlertAck, ListingAlertRead
+from ..services.notifications import ack_alerts, claim_alerts
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    dependencies=[Depends(require_internal_token)],
+    include_in_schema=False,
+)
+
+
+@router.post("/alerts/claim", response_model=list[ListingAlertRead])
+def claim_listing_alerts(
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Пачка оповещений о новых объявлениях для отправки ботом.
+    Выданные строки арендуются: без ack они вернутся через LISTING_ALERTS_LEASE_SECONDS.
+    """
+    # сериализуем до commit: после него объявления перечитывались бы по одному
+    alerts = [ListingAlertRead.model_validate(alert) for alert in claim_alerts(db, limit)]
+    db.commit()
+    return alerts
+
+
+@router.post("/alerts/ack")
+def ack_listing_alerts(
+    payload: ListingAlertAck,
+    db: Session = Depends(get_db),
+):
+    """
+    Итог отправки: sent — доставлены, failed — повторить позже.
+    """
+    ack_alerts(db, payload.sent, payload.failed)
+    db.commit()
+    return {"status": "ok"}
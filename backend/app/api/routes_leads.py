@@ -5,6 +5,9 @@ from ..deps import get_db, get_current_user
 from ..models.lead import Lead
 from ..models.user import User
 from ..schemas import LeadCreate, LeadRead
+from ..serialization import LEAD_ROWS
+from ..services.feed_writer import insert_leads
+from ..services.pagination import PageParams, paginate_rows
 
 router = APIRouter(prefix="/leads", tags=["leads"])
 
@@ -18,40 +21,45 @@ def create_lead(
     """
     Создать лид от лица текущего пользователя (арендатора).
     Обычно это делает /feed/action, но можно и вручную.
+    Если лид по этому объявлению уже есть — возвращается он.
     """
     tenant_id = current_user.id
 
-    lead = Lead(
-        tenant_id=tenant_id,
-        listing_id=lead_in.listing_id,
-        owner_id=lead_in.owner_id,
-        status=lead_in.status or "new",
+    insert_leads(
+        db,
+        [
+            {
+                "tenant_id": tenant_id,
+                "listing_id": lead_in.listing_id,
+                "owner_id": lead_in.owner_id,
+                "status": lead_in.status or "new",
+            }
+        ],
     )
-    db.add(lead)
     db.commit()
-    db.refresh(lead)
-    return lead
+    return (
+        db.query(Lead)
+        .filter(Lead.tenant_id == tenant_id, Lead.listing_id == lead_in.listing_id)
+        .one()
+    )
 
 
 @router.get("/my", response_model=list[LeadRead])
 def list_my_leads(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Лиды текущего пользователя как арендатора.
     """
-    leads = (
-        db.query(Lead)
-        .filter(Lead.tenant_id == current_user.id)
-        .order_by(Lead.created_at.desc())
-        .all()
-    )
-    return leads
+    query = db.query(*LEAD_ROWS.columns).filter(Lead.tenant_id == current_user.id)
+    return paginate_rows(query, Lead.created_at, Lead.id, page, LEAD_ROWS)
 
 
 @router.get("/for-me", response_model=list[LeadRead])
 def list_leads_for_owner(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -64,10 +72,5 @@ def list_leads_for_owner(
             detail="Only owners/agents/admin can view leads for them",
         )
 
-    leads = (
-        db.query(Lead)
-        .filter(Lead.owner_id == current_user.id)
-        .order_by(Lead.created_at.desc())
-        .all()
-    )
-    return leads
+    query = db.query(*LEAD_ROWS.columns).filter(Lead.owner_id == current_user.id)
+    return paginate_rows(query, Lead.created_at, Lead.id, page, LEAD_ROWS)
@@ -1,16 +1,57 @@
-from typing import Optional
+import codecs
+from typing import AsyncIterator, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..deps import get_db, get_current_user
+from ..listing_cache import (
+    cached_response,
+    invalidate_all,
+    invalidate_listing,
+    item_key,
+    list_key,
+)
 from ..models.listing import Listing
 from ..models.user import User
-from ..schemas import ListingCreate, ListingRead
+from ..schemas import ListingCreate, ListingRead, ListingImportResult
+from ..serialization import LISTING_ROWS
+from ..services.feed_queue import feed_queue, filter_values
+from ..services.listing_index import listing_index
+from ..services.listing_import import (
+    DEFAULT_CHUNK_SIZE,
+    FORMATS,
+    ListingImporter,
+    detect_format,
+)
+from ..services.matching import enqueue_listing_matches
+from ..services.pagination import NEXT_CURSOR_HEADER, PageParams, page_rows, paginate_rows
 
 router = APIRouter(prefix="/listings", tags=["listings"])
 
 
+def commit_listing(db: Session, listing: Listing) -> None:
+    """
+    commit (с задачей оповещения подписчиков, если объявление активно).
+    Занятый у владельца external_id -> 409.
+    """
+    try:
+        if listing.is_active:
+            # оповещение подписчиков — задачей в той же транзакции
+            db.flush()
+            enqueue_listing_matches(db, [listing.id])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Listing with this external_id already exists",
+        )
+    db.refresh(listing)
+
+
 @router.post("/", response_model=ListingRead)
 def create_listing(
     listing_in: ListingCreate,
@@ -28,73 +69,130 @@ def create_listing(
         price=listing_in.price,
         is_active=listing_in.is_active,
         owner_id=current_user.id,
+        external_id=listing_in.external_id,
     )
     db.add(listing)
-    db.commit()
-    db.refresh(listing)
+    commit_listing(db, listing)
+
+    listing_index.apply(listing)
+    invalidate_listing(listing.id, [listing.city])
     return listing
 
-@router.get("/", response_model=list[ListingRead])
-def list_listings(
-    city: Optional[str] = Query(default=None),
-    db: Session = Depends(get_db),
-):
+
+async def iter_line_batches(request: Request, batch_size: int) -> AsyncIterator[list[str]]:
     """
-    Список активных объявлений (публичный).
+    Тело запроса потоком -> пачки строк (с переводами строк, для csv.reader).
     """
-    query = db.query(Listing).filter(Listing.is_active.is_(True))
-    if city:
-        query = query.filter(Listing.city == city)
-    listings = query.order_by(Listing.created_at.desc()).all()
-    return listings
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    batch: list[str] = []
+    async for chunk in request.stream():
+        text = tail + decoder.decode(chunk)
+        lines = text.splitlines(keepends=True)
+        tail = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        batch.extend(lines)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        batch.append(tail)
+    if batch:
+        yield batch
 
-@router.get("/my", response_model=list[ListingRead])
-def list_my_listings(
+
+@router.post("/import", response_model=ListingImportResult)
+async def import_listings(
+    request: Request,
+    format: Optional[str] = Query(default=None, description="csv | ndjson; по умолчанию — из Content-Type"),
+    chunk_size: int = Query(default=DEFAULT_CHUNK_SIZE, ge=1, le=10_000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
-    Объявления текущего пользователя как владельца/агента.
+    Массовый импорт объявлений текущего пользователя из CSV или NDJSON.
+    Строки с external_id обновляют ранее импортированные объявления.
+    Ошибочные строки пропускаются и перечисляются в ответе.
     """
-    listings = (
-        db.query(Listing)
-        .filter(Listing.owner_id == current_user.id)
-        .order_by(Listing.created_at.desc())
-        .all()
-    )
-    return listings
+    fmt = format or detect_format(request.headers.get("content-type"))
+    if fmt not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson (or pass ?format=)",
+        )
+
+    importer = ListingImporter(db, current_user.id, fmt, chunk_size=chunk_size)
+    async for lines in iter_line_batches(request, chunk_size):
+        await run_in_threadpool(importer.add_lines, lines)
+    result = await run_in_threadpool(importer.finish)
+
+    if result.imported:
+        await run_in_threadpool(listing_index.refresh, db, True)
+        invalidate_all()
+    return result
 
 
 @router.get("/", response_model=list[ListingRead])
 def list_listings(
+    request: Request,
     city: Optional[str] = Query(default=None),
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
 ):
     """
     Список активных объявлений (публичный, без авторизации).
+    Постранично: ?limit=&cursor= (курсор следующей страницы — в X-Next-Cursor).
+    JSON-страницы кэшируются (см. listing_cache), поддерживается If-None-Match.
     """
-    query = db.query(Listing).filter(Listing.is_active.is_(True))
+    query = db.query(*LISTING_ROWS.columns).filter(Listing.is_active.is_(True))
     if city:
         query = query.filter(Listing.city == city)
-    listings = query.order_by(Listing.created_at.desc()).all()
-    return listings
+    if page.format == "ndjson":
+        return paginate_rows(query, Listing.created_at, Listing.id, page, LISTING_ROWS)
+
+    def build():
+        rows, cursor = page_rows(query, Listing.created_at, Listing.id, page)
+        return LISTING_ROWS.dump(rows), {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
+    return cached_response(request, list_key(city, page.limit, page.cursor), build)
+
+
+@router.get("/my", response_model=list[ListingRead])
+def list_my_listings(
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Объявления текущего пользователя как владельца/агента.
+    """
+    query = db.query(*LISTING_ROWS.columns).filter(Listing.owner_id == current_user.id)
+    return paginate_rows(query, Listing.created_at, Listing.id, page, LISTING_ROWS)
 
 
 @router.get("/{listing_id}", response_model=ListingRead)
 def get_listing(
     listing_id: int,
+    request: Request,
     db: Session = Depends(get_db),
 ):
     """
-    Детальная по одному объявлению.
+    Детальная по одному объявлению. Кэшируется, поддерживается If-None-Match.
     """
-    listing = db.query(Listing).filter(Listing.id == listing_id).first()
-    if not listing or not listing.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Listing not found",
+    def build():
+        listing = (
+            db.query(*LISTING_ROWS.columns)
+            .filter(Listing.id == listing_id)
+            .first()
         )
-    return listing
+        if not listing or not listing.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Listing not found",
+            )
+        return LISTING_ROWS.dump_one(listing), {}
+
+    return cached_response(request, item_key(listing_id), build)
 
 
 @router.put("/{listing_id}", response_model=ListingRead)
@@ -120,12 +218,20 @@ def update_listing(
             detail="Not allowed to edit this listing",
         )
 
-    for field, value in listing_in.model_dump().items():
+    old_city = listing.city
+    old_filters = filter_values(listing)
+    # только переданные поля: не сбрасывать external_id (и owner_id) в NULL
+    for field, value in listing_in.model_dump(exclude_unset=True).items():
         setattr(listing, field, value)
 
     db.add(listing)
-    db.commit()
-    db.refresh(listing)
+    commit_listing(db, listing)
+
+    listing_index.apply(listing)
+    # из очередей — только если объявление могло перестать подходить под чьи-то фильтры
+    if not listing.is_active or filter_values(listing) != old_filters:
+        feed_queue.discard_listing(listing.id)
+    invalidate_listing(listing.id, [old_city, listing.city])
     return listing
 
 
@@ -155,4 +261,8 @@ def delete_listing(
     listing.is_active = False
     db.add(listing)
     db.commit()
+
+    listing_index.apply(listing)
+    feed_queue.discard_listing(listing.id)
+    invalidate_listing(listing.id, [listing.city])
     return {"status": "ok"}
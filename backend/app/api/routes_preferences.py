@@ -5,6 +5,8 @@ from ..deps import get_db, get_current_user
 from ..models.preferences import TenantPreference
 from ..models.user import User
 from ..schemas import TenantPreferenceCreate, TenantPreferenceRead
+from ..services.feed_queue import feed_queue
+from ..services.matching import preference_index
 
 router = APIRouter(prefix="/preferences", tags=["preferences"])
 
@@ -50,4 +52,8 @@ def upsert_preferences(
     db.add(pref)
     db.commit()
     db.refresh(pref)
+
+    # предпочтения поменялись — очередь ленты надо собрать заново
+    feed_queue.invalidate_user(current_user.id)
+    preference_index.apply(pref)
     return pref
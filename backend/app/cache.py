@@ -0,0 +1,129 @@
+"""
+Кэши приложения: в памяти процесса (TTL + LRU) или общий, по протоколу Redis.
+
+Общий бэкенд включается settings.cache_url (redis://...), чтобы несколько
+uvicorn-воркеров видели одни и те же записи и инвалидации. Значения
+должны сериализоваться в JSON. Для тестов в RedisCache можно передать
+любой совместимый клиент (например, fakeredis.FakeRedis()).
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .config import settings
+
+
+class MemoryCache:
+    """
+    Ограниченный по размеру LRU с TTL на запись. Потокобезопасный.
+    """
+
+    def __init__(self, max_size: int, ttl: float | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            _, value = self._data.get(key, (None, 0))
+            value += 1
+            self._data[key] = (None, value)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def values(self) -> list[Any]:
+        """
+        Все неистёкшие значения (порядок LRU не меняется).
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                value
+                for expires_at, value in self._data.values()
+                if expires_at is None or expires_at > now
+            ]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache:
+    """
+    Тот же интерфейс поверх Redis (или совместимого сервера).
+    """
+
+    def __init__(self, url: str | None = None, namespace: str = "", ttl: float | None = None, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:  # pragma: no cover - зависит от окружения
+                raise RuntimeError("cache_url is set, but the 'redis' package is not installed") from e
+            client = redis.Redis.from_url(url)
+        self._client = client
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}" if self.namespace else key
+
+    def get(self, key: str) -> Any | None:
+        raw = self._client.get(self._key(key))
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self._client.set(
+            self._key(key),
+            json.dumps(value, default=str),
+            px=int(ttl * 1000) if ttl else None,
+        )
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._key(key))
+
+    def incr(self, key: str) -> int:
+        return int(self._client.incr(self._key(key)))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self._key("*")):
+            self._client.delete(key)
+
+
+def make_cache(namespace: str, max_size: int, ttl: float | None = None) -> MemoryCache | RedisCache:
+    """
+    Общий кэш, если задан settings.cache_url, иначе — в памяти процесса.
+    """
+    if settings.cache_url:
+        return RedisCache(settings.cache_url, namespace=namespace, ttl=ttl)
+    return MemoryCache(max_size=max_size, ttl=ttl)
@@ -7,6 +7,118 @@ class Settings(BaseSettings):
 
     secret_key: str = "change_me"  # перезапишем из .env
     access_token_expire_minutes: int = 60
+    # /auth/refresh продлевает токен не дальше, чем на столько от входа
+    session_max_age_minutes: int = 60 * 24 * 7
+
+    # Пул соединений (для PostgreSQL)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0          # сек ожидания свободного соединения
+    db_pool_recycle: int = 1800            # сек жизни соединения
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int | None = None
+    # PgBouncer в режиме transaction pooling: без prepared statements
+    # и session-level настроек (statement_timeout ставится через SET LOCAL)
+    db_pgbouncer_mode: bool = False
+
+    # Async-стек (AsyncSession + asyncpg) для горячих роутов, включается явно.
+    # async_database_url по умолчанию выводится из database_url.
+    async_db_enabled: bool = False
+    async_database_url: str | None = None
+
+    # Общий кэш (redis://...). Не задан — кэши живут в памяти каждого воркера.
+    cache_url: str | None = None
+
+    # Кэш ответов публичных GET /listings/ и /listings/{id} (ETag/304)
+    listing_cache_enabled: bool = True
+    listing_cache_ttl_seconds: int = 30
+    listing_cache_max_size: int = 5_000
+
+    # Кэш пользователей для get_current_user
+    user_cache_ttl_seconds: int = 60
+    user_cache_max_size: int = 10_000
+
+    # Проверка JWT: кэш уже проверенных токенов (0 — выключен)
+    # и реализация HS256: "jose" (python-jose) или "pyjwt" (быстрее)
+    token_cache_max_size: int = 10_000
+    jwt_backend: str = "jose"
+
+    # Очередь кандидатов ленты (/feed/next): в памяти воркера не больше
+    # max_users очередей (LRU), очередь старше ttl пересобирается заново
+    feed_queue_size: int = 50
+    feed_queue_refill_threshold: int = 10
+    feed_queue_max_users: int = 10_000
+    feed_queue_ttl_seconds: int = 600
+
+    # Ранжирование ленты: "score" (оценка кандидатов по предпочтениям,
+    # свежести и популярности, см. services.ranking) или "recency"
+    feed_ranker: str = "score"
+    feed_rank_pool_size: int = 500
+    feed_rank_freshness_half_life_days: float = 7.0
+    feed_rank_popularity_ttl_seconds: int = 300
+    feed_rank_weights: dict[str, float] = {}
+
+    # Рекомендации по истории свайпов (item-item CF, services.recommendations):
+    # top-K похожих считает scripts.build_similarities, лента подмешивает
+    # похожие на недавние лайки (признак "similar" ранжирования)
+    cf_enabled: bool = True
+    cf_top_k: int = 20
+    cf_shrinkage: float = 5.0
+    cf_min_common: int = 2
+    cf_state_path: str = "var/cf_state.npz"
+    cf_refresh_seconds: int = 300
+    cf_user_history: int = 50
+
+    # Колоночный индекс активных объявлений в памяти процесса
+    # (services.listing_index): кандидаты ленты без запросов к listings;
+    # изменения из других воркеров догружаются раз в refresh_seconds
+    listing_index_enabled: bool = False
+    listing_index_refresh_seconds: int = 5
+
+    # Просмотренные в ленте одной сжатой строкой на пользователя
+    # (services.seen_sets) вместо чтения всей истории feed_actions при
+    # пересборке очереди из колоночного индекса; перед включением —
+    # python -m scripts.backfill_seen_sets
+    feed_seen_set_enabled: bool = False
+    feed_seen_cache_size: int = 10_000
+
+    # Оповещения о новых объявлениях под предпочтения (services.matching):
+    # обратный индекс предпочтений в памяти, совпадения -> listing_alerts,
+    # откуда их забирает Telegram-бот (/internal/alerts/*)
+    listing_alerts_enabled: bool = False
+    listing_alerts_refresh_seconds: int = 30
+    listing_alerts_lease_seconds: int = 60
+    listing_alerts_max_attempts: int = 5
+
+    # Токен сервисных эндпоинтов /internal/* (заголовок X-Internal-Token);
+    # не задан — эндпоинты отвечают 404
+    internal_api_token: str | None = None
+
+    # Буфер записи свайпов: /feed/action копит действия в памяти и пишет
+    # их пачками в фоне (ценой задержки до flush_ms и потери при падении)
+    feed_write_buffer_enabled: bool = False
+    feed_write_batch_size: int = 500
+    feed_write_flush_ms: int = 50
+    feed_write_max_pending: int = 100_000
+
+    # Побочные эффекты свайпа (избранное, лид, уведомление владельца):
+    # "inline" — в запросе, "queue" — фоновой задачей (services.jobs)
+    feed_side_effects: str = "inline"
+
+    # Очередь фоновых задач: "memory" (в процессе) или "db" (таблица jobs)
+    job_queue_backend: str = "memory"
+    job_workers: int = 2
+    job_max_attempts: int = 5
+    job_retry_base_seconds: float = 1.0
+    job_batch_size: int = 100
+    job_poll_interval_ms: int = 500
+
+    # Метрики Prometheus (/metrics): задержки и статусы по роутам,
+    # число SQL на запрос; один SQL столько раз за запрос — подозрение на N+1
+    metrics_enabled: bool = True
+    metrics_n_plus_one_threshold: int = 10
+    # Лог запросов дольше порога (мс) вместе с их SQL; None — выключен
+    slow_request_ms: int | None = None
 
     model_config = SettingsConfigDict(
         env_prefix="",
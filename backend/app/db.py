@@ -1,15 +1,23 @@
-from sqlalchemy import create_engine
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
 from .config import settings
-from .models import Base  # ВАЖНО: тянет за собой все модели
+from .db_pool import engine_options, setup_engine_events
+from .models import Base  # noqa: F401  ВАЖНО: тянет за собой все модели
 
 
 engine = create_engine(
     settings.database_url,
     future=True,
     echo=False,  # включишь True, если захочешь видеть SQL в логах
+    **engine_options(settings.database_url),
 )
+setup_engine_events(engine)
 
 SessionLocal = sessionmaker(
     bind=engine,
@@ -17,7 +25,71 @@ SessionLocal = sessionmaker(
     autocommit=False,
 )
 
+# --- async-движок (опционально) ---
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url() -> str:
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {backend!r}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.async_db_enabled:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_url = get_async_database_url()
+    async_engine = create_async_engine(
+        async_url,
+        echo=False,
+        **engine_options(async_url, is_async=True),
+    )
+    setup_engine_events(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+INITIAL_REVISION = "0001"
+MIGRATIONS_LOCK_ID = 74_210_001  # pg_advisory_lock: миграции катит один воркер
+
 
 def init_db() -> None:
-    """Создаёт таблицы в БД, если их ещё нет."""
-    Base.metadata.create_all(bind=engine)
+    """Приводит схему БД к последней миграции Alembic."""
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.attributes["configure_logger"] = False
+
+    with engine.connect() as connection:
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATIONS_LOCK_ID})
+            connection.commit()
+
+        try:
+            cfg.attributes["connection"] = connection
+            tables = inspect(connection).get_table_names()
+            connection.commit()  # транзакциями дальше управляет alembic
+            if "users" in tables and "alembic_version" not in tables:
+                # база создана старым create_all — считаем её начальной ревизией
+                command.stamp(cfg, INITIAL_REVISION)
+            command.upgrade(cfg, "head")
+        finally:
+            if is_postgres:
+                connection.execute(
+                    text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATIONS_LOCK_ID}
+                )
+                connection.commit()
@@ -0,0 +1,135 @@
+"""
+Настройки пула соединений из Settings и статистика ожидания соединений.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from .config import settings
+
+
+class PoolWaitStats:
+    """
+    Сколько запросов ждали соединение из пула, сколько суммарно/максимум,
+    и сколько раз так и не дождались (pool_timeout).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_total_ms": round(self.total_wait * 1000, 3),
+                "wait_avg_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.max_wait * 1000, 3),
+                "timeouts": self.timeouts,
+            }
+
+
+class _WaitTimingMixin:
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.wait_stats.record(time.perf_counter() - start, timed_out)
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    wait_stats = PoolWaitStats()
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    wait_stats = PoolWaitStats()
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    kwargs для create_engine/create_async_engine по настройкам db_*.
+    Для SQLite (локально, бенчмарки) оставляем пул по умолчанию.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        return {}
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+    connect_args: dict = {}
+    timeout_ms = settings.db_statement_timeout_ms
+    if settings.db_pgbouncer_mode:
+        # transaction pooling: серверное соединение меняется между транзакциями,
+        # поэтому никаких prepared statements и session-level SET/startup options
+        if is_async:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+    elif timeout_ms:
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(timeout_ms)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={timeout_ms}"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def setup_engine_events(engine: Engine) -> None:
+    """
+    В режиме PgBouncer statement_timeout ставим на каждую транзакцию (SET LOCAL).
+    """
+    timeout_ms = settings.db_statement_timeout_ms
+    if not (settings.db_pgbouncer_mode and timeout_ms):
+        return
+    if engine.dialect.name != "postgresql":
+        return
+
+    @event.listens_for(engine, "begin")
+    def set_statement_timeout(conn) -> None:
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def pool_status(pool: Pool) -> dict:
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool._max_overflow,
+        )
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        status["wait"] = wait_stats.snapshot()
+    return status
@@ -1,12 +1,16 @@
-from typing import Generator
+import hmac
+from typing import AsyncGenerator, Generator
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import SessionLocal
+from .config import settings
+from .db import AsyncSessionLocal, SessionLocal
 from .models.user import User
 from .security import decode_access_token
+from .user_cache import cache_user, get_cached_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -31,7 +35,58 @@ def get_current_user(
         )
 
     user_id = int(payload["sub"])
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_cached_user(user_id)
+    if user is None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is not None:
+            cache_user(user)
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found or inactive",
+        )
+    return user
+
+
+def require_internal_token(
+    x_internal_token: str | None = Header(default=None),
+) -> None:
+    """
+    Сервисные эндпоинты (бот): общий секрет INTERNAL_API_TOKEN.
+    """
+    if not settings.internal_api_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, settings.internal_api_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid internal token",
+        )
+
+
+# --- async-вариант (settings.async_db_enabled) ---
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    payload = decode_access_token(token)
+    if not payload or "sub" not in payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+        )
+
+    user_id = int(payload["sub"])
+    user = get_cached_user(user_id)
+    if user is None:
+        user = await db.get(User, user_id)
+        if user is not None:
+            cache_user(user)
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,143 @@
+"""
+Кэш ответов публичных GET /listings/ и GET /listings/{id}.
+
+Хранится готовое JSON-тело ответа с ETag; клиент с If-None-Match получает
+304 без тела. Ключ списка — (city, limit, cursor) + «поколения» общего
+списка и списка города: запись в объявление города X меняет поколение X и
+общего списка, и только эти страницы перестают находиться (старые записи
+вытесняет LRU/TTL). У детальной страницы своё поколение по id. Массовый
+импорт меняет общее поколение EPOCH и тем самым сбрасывает весь кэш.
+
+Поколение читается до запроса в БД, поэтому ответ, собранный параллельно
+с записью, ложится под старый ключ и после инвалидации не отдаётся.
+
+С несколькими воркерами нужен общий бэкенд (CACHE_URL), иначе чужой
+воркер может отдавать устаревший ответ до истечения TTL.
+"""
+import hashlib
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+from fastapi import Request, Response, status
+
+from .cache import make_cache
+from .config import settings
+
+ALL_CITIES = "*"
+EPOCH = "epoch"
+
+listing_cache = make_cache(
+    "listing",
+    max_size=settings.listing_cache_max_size,
+    ttl=settings.listing_cache_ttl_seconds,
+)
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.listing_cache_enabled,
+            "entries": len(listing_cache) if hasattr(listing_cache, "__len__") else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+stats = CacheStats()
+
+
+def _generation(scope: str) -> str:
+    key = f"gen:{scope}"
+    value = listing_cache.get(key)
+    if value is None:
+        # уникальное значение, а не 0: после вытеснения счётчика
+        # старые страницы не должны снова стать «текущими»
+        value = f"{time.time_ns():x}"
+        listing_cache.set(key, value, ttl=0)
+    return value
+
+
+def list_key(city: str | None, limit: int, cursor: str | None) -> str:
+    generations = _generation(EPOCH) + "." + _generation(ALL_CITIES)
+    if city:
+        generations += "." + _generation(city)
+    return f"list:{generations}:{city or ''}:{limit}:{cursor or ''}"
+
+
+def item_key(listing_id: int) -> str:
+    generations = _generation(EPOCH) + "." + _generation(f"item:{listing_id}")
+    return f"item:{generations}:{listing_id}"
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def cached_response(
+    request: Request,
+    key: str,
+    build: Callable[[], tuple[bytes, dict[str, str]]],
+) -> Response:
+    """
+    Ответ из кэша или build() -> (JSON-тело, доп. заголовки), с ETag/304.
+    Исключения build() (например, 404) не кэшируются.
+    """
+    entry = listing_cache.get(key) if settings.listing_cache_enabled else None
+    if entry is not None:
+        stats.count("hits")
+        body, etag, headers = entry["body"].encode(), entry["etag"], entry["headers"]
+    else:
+        stats.count("misses")
+        body, headers = build()
+        etag = etag_for(body)
+        if settings.listing_cache_enabled:
+            listing_cache.set(key, {"body": body.decode(), "etag": etag, "headers": headers})
+
+    headers = {**headers, "ETag": etag, "Cache-Control": "public, no-cache"}
+    if etag in _if_none_match(request):
+        stats.count("not_modified")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _if_none_match(request: Request) -> set[str]:
+    value = request.headers.get("if-none-match")
+    if not value:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in value.split(",")}
+
+
+def invalidate_listing(listing_id: int | None, cities: Iterable[str | None]) -> None:
+    """
+    Объявление создано/изменено/удалено: сбрасываем его детальную страницу
+    и списки его города (для update — старого и нового) и общий список.
+    """
+    scopes = [f"item:{listing_id}"] if listing_id is not None else []
+    _bump(scopes + [ALL_CITIES, *(c for c in cities if c)])
+
+
+def invalidate_all() -> None:
+    """
+    Массовые изменения (импорт): проще сбросить всё, чем перечислять.
+    """
+    _bump([EPOCH])
+
+
+def _bump(scopes: Iterable[str]) -> None:
+    token = f"{time.time_ns():x}"
+    for scope in set(scopes):
+        listing_cache.set(f"gen:{scope}", token, ttl=0)
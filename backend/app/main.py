@@ -1,5 +1,8 @@
-from fastapi import FastAPI
+import time
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 
 from .config import settings
 from .api.routes_auth import router as auth_router
@@ -10,7 +13,17 @@ from .api.routes_favorites import router as favorites_router
 from .api.routes_leads import router as leads_router
 from .api.routes_feed import router as feed_router
 from .api.routes_admin import router as admin_router 
-from .db import init_db
+from .api.routes_async import router as async_router
+from .api.routes_internal import router as internal_router
+from .db import SessionLocal, async_engine, engine, init_db
+from .db_pool import pool_status
+from .listing_cache import stats as listing_cache_stats
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render as render_metrics, setup_metrics
+from .services.feed_writer import feed_action_buffer
+from .services.jobs import job_queue
+from .services.listing_index import listing_index
+from .services.matching import preference_index
+from .services.pagination import NEXT_CURSOR_HEADER
 
 app = FastAPI(
     title="Real Estate Tinder API",
@@ -24,13 +37,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # курсор пагинации списков
 )
 
+# задержки/статусы по роутам и SQL на запрос (снаружи CORS — считает всё)
+setup_metrics(app)
+
 
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+    if settings.feed_write_buffer_enabled:
+        feed_action_buffer.start()
+    if settings.listing_index_enabled:
+        db = SessionLocal()
+        try:
+            listing_index.load(db)
+        finally:
+            db.close()
+    if settings.listing_alerts_enabled:
+        db = SessionLocal()
+        try:
+            preference_index.load(db)
+        finally:
+            db.close()
+
 
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    # дописываем накопленные свайпы до остановки воркера
+    if settings.feed_write_buffer_enabled:
+        feed_action_buffer.stop()
+
+
+@app.on_event("startup")
+async def start_job_workers() -> None:
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_workers() -> None:
+    # ждём (ограниченно) выполнения уже поставленных задач
+    await job_queue.stop()
+
+
+# async-роуты регистрируем первыми: при совпадении пути побеждает первый
+if settings.async_db_enabled:
+    app.include_router(async_router)
 
 app.include_router(auth_router)
 app.include_router(users_router)
@@ -40,6 +93,7 @@ app.include_router(favorites_router)
 app.include_router(leads_router)
 app.include_router(feed_router)
 app.include_router(admin_router) 
+app.include_router(internal_router)
 
 
 @app.get("/health")
@@ -48,3 +102,65 @@ async def health():
         "status": "ok",
         "environment": settings.environment,
     }
+
+
+@app.get("/health/db")
+def health_db():
+    """
+    Состояние БД и пула: занятые/свободные соединения, overflow, ожидание.
+    """
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        db_status = "ok"
+    except Exception as e:
+        db_status = f"error: {e.__class__.__name__}"
+    ping_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    result = {
+        "status": db_status,
+        "ping_ms": ping_ms,
+        "pool": pool_status(engine.pool),
+    }
+    if async_engine is not None:
+        result["async_pool"] = pool_status(async_engine.pool)
+    if settings.feed_write_buffer_enabled:
+        result["feed_write_buffer"] = {
+            "pending": len(feed_action_buffer),
+            "flushed": feed_action_buffer.flushed,
+            "dropped": feed_action_buffer.dropped,
+        }
+    return result
+
+
+@app.get("/health/cache")
+def health_cache():
+    """
+    Кэш ответов /listings/: попадания, промахи, 304, hit rate (по воркеру),
+    колоночный индекс объявлений ленты и обратный индекс предпочтений.
+    """
+    result = {"listings": listing_cache_stats.as_dict()}
+    if settings.listing_index_enabled:
+        result["listing_index"] = listing_index.stats()
+    if settings.listing_alerts_enabled:
+        result["preference_index"] = preference_index.stats()
+    return result
+
+
+@app.get("/health/jobs")
+def health_jobs():
+    """
+    Очередь фоновых задач: глубина, в работе, выполнено/повторов/провалено.
+    """
+    return job_queue.stats()
+
+
+if settings.metrics_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """
+        Метрики процесса в текстовом формате Prometheus.
+        """
+        return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,338 @@
+"""
+Метрики в формате Prometheus и учёт SQL-запросов на HTTP-запрос.
+
+MetricsMiddleware меряет каждый запрос: задержку и статус по шаблону
+роута (/listings/{listing_id}, а не конкретный id), число SQL-запросов и
+время в БД. SQL считается событиями движка (before/after_cursor_execute)
+в RequestStats текущего запроса — через contextvar, который виден и в
+sync-роутах (threadpool копирует контекст). Запросы вне HTTP (фоновые
+задачи, буфер записи свайпов) не учитываются.
+
+Один и тот же SQL (с точностью до параметров) metrics_n_plus_one_threshold
+раз и больше за запрос — подозрение на N+1: счётчик db_n_plus_one_total и
+предупреждение в лог. Async-роуты (routes_async) дополнительно пишут
+в RequestStats.loop_time, сколько обработчик держал event loop: время
+run_sync минус время SQL — оценка сверху, ожидание соединения и commit
+остаются в ней. С SLOW_REQUEST_MS запросы дольше порога пишутся
+в лог app.slow_requests вместе с выполненным SQL.
+
+Метрики живут в памяти процесса: с несколькими воркерами uvicorn каждый
+отдаёт свои, скрейпить нужно каждый процесс (или по одному воркеру на
+контейнер).
+"""
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .db import async_engine, engine
+from .db_pool import pool_status
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("app.slow_requests")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+LOOP_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5)
+
+# сколько SQL одного запроса держать для лога медленных запросов
+SLOW_LOG_MAX_STATEMENTS = 50
+SLOW_LOG_STATEMENT_CHARS = 500
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] += amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labels, values)} {_format_value(v)}"
+            for values, v in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value: float) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [счётчики по корзинам..., +Inf, сумма]
+        self._values: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *label_values, value: float) -> None:
+        with self._lock:
+            row = self._values.get(label_values)
+            if row is None:
+                row = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            else:
+                row[len(self.buckets)] += 1
+            row[-1] += value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for values, row in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), row):
+                cumulative += count
+                le = 'le="%s"' % (bound if bound == "+Inf" else _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+REQUEST_LABELS = ("method", "route")
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+http_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", REQUEST_LABELS, DURATION_BUCKETS
+)
+http_in_progress = Gauge(
+    "http_requests_in_progress", "HTTP requests being served.", ("method",)
+)
+db_queries = Histogram(
+    "db_queries_per_request", "SQL statements per HTTP request.", REQUEST_LABELS, QUERY_COUNT_BUCKETS
+)
+db_time = Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per HTTP request.", REQUEST_LABELS, DURATION_BUCKETS
+)
+db_n_plus_one = Counter(
+    "db_n_plus_one_total", "Requests that repeated one SQL statement too often (likely N+1).", REQUEST_LABELS
+)
+async_loop_time = Histogram(
+    "async_handler_loop_seconds",
+    "Time an async route handler ran on the event loop between SQL awaits.",
+    REQUEST_LABELS,
+    LOOP_TIME_BUCKETS,
+)
+db_pool = Gauge("db_pool_connections", "Connection pool state.", ("pool", "state"))
+
+METRICS = [
+    http_requests, http_duration, http_in_progress, db_queries, db_time, db_n_plus_one,
+    async_loop_time, db_pool,
+]
+
+
+def _collect_pool() -> None:
+    pools = {"sync": engine.pool}
+    if async_engine is not None:
+        pools["async"] = async_engine.pool
+    for name, pool in pools.items():
+        status = pool_status(pool)
+        for state in ("checked_out", "checked_in", "overflow"):
+            if state in status:
+                db_pool.set(name, state, value=status[state])
+
+
+def render() -> str:
+    """
+    Все метрики в текстовом формате Prometheus.
+    """
+    _collect_pool()
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# --- SQL на запрос ---
+
+# IN (?, ?, ?) с разным числом параметров — один и тот же запрос
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    return _IN_LIST.sub("(?)", statement)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "loop_time", "repeats", "statements")
+
+    def __init__(self, keep_statements: bool):
+        self.queries = 0
+        self.db_time = 0.0
+        self.loop_time: float | None = None  # только async-роуты
+        self.repeats: dict[str, int] = defaultdict(int)
+        self.statements: list[tuple[float, str]] | None = [] if keep_statements else None
+
+    def record(self, statement: str, duration: float) -> None:
+        self.queries += 1
+        self.db_time += duration
+        self.repeats[normalize_statement(statement)] += 1
+        if self.statements is not None and len(self.statements) < SLOW_LOG_MAX_STATEMENTS:
+            self.statements.append((duration, statement))
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(s, n) for s, n in self.repeats.items() if n >= threshold]
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+# --- middleware ---
+
+
+def _one_line(statement: str) -> str:
+    return " ".join(statement.split())[:SLOW_LOG_STATEMENT_CHARS]
+
+
+def _route_label(scope: dict) -> str:
+    # шаблон пути, а не сам путь: иначе метка на каждый id
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware (не BaseHTTPMiddleware: тот буферизует стриминговые
+    ответы); время считается до отправки последнего куска тела.
+    """
+
+    def __init__(self, app, skip_paths: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats(keep_statements=settings.slow_request_ms is not None)
+        token = _current.set(stats)
+        http_in_progress.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            _current.reset(token)
+            http_in_progress.dec(method)
+            self._observe(scope, method, status_code, duration, stats)
+
+    def _observe(self, scope, method: str, status_code: int, duration: float, stats: RequestStats) -> None:
+        route = _route_label(scope)
+        http_requests.inc(method, route, str(status_code))
+        http_duration.observe(method, route, value=duration)
+        db_queries.observe(method, route, value=stats.queries)
+        db_time.observe(method, route, value=stats.db_time)
+        if stats.loop_time is not None:
+            async_loop_time.observe(method, route, value=stats.loop_time)
+
+        repeated = stats.repeated(settings.metrics_n_plus_one_threshold)
+        if repeated:
+            db_n_plus_one.inc(method, route)
+            for statement, count in repeated:
+                logger.warning("possible N+1 in %s %s: %d x %s", method, route, count, _one_line(statement))
+
+        threshold = settings.slow_request_ms
+        if threshold is not None and duration * 1000 >= threshold:
+            lines = [
+                f"slow request {method} {scope['path']} ({route}) -> {status_code} in {duration * 1000:.1f} ms, "
+                f"{stats.queries} queries / {stats.db_time * 1000:.1f} ms in DB"
+                + (f", {stats.loop_time * 1000:.1f} ms on event loop" if stats.loop_time is not None else "")
+            ]
+            for took, statement in stats.statements or ():
+                lines.append(f"  {took * 1000:8.2f} ms  {_one_line(statement)}")
+            if stats.queries > len(stats.statements or ()):
+                lines.append(f"  ... {stats.queries - len(stats.statements or ())} more")
+            slow_logger.warning("\n".join(lines))
+
+
+def setup_metrics(app) -> None:
+    """
+    Подключает middleware и учёт SQL для всех движков (sync и async).
+    """
+    if not settings.metrics_enabled:
+        return
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.add_middleware(MetricsMiddleware)
@@ -8,6 +8,10 @@ from .preferences import TenantPreference  # noqa: E402,F401
 from .feed_action import FeedAction  # noqa: E402,F401
 from .favorite import Favorite  # noqa: E402,F401
 from .lead import Lead  # noqa: E402,F401
+from .job import Job  # noqa: E402,F401
+from .listing_similarity import ListingSimilarity, ListingSimilarityBuild  # noqa: E402,F401
+from .user_seen_set import UserSeenSet  # noqa: E402,F401
+from .listing_alert import ListingAlert  # noqa: E402,F401
 
 __all__ = [
     "Base",
@@ -17,4 +21,9 @@ __all__ = [
     "FeedAction",
     "Favorite",
     "Lead",
+    "Job",
+    "ListingSimilarity",
+    "ListingSimilarityBuild",
+    "UserSeenSet",
+    "ListingAlert",
 ]
@@ -2,6 +2,7 @@ from sqlalchemy import (
     Column,
     Integer,
     DateTime,
+    Index,
     func,
     UniqueConstraint,
 )
@@ -21,4 +22,6 @@ class Favorite(Base):
 
     __table_args__ = (
         UniqueConstraint("user_id", "listing_id", name="uq_favorites_user_listing"),
+        # /favorites/ — сортировка по дате добавления
+        Index("ix_favorites_user_created", "user_id", "created_at", "id"),
     )
@@ -3,6 +3,7 @@ from sqlalchemy import (
     Integer,
     String,
     DateTime,
+    Index,
     func,
 )
 
@@ -14,10 +15,15 @@ class FeedAction(Base):
 
     id = Column(Integer, primary_key=True, index=True)
 
-    user_id = Column(Integer, index=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
     listing_id = Column(Integer, index=True, nullable=False)
 
     action = Column(String(16), nullable=False)  # like / dislike / favorite
     source = Column(String(16), nullable=True)   # web / telegram / other
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # анти-join "уже просмотренные" в ленте: index-only scan по user_id
+        Index("ix_feed_actions_user_listing", "user_id", "listing_id"),
+    )
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Text,
+    DateTime,
+    Index,
+    JSON,
+    func,
+)
+
+from . import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Job(Base):
+    """
+    Фоновая задача (режим JOB_QUEUE_BACKEND=db, см. services.jobs).
+    Выполненные задачи удаляются, исчерпавшие попытки остаются со status=dead.
+    """
+
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+
+    kind = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=False)
+
+    status = Column(String(16), nullable=False, server_default="queued")  # queued / dead
+    attempts = Column(Integer, nullable=False, server_default="0")
+    last_error = Column(Text, nullable=True)
+
+    # время проставляется из приложения (в т.ч. для повторов с backoff)
+    run_after = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # выборка воркером: WHERE status = 'queued' AND run_after <= now ORDER BY id
+        Index("ix_jobs_status_run_after", "status", "run_after", "id"),
+    )
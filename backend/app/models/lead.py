@@ -3,7 +3,9 @@ from sqlalchemy import (
     Integer,
     String,
     DateTime,
+    Index,
     func,
+    UniqueConstraint,
 )
 
 from . import Base
@@ -14,11 +16,19 @@ class Lead(Base):
 
     id = Column(Integer, primary_key=True, index=True)
 
-    tenant_id = Column(Integer, index=True, nullable=False)
+    tenant_id = Column(Integer, nullable=False)
     listing_id = Column(Integer, index=True, nullable=False)
-    owner_id = Column(Integer, index=True, nullable=True)
+    owner_id = Column(Integer, nullable=True)
 
     status = Column(String(32), nullable=False, server_default="new")
     # new / in_progress / closed - можем потом добавить отдельный enum
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # один лид на пару; запись свайпов — INSERT ... ON CONFLICT DO NOTHING
+        UniqueConstraint("tenant_id", "listing_id", name="uq_leads_tenant_listing"),
+        # /leads/my и /leads/for-me
+        Index("ix_leads_tenant_created", "tenant_id", "created_at", "id"),
+        Index("ix_leads_owner_created", "owner_id", "created_at", "id"),
+    )
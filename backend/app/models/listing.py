@@ -5,7 +5,10 @@ from sqlalchemy import (
     Numeric,
     Boolean,
     DateTime,
+    Index,
+    UniqueConstraint,
     func,
+    text,
 )
 
 from . import Base
@@ -17,7 +20,9 @@ class Listing(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     # Владелец объявления (пока без внешнего ключа, в будущем добавим FK на users)
-    owner_id = Column(Integer, nullable=True, index=True)
+    owner_id = Column(Integer, nullable=True)
+    # id объявления в системе партнёра — ключ upsert'а при массовом импорте
+    external_id = Column(String(128), nullable=True)
 
     title = Column(String(255), nullable=False)
     city = Column(String(128), nullable=False)
@@ -34,3 +39,29 @@ class Listing(Base):
         server_default=func.now(),
         onupdate=func.now(),
     )
+
+    __table_args__ = (
+        UniqueConstraint("owner_id", "external_id", name="uq_listings_owner_external_id"),
+        # лента: фильтр по предпочтениям + сортировка по свежести, только активные
+        Index(
+            "ix_listings_active_feed",
+            "city", "deal_type", "property_type", "created_at", "id",
+            postgresql_where=text("is_active"),
+        ),
+        # публичный список /listings/?city= и лента с предпочтением только по городу
+        Index(
+            "ix_listings_active_city_created",
+            "city", "created_at", "id",
+            postgresql_where=text("is_active"),
+        ),
+        # публичный список без фильтров и fallback ленты
+        Index(
+            "ix_listings_active_created",
+            "created_at", "id",
+            postgresql_where=text("is_active"),
+        ),
+        # /listings/my, /admin/listings?owner_id=
+        Index("ix_listings_owner_created", "owner_id", "created_at", "id"),
+        # догрузка services.listing_index: updated_at > водяной знак, max(updated_at)
+        Index("ix_listings_updated_at", "updated_at"),
+    )
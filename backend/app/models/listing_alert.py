@@ -0,0 +1,42 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Index,
+    UniqueConstraint,
+    func,
+)
+
+from . import Base
+from .job import utcnow
+
+
+class ListingAlert(Base):
+    """
+    Оповещение арендатора о новом объявлении под его предпочтения
+    (см. services.matching). Очередь на отправку для бота: он забирает
+    строки через /internal/alerts/claim и подтверждает /internal/alerts/ack.
+    """
+
+    __tablename__ = "listing_alerts"
+
+    id = Column(Integer, primary_key=True)
+
+    user_id = Column(Integer, nullable=False)
+    listing_id = Column(Integer, nullable=False)
+
+    status = Column(String(16), nullable=False, server_default="pending")  # pending / sent / failed / skipped
+    attempts = Column(Integer, nullable=False, server_default="0")
+    # раньше этого времени строку не выдавать: аренда ботом или пауза перед повтором
+    available_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # одно оповещение на пару: правка и повторный импорт не дублируют
+        UniqueConstraint("user_id", "listing_id", name="uq_listing_alerts_user_listing"),
+        # выдача боту: WHERE status = 'pending' AND available_at <= now ORDER BY id
+        Index("ix_listing_alerts_status_available", "status", "available_at", "id"),
+    )
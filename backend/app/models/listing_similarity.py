@@ -0,0 +1,52 @@
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    Integer,
+    Float,
+    DateTime,
+    Index,
+    PrimaryKeyConstraint,
+    func,
+)
+
+from . import Base
+
+
+class ListingSimilarity(Base):
+    """
+    Top-K похожих объявлений по истории свайпов (item-item CF,
+    см. services.recommendations). Список объявления всегда переписывается
+    целиком, с одним updated_at.
+    """
+
+    __tablename__ = "listing_similarities"
+
+    listing_id = Column(Integer, nullable=False)
+    similar_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        PrimaryKeyConstraint("listing_id", "similar_id", name="pk_listing_similarities"),
+        # догрузка изменённых списков в память воркеров
+        Index("ix_listing_similarities_updated", "updated_at"),
+    )
+
+
+class ListingSimilarityBuild(Base):
+    """
+    Журнал записей в listing_similarities: по нему воркеры узнают то, чего
+    не видно по updated_at строк, — полный пересчёт (full: перечитать всё)
+    и списки, ставшие пустыми (emptied: id объявлений, строк у них больше нет).
+    Полный пересчёт удаляет записи журнала до себя.
+    """
+
+    __tablename__ = "listing_similarity_builds"
+
+    id = Column(Integer, primary_key=True)
+    full = Column(Boolean, nullable=False)
+    emptied = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
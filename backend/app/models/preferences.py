@@ -4,6 +4,7 @@ from sqlalchemy import (
     String,
     Numeric,
     DateTime,
+    Index,
     func,
 )
 
@@ -35,3 +36,8 @@ class TenantPreference(Base):
         server_default=func.now(),
         onupdate=func.now(),
     )
+
+    __table_args__ = (
+        # догрузка services.matching.PreferenceIndex: updated_at > водяной знак
+        Index("ix_tenant_preferences_updated_at", "updated_at"),
+    )
@@ -0,0 +1,31 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    LargeBinary,
+    DateTime,
+    func,
+)
+
+from . import Base
+
+
+class UserSeenSet(Base):
+    """
+    Все объявления, которые пользователь уже видел в ленте, одним значением:
+    отсортированные id, сжатые (см. services.seen_sets). Производная от
+    feed_actions, обновляется в той же транзакции, что и свайп.
+    """
+
+    __tablename__ = "user_seen_sets"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    listing_ids = Column(LargeBinary, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    # растёт при каждом изменении: воркеры сверяют его со своим кэшем
+    version = Column(Integer, nullable=False, default=1)
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
@@ -6,12 +6,13 @@ from .user import (
     Token,
     TelegramAuth,
 )
-from .listing import ListingCreate, ListingRead
+from .listing import ListingCreate, ListingRead, ListingImportResult
 from .preferences import TenantPreferenceCreate, TenantPreferenceRead
-from .feed import FeedActionCreate, FeedActionRead
+from .feed import FeedActionBatch, FeedActionCreate, FeedActionRead, FeedBatch
 from .favorite import FavoriteCreate, FavoriteRead
 from .lead import LeadCreate, LeadRead
 from .admin import AdminUserUpdate, AdminUserRead, AdminListingRead
+from .alert import ListingAlertAck, ListingAlertRead
 
 
 
@@ -20,6 +21,7 @@ __all__ = [
     "UserRead",
     "ListingCreate",
     "ListingRead",
+    "ListingImportResult",
     "TenantPreferenceCreate",
     "TenantPreferenceRead",
     "FeedActionCreate",
@@ -31,9 +33,13 @@ __all__ = [
     "AdminUserRead",
     "AdminListingRead",
     "FeedActionRead",
+    "FeedActionBatch",
+    "FeedBatch",
     "FavoriteCreate",
     "FavoriteRead",
     "LeadCreate",
     "LeadRead",
+    "ListingAlertRead",
+    "ListingAlertAck",
 ]
 
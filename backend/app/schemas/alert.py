@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+from .listing import ListingRead
+
+
+class ListingAlertRead(BaseModel):
+    id: int
+    telegram_id: str
+    listing: ListingRead
+
+
+class ListingAlertAck(BaseModel):
+    sent: list[int] = []     # доставлены
+    failed: list[int] = []   # не удалось — повторить позже
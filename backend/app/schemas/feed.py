@@ -1,6 +1,8 @@
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+from .listing import ListingRead
+
 
 class FeedActionBase(BaseModel):
     user_id: int | None = None  # игнорируем, берём из текущего пользователя
@@ -19,3 +21,13 @@ class FeedActionRead(FeedActionBase):
 
     class Config:
         from_attributes = True
+
+
+class FeedActionBatch(BaseModel):
+    # накопленные офлайн/в очереди клиента свайпы, в порядке совершения
+    actions: list[FeedActionCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class FeedBatch(BaseModel):
+    items: list[ListingRead]
+    next_cursor: str | None = None  # None — колода закончилась
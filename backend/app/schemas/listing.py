@@ -11,12 +11,25 @@ class ListingBase(BaseModel):
     price: Decimal
     is_active: bool = True
     owner_id: int | None = None
+    external_id: str | None = None  # id у партнёра (для импорта)
 
 
 class ListingCreate(ListingBase):
     pass
 
 
+class ListingImportError(BaseModel):
+    row: int        # номер строки данных (с 1, без заголовка CSV)
+    error: str
+
+
+class ListingImportResult(BaseModel):
+    processed: int
+    imported: int   # вставлено или обновлено
+    failed: int
+    errors: list[ListingImportError]
+
+
 class ListingRead(ListingBase):
     id: int
     created_at: datetime
@@ -1,9 +1,12 @@
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 
+import jwt as pyjwt  # PyJWT, JWT_BACKEND=pyjwt
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
+from .cache import MemoryCache
 from .config import settings
 
 # Используем pbkdf2_sha256 вместо bcrypt
@@ -14,6 +17,10 @@ pwd_context = CryptContext(
 
 ALGORITHM = "HS256"
 
+# token -> claims уже проверенных токенов; запись живёт не дольше exp токена.
+# Кэш локальный: поход в общий кэш дороже самой HMAC-проверки.
+token_cache = MemoryCache(max_size=max(settings.token_cache_max_size, 1))
+
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -26,18 +33,54 @@ def verify_password(plain_password: str, password_hash: str) -> bool:
 
 
 def create_access_token(data: dict, expires_minutes: Optional[int] = None) -> str:
+    """
+    auth_time — время входа (unix); при продлении передаётся из старого
+    токена, и exp не выходит за auth_time + session_max_age_minutes.
+    """
     to_encode = data.copy()
+    to_encode.setdefault("auth_time", int(time.time()))
     expire = datetime.utcnow() + timedelta(
         minutes=expires_minutes or settings.access_token_expire_minutes
     )
-    to_encode.update({"exp": expire})
+    session_end = datetime.utcfromtimestamp(
+        to_encode["auth_time"] + settings.session_max_age_minutes * 60
+    )
+    to_encode.update({"exp": min(expire, session_end)})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> dict | None:
+def _decode_jose(token: str) -> dict | None:
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
-        return payload
+        return jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
     except JWTError:
         return None
+
+
+def _decode_pyjwt(token: str) -> dict | None:
+    try:
+        return pyjwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+    except pyjwt.PyJWTError:
+        return None
+
+
+JWT_DECODERS = {
+    "jose": _decode_jose,
+    "pyjwt": _decode_pyjwt,
+}
+
+_decode = JWT_DECODERS[settings.jwt_backend]
+
+
+def decode_access_token(token: str) -> dict | None:
+    if settings.token_cache_max_size:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+
+    payload = _decode(token)
+    if payload and settings.token_cache_max_size:
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            token_cache.set(token, payload, ttl=ttl)
+    return payload
@@ -0,0 +1,91 @@
+"""
+Быстрая сериализация ответов: строки из SELECT по нужным колонкам сразу
+в JSON-bytes (orjson), без ORM-сущностей и валидации через response_model.
+
+Строки — sqlalchemy Row (именованные кортежи): не попадают в identity map
+сессии и не отслеживаются на изменения, поэтому дешевле сущностей и по
+времени, и по памяти. Использовать только на чтение.
+
+Формат совпадает с тем, что отдаёт FastAPI по схеме: Decimal — строкой
+(для полей float — числом), datetime — ISO 8601, UTC с суффиксом "Z".
+Без orjson используется pydantic_core.to_json (медленнее, формат тот же).
+"""
+from decimal import Decimal
+from typing import Any, Iterable, Sequence
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from .models.lead import Lead
+from .models.listing import Listing
+from .models.user import User
+from .schemas import AdminListingRead, AdminUserRead, LeadRead, ListingRead
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_UTC_Z)
+    return to_json(value)
+
+
+def json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+class RowSchema:
+    """
+    Набор колонок под схему ответа: поле схемы -> одноимённая колонка модели
+    (или выражение из columns). Строки выборки по .columns превращаются
+    в JSON с ключами в порядке полей схемы.
+    """
+
+    def __init__(self, schema: type[BaseModel], model, **columns):
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        self.columns = [columns.get(f, getattr(model, f, None)) for f in self.fields]
+        missing = [f for f, c in zip(self.fields, self.columns) if c is None]
+        if missing:
+            raise ValueError(f"{schema.__name__}: no columns for {missing}")
+        # поля float отдаются числом (Numeric из БД приходит Decimal)
+        self._floats = [
+            i for i, f in enumerate(self.fields)
+            if schema.model_fields[f].annotation in (float, float | None)
+        ]
+
+    def to_dict(self, row: Sequence) -> dict:
+        values = list(row[: len(self.fields)])
+        for i in self._floats:
+            if values[i] is not None:
+                values[i] = float(values[i])
+        return dict(zip(self.fields, values))
+
+    def to_dicts(self, rows: Iterable[Sequence]) -> list[dict]:
+        return [self.to_dict(row) for row in rows]
+
+    def dump(self, rows: Iterable[Sequence]) -> bytes:
+        return dumps(self.to_dicts(rows))
+
+    def dump_one(self, row: Sequence) -> bytes:
+        return dumps(self.to_dict(row))
+
+    def dump_line(self, row: Sequence) -> bytes:
+        return dumps(self.to_dict(row)) + b"\n"
+
+
+# строки списков
+LISTING_ROWS = RowSchema(ListingRead, Listing)
+LEAD_ROWS = RowSchema(LeadRead, Lead)
+ADMIN_LISTING_ROWS = RowSchema(AdminListingRead, Listing)
+ADMIN_USER_ROWS = RowSchema(AdminUserRead, User)
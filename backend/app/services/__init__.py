@@ -0,0 +1 @@
+# Domain services package (логика, общая для нескольких роутеров)
@@ -0,0 +1,87 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Query, Session
+
+from ..models.feed_action import FeedAction
+from ..models.listing import Listing
+from ..models.preferences import TenantPreference
+from ..schemas import FeedActionCreate
+from .feed_writer import write_feed_actions
+
+
+def get_preferences(db: Session, user_id: int) -> TenantPreference | None:
+    return (
+        db.query(TenantPreference)
+        .filter(TenantPreference.user_id == user_id)
+        .first()
+    )
+
+
+def apply_preference_filters(query: Query, pref: TenantPreference | None) -> Query:
+    """
+    Накладывает на запрос по Listing фильтры из предпочтений арендатора.
+    """
+    if pref is None:
+        return query
+
+    if pref.city:
+        query = query.filter(Listing.city == pref.city)
+    if pref.deal_type:
+        query = query.filter(Listing.deal_type == pref.deal_type)
+    if pref.property_type:
+        query = query.filter(Listing.property_type == pref.property_type)
+    if pref.price_min is not None:
+        query = query.filter(Listing.price >= pref.price_min)
+    if pref.price_max is not None:
+        query = query.filter(Listing.price <= pref.price_max)
+    return query
+
+
+def seen_listing_ids(user_id: int):
+    """
+    Подзапрос: объявления, которые уже были в ленте (лайк/дизлайк/фаворит).
+    """
+    return select(FeedAction.listing_id).where(FeedAction.user_id == user_id)
+
+
+def unseen_active_listings(db: Session, user_id: int, *entities) -> Query:
+    """
+    Активные объявления, которых пользователь ещё не видел, от свежих к старым.
+    Анти-join по feed_actions выполняется один раз на весь запрос.
+    """
+    return (
+        db.query(*(entities or (Listing,)))
+        .filter(Listing.is_active.is_(True))
+        .filter(~Listing.id.in_(seen_listing_ids(user_id)))
+        .order_by(Listing.created_at.desc(), Listing.id.desc())
+    )
+
+
+def candidate_listing_ids(
+    db: Session,
+    user_id: int,
+    pref: TenantPreference | None,
+    limit: int,
+    exclude: set[int] | None = None,
+) -> list[int]:
+    """
+    Следующие `limit` id непросмотренных активных объявлений, от свежих к старым.
+    Если по предпочтениям ничего нет — fallback на все активные объявления.
+    exclude — просмотренные, но ещё не записанные в feed_actions.
+    """
+    base = unseen_active_listings(db, user_id, Listing.id)
+    if exclude:
+        base = base.filter(~Listing.id.in_(exclude))
+    ids = [row.id for row in apply_preference_filters(base, pref).limit(limit)]
+    if not ids and pref is not None:
+        ids = [row.id for row in base.limit(limit)]
+    return ids
+
+
+def record_feed_action(db: Session, user_id: int, action_in: FeedActionCreate) -> None:
+    """
+    Добавляет в сессию FeedAction и его побочные эффекты (без commit):
+    - favorite -> добавляем в избранное
+    - like -> создаём лид (если его ещё нет)
+    Запись та же, что у пакетного пути (services.feed_writer).
+    """
+    write_feed_actions(db, [(user_id, action_in)])
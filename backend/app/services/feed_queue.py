@@ -0,0 +1,234 @@
+"""
+Предрасчитанная очередь кандидатов для /feed/next (и пачками — /feed/batch).
+
+Для каждого пользователя держим в памяти процесса пачку id следующих
+объявлений (минус уже просмотренные) в порядке services.ranking.
+/feed/next берёт голову очереди за O(1), /feed/action снимает её,
+а когда очередь мелеет — она пересобирается в фоне одним запросом.
+
+Очереди хранятся в LRU с TTL (MemoryCache): не больше
+feed_queue_max_users пользователей на воркер, давно собранная очередь
+выбрасывается и при следующем запросе пересобирается.
+
+Очередь своя у каждого воркера uvicorn: mark_seen и discard_listing
+другие воркеры не видят. Поэтому голова очереди перед выдачей
+перепроверяется в БД (активно и ещё не свайпнуто пользователем) —
+устаревшая запись просто пропускается. Не ловится только свайп, ещё
+лежащий в буфере записи другого воркера (feed_write_buffer_enabled), и
+смена полей объявления, сделанная через другой воркер, — до пересборки
+очереди.
+"""
+import threading
+from collections import deque
+from collections.abc import Container, Iterable
+from itertools import islice
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+
+from ..cache import MemoryCache
+from ..config import settings
+from ..db import SessionLocal
+from ..models.feed_action import FeedAction
+from ..models.listing import Listing
+from ..serialization import LISTING_ROWS
+from .feed import get_preferences
+from .feed_writer import feed_action_buffer
+from .ranking import rank_candidates
+
+# поля, по которым apply_preference_filters отбирает кандидатов
+FILTER_FIELDS = ("city", "deal_type", "property_type", "price")
+
+
+def filter_values(listing) -> tuple:
+    return tuple(getattr(listing, field) for field in FILTER_FIELDS)
+
+
+def _head(ids: Iterable[int], limit: int, skip: Container[int]) -> list[int]:
+    return list(islice((lid for lid in ids if lid not in skip), limit))
+
+
+class FeedQueue:
+    def __init__(self, size: int, refill_threshold: int, max_users: int, ttl: float | None = None):
+        self.size = size
+        self.refill_threshold = refill_threshold
+
+        # str(user_id) -> deque id; deque меняется на месте под self._lock
+        self._queues = MemoryCache(max_size=max_users, ttl=ttl)
+        # id, просмотренные пока шла пересборка очереди (чтобы не вернуть их обратно)
+        self._seen_during_build: dict[int, set[int]] = {}
+        self._lock = threading.Lock()
+
+    def head(self, user_id: int, limit: int, skip: Container[int] = ()) -> list[int]:
+        """
+        Первые limit id очереди не из skip (очередь не меняется).
+        """
+        with self._lock:
+            return _head(self._queues.get(str(user_id)) or (), limit, skip)
+
+    def begin_build(self, user_id: int) -> bool:
+        """
+        Отмечает начало пересборки. False — пересборка уже идёт.
+        """
+        with self._lock:
+            if user_id in self._seen_during_build:
+                return False
+            self._seen_during_build[user_id] = set()
+            return True
+
+    def fill(self, user_id: int, listing_ids: list[int]) -> None:
+        with self._lock:
+            seen = self._seen_during_build.pop(user_id, set())
+            self._queues.set(
+                str(user_id), deque(lid for lid in listing_ids if lid not in seen)
+            )
+
+    def cancel_build(self, user_id: int) -> None:
+        with self._lock:
+            self._seen_during_build.pop(user_id, None)
+
+    def mark_seen(self, user_id: int, listing_id: int) -> bool:
+        """
+        Убирает объявление из очереди пользователя.
+        Возвращает True, если очередь пора пополнить.
+        """
+        with self._lock:
+            building = self._seen_during_build.get(user_id)
+            if building is not None:
+                building.add(listing_id)
+
+            queue = self._queues.get(str(user_id))
+            if queue is None:
+                return False
+
+            if queue and queue[0] == listing_id:
+                queue.popleft()
+            else:
+                try:
+                    queue.remove(listing_id)
+                except ValueError:
+                    pass
+
+            return len(queue) < self.refill_threshold and building is None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._queues.clear()
+            self._seen_during_build.clear()
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._queues.delete(str(user_id))
+
+    def discard_listing(self, listing_id: int) -> None:
+        """
+        Объявление деактивировано или сменило поля фильтра — убираем его
+        из всех очередей этого процесса.
+        """
+        with self._lock:
+            for queue in self._queues.values():
+                try:
+                    queue.remove(listing_id)
+                except ValueError:
+                    pass
+
+
+feed_queue = FeedQueue(
+    size=settings.feed_queue_size,
+    refill_threshold=settings.feed_queue_refill_threshold,
+    max_users=settings.feed_queue_max_users,
+    ttl=settings.feed_queue_ttl_seconds,
+)
+
+
+def build_queue(db: Session, user_id: int, size: int | None = None) -> list[int]:
+    """
+    Пересобирает очередь (не короче size) и возвращает свежих кандидатов.
+    Если пересборка уже идёт в другом потоке — просто возвращает кандидатов.
+    """
+    owner = feed_queue.begin_build(user_id)
+    try:
+        pref = get_preferences(db, user_id)
+        # свайпы, ещё лежащие в буфере записи, в БД пока не видны
+        pending = feed_action_buffer.pending_listing_ids(user_id)
+        ids = rank_candidates(
+            db, user_id, pref, limit=max(feed_queue.size, size or 0), exclude=pending
+        )
+    except Exception:
+        if owner:
+            feed_queue.cancel_build(user_id)
+        raise
+    if owner:
+        feed_queue.fill(user_id, ids)
+    return ids
+
+
+def refill_queue(user_id: int) -> None:
+    """
+    Фоновая пересборка очереди (через BackgroundTasks) в своей сессии.
+    """
+    db = SessionLocal()
+    try:
+        build_queue(db, user_id)
+    finally:
+        db.close()
+
+
+def _live_rows(db: Session, user_id: int, listing_ids: list[int]) -> dict:
+    """
+    id -> строка LISTING_ROWS для тех из listing_ids, что ещё активны
+    и не свайпнуты пользователем (свайп мог прийти через другой воркер).
+    """
+    rows = (
+        db.query(*LISTING_ROWS.columns)
+        .filter(Listing.id.in_(listing_ids), Listing.is_active.is_(True))
+        .filter(
+            ~exists().where(
+                FeedAction.user_id == user_id,
+                FeedAction.listing_id == Listing.id,
+            )
+        )
+        .all()
+    )
+    return {row.id: row for row in rows}
+
+
+def next_listings(db: Session, user_id: int, limit: int, skip: Iterable[int] = ()) -> list:
+    """
+    До limit строк LISTING_ROWS с головы очереди пользователя в её порядке,
+    не считая id из skip. Очередь, где их не хватает, один раз
+    пересобирается синхронно.
+    """
+    skip = set(skip)
+    rows = []
+    candidates = None  # кандидаты пересборки, если очередь собирал другой поток
+    while len(rows) < limit:
+        need = limit - len(rows)
+        if candidates is None:
+            ids = feed_queue.head(user_id, need, skip)
+            if len(ids) < need:
+                candidates = build_queue(db, user_id, size=len(skip) + limit)
+                continue
+        else:
+            ids = feed_queue.head(user_id, need, skip) or _head(candidates, need, skip)
+        if not ids:
+            break
+
+        live = _live_rows(db, user_id, ids)
+        for listing_id in ids:
+            skip.add(listing_id)
+            if listing_id in live:
+                rows.append(live[listing_id])
+            else:
+                # объявление успели удалить/деактивировать/свайпнуть — выкидываем
+                feed_queue.mark_seen(user_id, listing_id)
+    return rows
+
+
+def next_listing(db: Session, user_id: int, skip: Iterable[int] = ()):
+    """
+    Голова очереди пользователя (строка с колонками LISTING_ROWS, не сущность),
+    не считая id из skip.
+    """
+    rows = next_listings(db, user_id, 1, skip)
+    return rows[0] if rows else None
@@ -0,0 +1,307 @@
+"""
+Пакетная запись свайпов (feed_actions) и их побочных эффектов.
+
+Вместо INSERT + SELECT-проверок на каждое действие пачка событий пишется
+фиксированным числом многострочных запросов, независимо от её размера:
+- INSERT в feed_actions;
+- SELECT владельцев лайкнутых объявлений;
+- INSERT в favorites ... ON CONFLICT DO NOTHING (uq_favorites_user_listing);
+- INSERT в leads ... ON CONFLICT DO NOTHING (uq_leads_tenant_listing)
+  + уведомление владельцев о новых лидах.
+
+Побочные эффекты идемпотентны. С FEED_SIDE_EFFECTS=queue они выполняются
+фоновой задачей "feed.side_effects" (services.jobs), а в запросе остаётся
+только INSERT в feed_actions.
+
+FeedActionBuffer (settings.feed_write_buffer_enabled) копит действия из
+/feed/action в памяти процесса и сбрасывает их фоновым потоком раз в
+feed_write_flush_ms или по набору feed_write_batch_size штук.
+"""
+import logging
+import threading
+from collections import deque
+
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models.favorite import Favorite
+from ..models.feed_action import FeedAction
+from ..models.lead import Lead
+from ..models.listing import Listing
+from ..schemas import FeedActionCreate
+from .jobs import job_handler, job_queue
+from .notifications import notify_new_leads
+from .seen_sets import add_seen
+
+logger = logging.getLogger(__name__)
+
+FeedEvent = tuple[int, FeedActionCreate]  # (user_id, действие)
+
+SIDE_EFFECTS_JOB = "feed.side_effects"
+
+
+def _insert(db: Session, model):
+    dialect = db.get_bind().dialect.name
+    return (postgresql.insert if dialect == "postgresql" else sqlite.insert)(model)
+
+
+def write_feed_actions(db: Session, events: list[FeedEvent]) -> None:
+    """
+    Добавляет пачку действий и их побочные эффекты (без commit).
+    С FEED_SIDE_EFFECTS=queue эффекты ставятся задачей в той же транзакции.
+    """
+    if not events:
+        return
+
+    insert_feed_actions(db, events)
+
+    effects = [(u, a) for u, a in events if a.action in ("favorite", "like")]
+    if not effects:
+        return
+    if settings.feed_side_effects == "queue":
+        job_queue.enqueue(
+            db,
+            SIDE_EFFECTS_JOB,
+            {"events": [[u, a.listing_id, a.action] for u, a in effects]},
+        )
+    else:
+        apply_feed_side_effects(db, effects)
+
+
+def insert_feed_actions(db: Session, events: list[FeedEvent]) -> None:
+    db.execute(
+        _insert(db, FeedAction),
+        [
+            {
+                "user_id": user_id,
+                "listing_id": a.listing_id,
+                "action": a.action,
+                "source": a.source,
+            }
+            for user_id, a in events
+        ],
+    )
+    if settings.feed_seen_set_enabled:
+        add_seen(db, [(user_id, a.listing_id) for user_id, a in events])
+
+
+def apply_feed_side_effects(db: Session, events: list[FeedEvent]) -> None:
+    """
+    - favorite -> избранное (если ещё нет)
+    - like -> лид владельцу объявления (если ещё нет) + уведомление владельца
+    Повторный вызов с теми же событиями ничего не меняет.
+    """
+    favorites = {(u, a.listing_id) for u, a in events if a.action == "favorite"}
+    if favorites:
+        insert_favorites(db, [{"user_id": u, "listing_id": lid} for u, lid in sorted(favorites)])
+
+    likes = {(u, a.listing_id) for u, a in events if a.action == "like"}
+    if likes:
+        owners = dict(
+            db.execute(
+                select(Listing.id, Listing.owner_id).where(
+                    Listing.id.in_({lid for _, lid in likes})
+                )
+            ).all()
+        )
+        inserted = insert_leads(
+            db,
+            [
+                {
+                    "tenant_id": u,
+                    "listing_id": lid,
+                    "owner_id": owners.get(lid),
+                    "status": "new",
+                }
+                for u, lid in sorted(likes)
+            ],
+        )
+        notify_new_leads(db, inserted)
+
+
+def insert_favorites(db: Session, rows: list[dict]) -> None:
+    """
+    INSERT в favorites; пары, которые уже в избранном, пропускаются.
+    """
+    db.execute(
+        _insert(db, Favorite).on_conflict_do_nothing(
+            index_elements=[Favorite.user_id, Favorite.listing_id]
+        ),
+        rows,
+    )
+
+
+def insert_leads(db: Session, rows: list[dict]) -> list[dict]:
+    """
+    INSERT в leads; пары арендатор/объявление, по которым лид уже есть,
+    пропускаются. -> только реально вставленные лиды (RETURNING).
+    """
+    inserted = db.execute(
+        _insert(db, Lead)
+        .on_conflict_do_nothing(index_elements=[Lead.tenant_id, Lead.listing_id])
+        .returning(Lead.id, Lead.tenant_id, Lead.listing_id, Lead.owner_id),
+        rows,
+    )
+    return [row._asdict() for row in inserted]
+
+
+@job_handler(SIDE_EFFECTS_JOB)
+def run_side_effects_job(db: Session, payload: dict) -> None:
+    apply_feed_side_effects(
+        db,
+        [
+            (user_id, FeedActionCreate(listing_id=listing_id, action=action))
+            for user_id, listing_id, action in payload["events"]
+        ],
+    )
+
+
+class FeedActionBuffer:
+    """
+    Буфер записи свайпов: add() кладёт событие в память, фоновый поток
+    пишет накопленное одной транзакцией через write_feed_actions.
+
+    Цена — до flush_interval задержки и потеря несброшенного буфера при
+    падении процесса (при штатной остановке stop() дописывает остаток).
+    БД недоступна — пачка возвращается в буфер и пишется повторно (сверх
+    max_pending событий самые старые отбрасываются). Пачку отвергла сама
+    БД — события пишутся по одному, отвергнутые отбрасываются.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._events: deque[FeedEvent] = deque()
+        # ещё не записанные в БД (user_id -> listing_id -> число событий),
+        # чтобы пересборка очереди ленты не вернула их обратно
+        self._pending: dict[int, dict[int, int]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self.flushed = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="feed-action-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def add(self, user_id: int, action_in: FeedActionCreate) -> None:
+        with self._lock:
+            self._events.append((user_id, action_in))
+            seen = self._pending.setdefault(user_id, {})
+            seen[action_in.listing_id] = seen.get(action_in.listing_id, 0) + 1
+            while len(self._events) > self.max_pending:
+                self._forget(*self._events.popleft())
+                self.dropped += 1
+            if len(self._events) >= self.batch_size:
+                self._wakeup.set()
+
+    def pending_listing_ids(self, user_id: int) -> set[int]:
+        with self._lock:
+            return set(self._pending.get(user_id, ()))
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def flush(self) -> int:
+        """
+        Пишет всё накопленное пачками по batch_size. -> число записанных событий.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [
+                        self._events.popleft()
+                        for _ in range(min(self.batch_size, len(self._events)))
+                    ]
+                if not batch:
+                    return written
+
+                try:
+                    self._write(batch)
+                except OperationalError:
+                    logger.exception("feed action buffer: flush of %d events failed", len(batch))
+                    with self._lock:
+                        self._events.extendleft(reversed(batch))
+                    return written
+                except DBAPIError:
+                    logger.exception("feed action buffer: batch rejected, writing one by one")
+                    batch = self._write_each(batch)
+
+                with self._lock:
+                    for event in batch:
+                        self._forget(*event)
+                self.flushed += len(batch)
+                written += len(batch)
+
+    def _write(self, batch: list[FeedEvent]) -> None:
+        db = SessionLocal()
+        try:
+            write_feed_actions(db, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_each(self, batch: list[FeedEvent]) -> list[FeedEvent]:
+        written = []
+        for event in batch:
+            try:
+                self._write([event])
+                written.append(event)
+            except DBAPIError:
+                logger.exception("feed action buffer: dropping event %r", event)
+                with self._lock:
+                    self._forget(*event)
+                self.dropped += 1
+        return written
+
+    def _forget(self, user_id: int, action_in: FeedActionCreate) -> None:
+        seen = self._pending.get(user_id)
+        if seen is None:
+            return
+        left = seen.get(action_in.listing_id, 0) - 1
+        if left > 0:
+            seen[action_in.listing_id] = left
+        else:
+            seen.pop(action_in.listing_id, None)
+            if not seen:
+                del self._pending[user_id]
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+feed_action_buffer = FeedActionBuffer(
+    batch_size=settings.feed_write_batch_size,
+    flush_interval=settings.feed_write_flush_ms / 1000,
+    max_pending=settings.feed_write_max_pending,
+)
@@ -0,0 +1,299 @@
+"""
+Фоновые задачи: очередь в памяти процесса или в таблице jobs.
+
+Задача — (kind, payload) с обработчиком, зарегистрированным через
+@job_handler(kind). Обработчик получает свою сессию и должен быть
+идемпотентным: при ошибке задача повторяется с экспоненциальной паузой,
+до job_max_attempts раз.
+
+enqueue(db, kind, payload) привязывает задачу к транзакции db:
+- memory: задача уходит воркерам после commit (при rollback — теряется);
+  пропадает и при падении процесса;
+- db: строка в jobs пишется в той же транзакции, что и данные, и
+  переживает рестарт; воркеры всех процессов разбирают таблицу через
+  SELECT ... FOR UPDATE SKIP LOCKED.
+
+Воркеры — asyncio-задачи в цикле событий приложения; сами обработчики
+синхронные и выполняются в потоках (asyncio.to_thread).
+"""
+import asyncio
+import logging
+from collections.abc import Callable
+from datetime import timedelta
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..db import SessionLocal, engine
+from ..models.job import Job, utcnow
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, dict], None]
+
+JOB_HANDLERS: dict[str, JobHandler] = {}
+
+# задачи, поставленные в ещё не закоммиченной транзакции сессии
+PENDING_JOBS_KEY = "pending_jobs"
+
+
+def job_handler(kind: str):
+    def register(fn: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = fn
+        return fn
+
+    return register
+
+
+def run_job(kind: str, payload: dict) -> None:
+    """
+    Выполняет задачу в своей сессии и коммитит.
+    """
+    db = SessionLocal()
+    try:
+        JOB_HANDLERS[kind](db, payload)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def retry_delay(attempts: int) -> float:
+    return settings.job_retry_base_seconds * 2 ** (attempts - 1)
+
+
+class MemoryJobQueue:
+    backend = "memory"
+
+    def __init__(self, workers: int, max_attempts: int):
+        self.workers = workers
+        self.max_attempts = max_attempts
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._delayed = 0
+        self._in_flight = 0
+
+        self.processed = 0
+        self.retried = 0
+        self.dead = 0
+
+    def enqueue(self, db: Session, kind: str, payload: dict) -> None:
+        db.info.setdefault(PENDING_JOBS_KEY, []).append((kind, payload))
+
+    def submit(self, jobs: list[tuple[str, dict]]) -> None:
+        """
+        Передаёт закоммиченные задачи воркерам (из любого потока).
+        Без запущенных воркеров (скрипты, миграции) выполняет их сразу.
+        """
+        if self._loop is None:
+            for kind, payload in jobs:
+                run_job(kind, payload)
+            return
+        for kind, payload in jobs:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, (kind, payload, 0))
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        if self._loop is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("job queue: stopped with %d jobs left", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "depth": (self._queue.qsize() if self._queue else 0) + self._delayed,
+            "in_flight": self._in_flight,
+            "processed": self.processed,
+            "retried": self.retried,
+            "dead": self.dead,
+        }
+
+    def _retry(self, job: tuple[str, dict, int]) -> None:
+        self._delayed -= 1
+        self._queue.put_nowait(job)
+
+    async def _worker(self) -> None:
+        while True:
+            kind, payload, attempts = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await asyncio.to_thread(run_job, kind, payload)
+                self.processed += 1
+            except Exception:
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    self.dead += 1
+                    logger.exception("job %s failed %d times, dropping", kind, attempts)
+                else:
+                    self.retried += 1
+                    self._delayed += 1
+                    logger.warning("job %s failed (attempt %d), retrying", kind, attempts)
+                    self._loop.call_later(
+                        retry_delay(attempts), self._retry, (kind, payload, attempts)
+                    )
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+
+
+class DbJobQueue:
+    backend = "db"
+
+    def __init__(self, workers: int, max_attempts: int, batch_size: int, poll_interval: float):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+        self._tasks: list[asyncio.Task] = []
+
+        self.processed = 0
+        self.retried = 0
+
+    def enqueue(self, db: Session, kind: str, payload: dict) -> None:
+        db.add(Job(kind=kind, payload=payload))
+        db.info.setdefault(PENDING_JOBS_KEY, []).append((kind, None))
+
+    def submit(self, jobs: list[tuple[str, dict]]) -> None:
+        # задачи уже в таблице — только будим локальных воркеров
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        # без FOR UPDATE SKIP LOCKED (SQLite) два воркера возьмут одну задачу
+        workers = self.workers if engine.dialect.name == "postgresql" else 1
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(workers)]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        if self._loop is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._tasks = []
+        self._loop = None
+
+    def run_batch(self) -> int:
+        """
+        Забирает до batch_size готовых задач и выполняет их в одной транзакции,
+        каждую в своём SAVEPOINT. -> число взятых задач.
+        """
+        db = SessionLocal()
+        try:
+            jobs = (
+                db.query(Job)
+                .filter(Job.status == "queued", Job.run_after <= utcnow())
+                .order_by(Job.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for job in jobs:
+                try:
+                    with db.begin_nested():
+                        JOB_HANDLERS[job.kind](db, job.payload)
+                    db.delete(job)
+                    self.processed += 1
+                except Exception as e:
+                    job.attempts += 1
+                    job.last_error = repr(e)[:2000]
+                    if job.attempts >= self.max_attempts:
+                        job.status = "dead"
+                        logger.error("job %s #%s failed %d times: %r", job.kind, job.id, job.attempts, e)
+                    else:
+                        job.run_after = utcnow() + timedelta(seconds=retry_delay(job.attempts))
+                        self.retried += 1
+            db.commit()
+            return len(jobs)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        db = SessionLocal()
+        try:
+            counts = dict(
+                db.query(Job.status, func.count()).group_by(Job.status).all()
+            )
+        finally:
+            db.close()
+        return {
+            "backend": self.backend,
+            "depth": counts.get("queued", 0),
+            "processed": self.processed,
+            "retried": self.retried,
+            "dead": counts.get("dead", 0),
+        }
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            try:
+                taken = await asyncio.to_thread(self.run_batch)
+            except Exception:
+                logger.exception("job queue: batch failed")
+                taken = 0
+            if taken < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+
+def create_job_queue() -> MemoryJobQueue | DbJobQueue:
+    if settings.job_queue_backend == "db":
+        return DbJobQueue(
+            workers=settings.job_workers,
+            max_attempts=settings.job_max_attempts,
+            batch_size=settings.job_batch_size,
+            poll_interval=settings.job_poll_interval_ms / 1000,
+        )
+    if settings.job_queue_backend == "memory":
+        return MemoryJobQueue(
+            workers=settings.job_workers,
+            max_attempts=settings.job_max_attempts,
+        )
+    raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {settings.job_queue_backend}")
+
+
+job_queue = create_job_queue()
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_pending_jobs(session: Session) -> None:
+    jobs = session.info.pop(PENDING_JOBS_KEY, None)
+    if jobs:
+        job_queue.submit(jobs)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending_jobs(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_JOBS_KEY, None)
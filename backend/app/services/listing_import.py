@@ -0,0 +1,275 @@
+"""
+Массовый импорт объявлений (CSV / NDJSON) от партнёров.
+
+Строки читаются потоком, валидируются через ListingCreate пачками по
+chunk_size и загружаются одной операцией на пачку:
+- PostgreSQL: COPY во временную таблицу, затем UPDATE ... FROM для уже
+  импортированных external_id и INSERT ... SELECT остальных (INSERT ...
+  ON CONFLICT DO UPDATE тратил бы значение sequence id и на обновления);
+- остальные БД: многострочный INSERT ... ON CONFLICT.
+Если у строки есть external_id, повторный импорт обновляет объявление
+(ключ — owner_id + external_id), иначе строка просто вставляется.
+id загруженных объявлений пачки уходят одной задачей на оповещение
+подписчиков (services.matching).
+"""
+import csv
+import io
+import json
+from typing import Iterable, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.listing import Listing
+from ..schemas import ListingCreate, ListingImportResult
+from .matching import enqueue_listing_matches
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_COLUMNS = (
+    "external_id",
+    "title",
+    "city",
+    "deal_type",
+    "property_type",
+    "price",
+    "is_active",
+)
+UPDATE_COLUMNS = IMPORT_COLUMNS[1:]
+
+FORMATS = ("csv", "ndjson")
+
+
+def detect_format(content_type: str | None) -> str | None:
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "json" in content_type:
+        return "ndjson"
+    return None
+
+
+def validate_rows(
+    rows: Iterable[tuple[int, dict | Exception]],
+) -> tuple[list[dict], list[dict]]:
+    """
+    -> (валидные строки для загрузки, ошибки {row, error}).
+    Дубли external_id внутри пачки схлопываются — побеждает последняя строка.
+    """
+    valid: dict[object, dict] = {}
+    errors = []
+    for number, row in rows:
+        if isinstance(row, Exception):
+            errors.append({"row": number, "error": str(row)})
+            continue
+        try:
+            item = ListingCreate.model_validate(row)
+        except ValidationError as e:
+            errors.append({"row": number, "error": _format_validation_error(e)})
+            continue
+        values = item.model_dump(include=set(IMPORT_COLUMNS))
+        key = values["external_id"] if values["external_id"] is not None else ("row", number)
+        valid.pop(key, None)
+        valid[key] = values
+    return list(valid.values()), errors
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+
+def load_chunk(db: Session, owner_id: int, rows: list[dict]) -> int:
+    """
+    Загружает пачку провалидированных строк и коммитит. -> число строк.
+    """
+    if not rows:
+        return 0
+    if db.get_bind().dialect.name == "postgresql" and _copy_supported(db):
+        ids = _copy_upsert(db, owner_id, rows)
+    else:
+        ids = _insert_upsert(db, owner_id, rows)
+    enqueue_listing_matches(db, ids)
+    db.commit()
+    return len(rows)
+
+
+def _copy_supported(db: Session) -> bool:
+    raw = db.connection().connection.dbapi_connection
+    with raw.cursor() as cursor:
+        return hasattr(cursor, "copy_expert")  # psycopg2
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _stage_columns_ddl(db: Session) -> str:
+    # только загружаемые колонки и без DEFAULT: nextval для id не вызывается
+    dialect = db.get_bind().dialect
+    return ", ".join(
+        f"{c} {Listing.__table__.c[c].type.compile(dialect=dialect)}" for c in IMPORT_COLUMNS
+    )
+
+
+def _copy_upsert(db: Session, owner_id: int, rows: list[dict]) -> list[int]:
+    columns = ", ".join(IMPORT_COLUMNS)
+    db.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS listing_import_stage "
+        f"({_stage_columns_ddl(db)}) ON COMMIT DELETE ROWS"
+    ))
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row[c]) for c in IMPORT_COLUMNS))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    raw = db.connection().connection.dbapi_connection
+    with raw.cursor() as cursor:
+        cursor.copy_expert(f"COPY listing_import_stage ({columns}) FROM STDIN", buffer)
+
+    # уже импортированные — обновляем на месте
+    stage_updates = ", ".join(f"{c} = s.{c}" for c in UPDATE_COLUMNS)
+    updated = db.execute(
+        text(
+            f"UPDATE listings AS l SET {stage_updates}, updated_at = now() "
+            f"FROM listing_import_stage AS s "
+            f"WHERE l.owner_id = :owner_id AND l.external_id = s.external_id "
+            f"RETURNING l.id, l.is_active"
+        ),
+        {"owner_id": owner_id},
+    ).all()
+
+    # новые; ON CONFLICT — на случай параллельного импорта того же external_id
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in UPDATE_COLUMNS)
+    inserted = db.execute(
+        text(
+            f"INSERT INTO listings (owner_id, {columns}) "
+            f"SELECT :owner_id, {columns} FROM listing_import_stage AS s "
+            f"WHERE s.external_id IS NULL OR NOT EXISTS ("
+            f"SELECT 1 FROM listings AS l "
+            f"WHERE l.owner_id = :owner_id AND l.external_id = s.external_id) "
+            f"ON CONFLICT ON CONSTRAINT uq_listings_owner_external_id "
+            f"DO UPDATE SET {updates}, updated_at = now() "
+            f"RETURNING id, is_active"
+        ),
+        {"owner_id": owner_id},
+    ).all()
+    return [row.id for row in [*updated, *inserted] if row.is_active]
+
+
+def _insert_upsert(db: Session, owner_id: int, rows: list[dict]) -> list[int]:
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    stmt = insert(Listing).values([{**row, "owner_id": owner_id} for row in rows])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Listing.owner_id, Listing.external_id],
+        set_={
+            **{c: getattr(stmt.excluded, c) for c in UPDATE_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+    result = db.execute(stmt.returning(Listing.id, Listing.is_active))
+    return [row.id for row in result if row.is_active]
+
+
+class ListingImporter:
+    """
+    Потоковый импорт: строки подаются порциями через add_lines(),
+    полные пачки загружаются сразу, хвост — в finish().
+    CSV: первая строка — заголовок, одна запись на строку.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        owner_id: int,
+        fmt: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported import format: {fmt}")
+        self.db = db
+        self.owner_id = owner_id
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+
+        self._header: list[str] | None = None
+        self._chunk: list[tuple[int, dict | Exception]] = []
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+
+    def add_lines(self, lines: Iterable[str]) -> None:
+        for row in self._parse(lines):
+            self.processed += 1
+            self._chunk.append((self.processed, row))
+            if len(self._chunk) >= self.chunk_size:
+                self._flush()
+
+    def finish(self) -> ListingImportResult:
+        self._flush()
+        return ListingImportResult(
+            processed=self.processed,
+            imported=self.imported,
+            failed=self.failed,
+            errors=self.errors,
+        )
+
+    def _parse(self, lines: Iterable[str]) -> Iterator[dict | Exception]:
+        if self.fmt == "ndjson":
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield e
+                    continue
+                yield row if isinstance(row, dict) else ValueError("expected a JSON object")
+            return
+
+        for values in csv.reader(lines):
+            if not values:
+                continue
+            if self._header is None:
+                self._header = [name.strip() for name in values]
+                continue
+            if len(values) != len(self._header):
+                yield ValueError(f"expected {len(self._header)} columns, got {len(values)}")
+                continue
+            # пустая ячейка CSV = поле не задано
+            yield {k: v for k, v in zip(self._header, values) if v != ""}
+
+    def _flush(self) -> None:
+        if not self._chunk:
+            return
+        chunk, self._chunk = self._chunk, []
+
+        valid, errors = validate_rows(chunk)
+        self.failed += len(errors)
+        try:
+            self.imported += load_chunk(self.db, self.owner_id, valid)
+        except Exception as e:
+            self.db.rollback()
+            self.failed += len(valid)
+            first, last = chunk[0][0], chunk[-1][0]
+            errors.append({"row": first, "error": f"rows {first}-{last} not loaded: {e}"})
+        self.errors.extend(errors[: max(0, MAX_REPORTED_ERRORS - len(self.errors))])
@@ -0,0 +1,445 @@
+"""
+Колоночный индекс активных объявлений в памяти процесса.
+
+Лента фильтрует объявления по city / deal_type / property_type / цене из
+TenantPreference. Активных объявлений — сотни тысяч, они целиком
+помещаются в память, поэтому с LISTING_INDEX_ENABLED процесс держит их
+колонками NumPy:
+
+- city, deal_type, property_type — коды словаря (int16), строка
+  предпочтения переводится в код один раз на запрос;
+- price, created_at — float64;
+- active — маска; деактивированное объявление остаётся «дыркой» на своей
+  позиции (её же займёт, если объявление вернут).
+
+Позиции идут в порядке добавления, то есть почти по created_at: полная
+загрузка сортирует, новые объявления дописываются в конец. Колонка
+created_max (максимум created_at на позициях до текущей включительно)
+позволяет искать «N самых свежих под фильтром» с конца порциями: как
+только N-е найденное свежее всего, что осталось левее, поиск окончен.
+Обычный запрос ленты смотрит несколько тысяч последних позиций, а не весь
+индекс.
+
+Запросы к listings за кандидатами не нужны; просмотренные пользователем id
+даёт services.seen_sets.
+
+Актуальность: роуты create/update/delete применяют изменение к индексу
+своего процесса сразу после commit, а изменения из других воркеров и
+импорта догружаются по listings.updated_at раз в
+listing_index_refresh_seconds. Полная загрузка — на старте приложения.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.listing import Listing
+from ..models.preferences import TenantPreference
+
+logger = logging.getLogger(__name__)
+
+INDEX_COLUMNS = (
+    Listing.id,
+    Listing.city,
+    Listing.deal_type,
+    Listing.property_type,
+    Listing.price,
+    Listing.created_at,
+    Listing.is_active,
+    Listing.updated_at,
+)
+
+# догрузка перечитывает изменения за столько до водяного знака:
+# транзакция с более ранним now() могла закоммититься после прошлой догрузки
+SYNC_OVERLAP = timedelta(seconds=30)
+
+INITIAL_CAPACITY = 1024
+# первая порция поиска с конца — не меньше стольких позиций
+MIN_SCAN_CHUNK = 1024
+CODE_DTYPE = np.int16
+
+COLUMN_FIELDS = ("ids", "city", "deal_type", "property_type", "price", "created_ts", "created_max", "active")
+
+
+class Dictionary:
+    """
+    Строка <-> небольшой целый код. Коды только добавляются.
+    """
+
+    def __init__(self):
+        self._codes: dict[str, int] = {}
+        self._values = np.empty(0, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._codes)
+            if code > np.iinfo(CODE_DTYPE).max:
+                raise ValueError(f"Too many distinct values for listing index: {value!r}")
+            self._codes[value] = code
+            self._values = np.append(self._values, np.array([value], dtype=object))
+        return code
+
+    def lookup(self, value: str) -> int:
+        """
+        Код значения или -1, если такого значения нет ни у одного объявления.
+        """
+        return self._codes.get(value, -1)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self._values[codes]
+
+
+@dataclass
+class Columns:
+    """
+    Согласованный срез колонок индекса со словарями их кодов.
+    """
+
+    ids: np.ndarray            # int64
+    city: np.ndarray           # CODE_DTYPE
+    deal_type: np.ndarray      # CODE_DTYPE
+    property_type: np.ndarray  # CODE_DTYPE
+    price: np.ndarray          # float64
+    created_ts: np.ndarray     # float64, unix time
+    created_max: np.ndarray    # float64, max(created_ts[:i + 1])
+    active: np.ndarray         # bool
+    cities: Dictionary
+    deal_types: Dictionary
+    property_types: Dictionary
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def conditions(self, pref: TenantPreference | None, city_only: bool = False) -> list | None:
+        """
+        Фильтр предпочтений как [(колонка, сравнение, значение)];
+        None — под фильтр не подходит ни одно объявление.
+        """
+        if pref is None:
+            return []
+        conds = []
+        if pref.city:
+            conds.append((self.city, np.equal, self.cities.lookup(pref.city)))
+        if not city_only:
+            if pref.deal_type:
+                conds.append((self.deal_type, np.equal, self.deal_types.lookup(pref.deal_type)))
+            if pref.property_type:
+                conds.append((self.property_type, np.equal, self.property_types.lookup(pref.property_type)))
+        if any(op is np.equal and value < 0 for _, op, value in conds):
+            return None
+        if not city_only:
+            if pref.price_min is not None:
+                conds.append((self.price, np.greater_equal, float(pref.price_min)))
+            if pref.price_max is not None:
+                conds.append((self.price, np.less_equal, float(pref.price_max)))
+        return conds
+
+    def newest(self, conds: list | None, exclude: np.ndarray, limit: int) -> np.ndarray:
+        """
+        Позиции до `limit` самых свежих активных объявлений под фильтром
+        (created_at, id по убыванию), кроме exclude (отсортированные id).
+        """
+        n = len(self)
+        if conds is None or limit <= 0 or n == 0:
+            return np.zeros(0, dtype=np.int64)
+        found = []
+        count = 0
+        end = n
+        step = max(MIN_SCAN_CHUNK, 4 * limit)
+        while end > 0:
+            start = max(0, end - step)
+            window = slice(start, end)
+            mask = self.active[window].copy()
+            for column, op, value in conds:
+                mask &= op(column[window], value)
+            part = np.flatnonzero(mask) + start
+            if len(exclude) and len(part):
+                part = part[~_contains(exclude, self.ids[part])]
+            found.append(part)
+            count += len(part)
+            end = start
+            step *= 2
+            if count >= limit and end > 0:
+                # левее end нет ничего свежее created_max[end - 1]
+                slots = np.concatenate(found)
+                ts = self.created_ts[slots]
+                if self.created_max[end - 1] < np.partition(ts, len(ts) - limit)[len(ts) - limit]:
+                    break
+        slots = np.concatenate(found)
+        if len(slots) > limit:
+            ts = self.created_ts[slots]
+            slots = slots[ts >= np.partition(ts, len(ts) - limit)[len(ts) - limit]]
+        order = np.lexsort((-self.ids[slots], -self.created_ts[slots]))
+        return slots[order[:limit]]
+
+
+def _contains(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    pos = np.searchsorted(sorted_values, values)
+    pos[pos == len(sorted_values)] = 0
+    return sorted_values[pos] == values
+
+
+def _exclude_array(exclude: np.ndarray | None) -> np.ndarray:
+    if exclude is None:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(exclude)
+
+
+class ListingIndex:
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+
+        self._size = 0
+        self._slots: dict[int, int] = {}  # listing_id -> позиция в колонках
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._city = np.zeros(0, dtype=CODE_DTYPE)
+        self._deal_type = np.zeros(0, dtype=CODE_DTYPE)
+        self._property_type = np.zeros(0, dtype=CODE_DTYPE)
+        self._price = np.zeros(0, dtype=np.float64)
+        self._created_ts = np.zeros(0, dtype=np.float64)
+        self._created_max = np.zeros(0, dtype=np.float64)
+        self._active = np.zeros(0, dtype=bool)
+        self.cities = Dictionary()
+        self.deal_types = Dictionary()
+        self.property_types = Dictionary()
+
+        self._loaded = False
+        self._synced_until: datetime | None = None
+        self._checked_at: float | None = None
+        # _lock — изменения колонок; _sync_lock — одна загрузка из БД за раз
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._active[: self._size]))
+
+    # --- запись ---
+
+    def _grow(self, needed: int) -> None:
+        capacity = max(INITIAL_CAPACITY, len(self._ids))
+        while capacity < needed:
+            capacity *= 2
+        if capacity == len(self._ids):
+            return
+        # новые массивы, а не resize: читатели могут держать старые
+        for field in COLUMN_FIELDS:
+            name = f"_{field}"
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def _put(self, listing_id, city, deal_type, property_type, price, created_at, is_active) -> None:
+        created_ts = _timestamp(created_at)
+        slot = self._slots.get(listing_id)
+        if slot is None:
+            if not is_active:
+                return
+            self._grow(self._size + 1)
+            slot = self._slots[listing_id] = self._size
+            self._size += 1
+            self._ids[slot] = listing_id
+            self._created_max[slot] = max(self._created_max[slot - 1], created_ts) if slot else created_ts
+        elif created_ts > self._created_max[slot]:
+            # created_at не меняется, но если всё же сдвинулся вперёд — чиним максимум справа
+            tail = self._created_max[slot : self._size]
+            np.maximum(tail, created_ts, out=tail)
+        self._city[slot] = self.cities.encode(city)
+        self._deal_type[slot] = self.deal_types.encode(deal_type)
+        self._property_type[slot] = self.property_types.encode(property_type)
+        self._price[slot] = float(price)
+        self._created_ts[slot] = created_ts
+        self._active[slot] = bool(is_active)
+
+    def apply(self, listing: Listing) -> None:
+        """
+        Применяет созданное/изменённое/деактивированное объявление (после commit).
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            self._put(
+                listing.id, listing.city, listing.deal_type, listing.property_type,
+                listing.price, listing.created_at, listing.is_active,
+            )
+
+    def load(self, db: Session) -> None:
+        """
+        Полная загрузка активных объявлений (на старте), от старых к свежим.
+        """
+        started = time.perf_counter()
+        # водяной знак до чтения: изменения во время загрузки догрузятся ещё раз
+        synced_until = db.scalar(select(func.max(Listing.updated_at)))
+        rows = db.execute(
+            select(*INDEX_COLUMNS[:6])
+            .where(Listing.is_active.is_(True))
+            .order_by(Listing.created_at, Listing.id)
+        ).all()
+        n = len(rows)
+        ids, city, deal_type, property_type, price, created_at = zip(*rows) if n else ((),) * 6
+        cities, deal_types, property_types = Dictionary(), Dictionary(), Dictionary()
+        created_ts = np.fromiter(map(_timestamp, created_at), dtype=np.float64, count=n)
+        columns = {
+            "ids": np.fromiter(ids, dtype=np.int64, count=n),
+            "city": np.fromiter(map(cities.encode, city), dtype=CODE_DTYPE, count=n),
+            "deal_type": np.fromiter(map(deal_types.encode, deal_type), dtype=CODE_DTYPE, count=n),
+            "property_type": np.fromiter(map(property_types.encode, property_type), dtype=CODE_DTYPE, count=n),
+            "price": np.fromiter(map(float, price), dtype=np.float64, count=n),
+            "created_ts": created_ts,
+            "created_max": np.maximum.accumulate(created_ts) if n else created_ts,
+            "active": np.ones(n, dtype=bool),
+        }
+        capacity = max(INITIAL_CAPACITY, n)
+        with self._sync_lock, self._lock:
+            for field, values in columns.items():
+                column = np.zeros(capacity, dtype=values.dtype)
+                column[:n] = values
+                setattr(self, f"_{field}", column)
+            self._size = n
+            self._slots = dict(zip(ids, range(n)))
+            self.cities, self.deal_types, self.property_types = cities, deal_types, property_types
+            self._synced_until = synced_until
+            self._checked_at = time.monotonic()
+            self._loaded = True
+        logger.info(
+            "listing index: loaded %d listings in %.0f ms",
+            n, (time.perf_counter() - started) * 1000,
+        )
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        """
+        Догружает объявления, изменённые после прошлой загрузки.
+        Одновременно грузит один поток, остальные читают текущие колонки.
+        """
+        if not self._loaded:
+            return
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            stmt = select(*INDEX_COLUMNS).order_by(Listing.created_at, Listing.id)
+            if self._synced_until is not None:
+                stmt = stmt.where(Listing.updated_at > self._synced_until - SYNC_OVERLAP)
+            rows = db.execute(stmt).all()
+            latest = self._synced_until
+            with self._lock:
+                for row in rows:
+                    self._put(*row[:7])
+                    if row.updated_at is not None and (latest is None or row.updated_at > latest):
+                        latest = row.updated_at
+            self._synced_until = latest
+        finally:
+            self._sync_lock.release()
+
+    # --- чтение ---
+
+    def _snapshot(self) -> Columns:
+        # запись идёт на месте, а рост и полная загрузка заменяют массивы —
+        # берём срезы под замком
+        with self._lock:
+            n = self._size
+            return Columns(
+                **{field: getattr(self, f"_{field}")[:n] for field in COLUMN_FIELDS},
+                cities=self.cities,
+                deal_types=self.deal_types,
+                property_types=self.property_types,
+            )
+
+    def recent_ids(
+        self,
+        pref: TenantPreference | None,
+        limit: int,
+        exclude: np.ndarray | None = None,
+    ) -> list[int]:
+        """
+        То же, что feed.candidate_listing_ids, но по колонкам в памяти:
+        подходящие под предпочтения от свежих к старым, иначе — все активные.
+        """
+        cols = self._snapshot()
+        exclude = _exclude_array(exclude)
+        slots = cols.newest(cols.conditions(pref), exclude, limit)
+        if not len(slots) and pref is not None:
+            slots = cols.newest([], exclude, limit)
+        return cols.ids[slots].tolist()
+
+    def pool(
+        self,
+        pref: TenantPreference | None,
+        size: int,
+        exclude: np.ndarray | None = None,
+        extra_ids: list[int] | None = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Срезы ranking.candidate_pool (точные совпадения, город, свежие,
+        extra_ids) колонками: ids, city, deal_type, property_type, price, created_ts.
+        """
+        cols = self._snapshot()
+        exclude = _exclude_array(exclude)
+        if pref is None:
+            parts = [cols.newest([], exclude, size)]
+        else:
+            parts = [cols.newest(cols.conditions(pref), exclude, size)]
+            if pref.city:
+                parts.append(cols.newest(cols.conditions(pref, city_only=True), exclude, size))
+            parts.append(cols.newest([], exclude, max(1, size // 2)))
+        if extra_ids:
+            with self._lock:
+                extra = [s for s in map(self._slots.get, extra_ids) if s is not None and s < len(cols)]
+            extra = np.array(extra, dtype=np.int64)
+            extra = extra[cols.active[extra]]
+            if len(exclude):
+                extra = extra[~_contains(exclude, cols.ids[extra])]
+            parts.append(extra)
+
+        # без повторов, в порядке первого появления — как у candidate_pool
+        slots = np.concatenate(parts)
+        _, first = np.unique(slots, return_index=True)
+        slots = slots[np.sort(first)]
+        return {
+            "ids": cols.ids[slots],
+            "city": cols.cities.decode(cols.city[slots]),
+            "deal_type": cols.deal_types.decode(cols.deal_type[slots]),
+            "property_type": cols.property_types.decode(cols.property_type[slots]),
+            "price": cols.price[slots],
+            "created_ts": cols.created_ts[slots],
+        }
+
+    def stats(self) -> dict:
+        cols = self._snapshot()
+        return {
+            "loaded": self._loaded,
+            "active": int(np.count_nonzero(cols.active)),
+            "slots": len(cols),
+            "cities": len(cols.cities),
+            "memory_bytes": int(sum(getattr(cols, field).nbytes for field in COLUMN_FIELDS)),
+            "synced_until": self._synced_until.isoformat() if self._synced_until else None,
+        }
+
+
+def _timestamp(value: datetime | None) -> float:
+    if value is None:
+        return time.time()
+    if value.tzinfo is None:  # SQLite отдаёт naive UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+listing_index = ListingIndex(refresh_seconds=settings.listing_index_refresh_seconds)
+
@@ -0,0 +1,352 @@
+"""
+Обратный поиск: новое объявление -> арендаторы, чьим предпочтениям оно подходит.
+
+Лента находит объявление, только когда арендатор сам откроет /feed/next.
+С LISTING_ALERTS_ENABLED процесс держит в памяти обратный индекс по всем
+TenantPreference (PreferenceIndex):
+
+- корзины по (city, deal_type, property_type), None — «любой»; объявление
+  проверяет не больше 8 корзин (каждое поле — своё значение или None);
+- в корзине — статическое центрированное дерево интервалов цены
+  [price_min, price_max] (открытая граница — бесконечность); все
+  предпочтения, чей интервал содержит цену, находятся за
+  O(log n + совпадений), без просмотра остальных.
+
+Фильтр совпадает с feed.apply_preference_filters. Предпочтения без единого
+условия в индекс не попадают: им подходит любое объявление, это уже не
+подписка.
+
+Изменённая корзина перестраивается лениво, при следующем поиске в ней.
+Актуальность — как у listing_index: роут предпочтений применяет изменение
+к индексу своего процесса, остальное догружается по updated_at раз в
+listing_alerts_refresh_seconds.
+
+Поиск выполняет фоновая задача "listing.match" (services.jobs): её ставят
+в транзакции создания/изменения объявления и на каждую пачку импорта.
+Совпадения — минус владелец и уже свайпавшие объявление — уходят в
+notifications.notify_listing_matches.
+"""
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime
+from itertools import product
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.feed_action import FeedAction
+from ..models.listing import Listing
+from ..models.preferences import TenantPreference
+from .jobs import job_handler, job_queue
+from .listing_index import SYNC_OVERLAP
+from .notifications import notify_listing_matches
+
+logger = logging.getLogger(__name__)
+
+MATCH_JOB = "listing.match"
+
+# столько интервалов и меньше — лист дерева, проверяется перебором
+LEAF_SIZE = 32
+# совпадения уходят получателям пачками не больше этой
+NOTIFY_BATCH = 5_000
+
+PREFERENCE_COLUMNS = (
+    TenantPreference.user_id,
+    TenantPreference.city,
+    TenantPreference.deal_type,
+    TenantPreference.property_type,
+    TenantPreference.price_min,
+    TenantPreference.price_max,
+    TenantPreference.updated_at,
+)
+
+BucketKey = tuple[str | None, str | None, str | None]
+
+EMPTY = np.zeros(0, dtype=np.int64)
+
+
+class IntervalTree:
+    """
+    Статическое центрированное дерево интервалов [lo, hi] с их id.
+    Узел: центр, интервалы через центр (по возрастанию lo и по возрастанию
+    hi), левое и правое поддеревья. Лист — интервалы списком.
+    """
+
+    def __init__(self, ids: np.ndarray, lo: np.ndarray, hi: np.ndarray):
+        self.size = len(ids)
+        self._root = self._build(ids, lo, hi)
+
+    @classmethod
+    def _build(cls, ids, lo, hi):
+        if len(ids) <= LEAF_SIZE:
+            return ("leaf", ids, lo, hi)
+        ends = np.concatenate([lo, hi])
+        ends = ends[np.isfinite(ends)]
+        center = float(np.median(ends)) if len(ends) else 0.0
+        left = hi < center
+        right = lo > center
+        here = ~(left | right)
+        if not here.any() and (left.all() or right.all()):
+            return ("leaf", ids, lo, hi)
+        by_lo = np.argsort(lo[here], kind="stable")
+        by_hi = np.argsort(hi[here], kind="stable")
+        return (
+            "node",
+            center,
+            lo[here][by_lo], ids[here][by_lo],
+            hi[here][by_hi], ids[here][by_hi],
+            cls._build(ids[left], lo[left], hi[left]) if left.any() else None,
+            cls._build(ids[right], lo[right], hi[right]) if right.any() else None,
+        )
+
+    def stab(self, x: float) -> np.ndarray:
+        """
+        id всех интервалов, содержащих x.
+        """
+        found = []
+        node = self._root
+        while node is not None:
+            if node[0] == "leaf":
+                _, ids, lo, hi = node
+                found.append(ids[(lo <= x) & (hi >= x)])
+                break
+            _, center, lo_sorted, by_lo, hi_sorted, by_hi, left, right = node
+            if x < center:
+                # hi >= center > x у всех: подходят те, у кого lo <= x
+                found.append(by_lo[: np.searchsorted(lo_sorted, x, side="right")])
+                node = left
+            elif x > center:
+                found.append(by_hi[np.searchsorted(hi_sorted, x, side="left"):])
+                node = right
+            else:
+                found.append(by_lo)
+                break
+        return np.concatenate(found) if found else EMPTY
+
+
+class Bucket:
+    """
+    Предпочтения с одинаковыми (city, deal_type, property_type):
+    user_id -> (lo, hi) и дерево, перестраиваемое после изменений.
+    """
+
+    def __init__(self):
+        self.ranges: dict[int, tuple[float, float]] = {}
+        self.tree: IntervalTree | None = None
+
+    def build(self) -> IntervalTree:
+        n = len(self.ranges)
+        ids = np.fromiter(self.ranges, dtype=np.int64, count=n)
+        bounds = np.array(list(self.ranges.values()), dtype=np.float64).reshape(n, 2)
+        return IntervalTree(ids, bounds[:, 0], bounds[:, 1])
+
+
+def _bound(value, default: float) -> float:
+    return default if value is None else float(value)
+
+
+def _key(value: str | None) -> str | None:
+    # пустая строка в предпочтениях — «не важно», как в apply_preference_filters
+    return value or None
+
+
+class PreferenceIndex:
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+
+        self._buckets: dict[BucketKey, Bucket] = {}
+        self._user_bucket: dict[int, BucketKey] = {}
+
+        self._loaded = False
+        self._synced_until: datetime | None = None
+        self._checked_at: float | None = None
+        # _lock — корзины; _sync_lock — одна загрузка из БД за раз
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._user_bucket)
+
+    # --- запись ---
+
+    def _put(self, user_id, city, deal_type, property_type, price_min, price_max) -> None:
+        key = (_key(city), _key(deal_type), _key(property_type))
+        lo = _bound(price_min, -np.inf)
+        hi = _bound(price_max, np.inf)
+        old = self._user_bucket.pop(user_id, None)
+        if old is not None:
+            bucket = self._buckets[old]
+            del bucket.ranges[user_id]
+            bucket.tree = None
+            if not bucket.ranges:
+                del self._buckets[old]
+        if key == (None, None, None) and lo == -np.inf and hi == np.inf:
+            return  # без условий — не подписка
+        if lo > hi:
+            return  # пустой диапазон цен: в ленте тоже ничего не подойдёт
+        bucket = self._buckets.setdefault(key, Bucket())
+        bucket.ranges[user_id] = (lo, hi)
+        bucket.tree = None
+        self._user_bucket[user_id] = key
+
+    def apply(self, pref: TenantPreference) -> None:
+        """
+        Применяет созданные/изменённые предпочтения (после commit).
+        """
+        if not self._loaded:
+            return
+        with self._lock:
+            self._put(
+                pref.user_id, pref.city, pref.deal_type, pref.property_type,
+                pref.price_min, pref.price_max,
+            )
+
+    def load(self, db: Session) -> None:
+        """
+        Полная загрузка всех предпочтений.
+        """
+        started = time.perf_counter()
+        synced_until = db.scalar(select(func.max(TenantPreference.updated_at)))
+        # при дублях у пользователя действует первая строка, как в get_preferences
+        rows = db.execute(
+            select(*PREFERENCE_COLUMNS[:6]).order_by(TenantPreference.id.desc())
+        ).all()
+        with self._sync_lock, self._lock:
+            self._buckets, self._user_bucket = {}, {}
+            for row in rows:
+                self._put(*row)
+            self._synced_until = synced_until
+            self._checked_at = time.monotonic()
+            self._loaded = True
+        logger.info(
+            "preference index: loaded %d subscriptions in %d buckets in %.0f ms",
+            len(self._user_bucket), len(self._buckets), (time.perf_counter() - started) * 1000,
+        )
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        """
+        Загружает индекс при первом вызове, дальше догружает предпочтения,
+        изменённые после прошлой загрузки.
+        """
+        if not self._loaded:
+            self.load(db)
+            return
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            stmt = select(*PREFERENCE_COLUMNS).order_by(TenantPreference.id.desc())
+            if self._synced_until is not None:
+                stmt = stmt.where(TenantPreference.updated_at > self._synced_until - SYNC_OVERLAP)
+            rows = db.execute(stmt).all()
+            latest = self._synced_until
+            with self._lock:
+                for row in rows:
+                    self._put(*row[:6])
+                    if row.updated_at is not None and (latest is None or row.updated_at > latest):
+                        latest = row.updated_at
+            self._synced_until = latest
+        finally:
+            self._sync_lock.release()
+
+    # --- чтение ---
+
+    def _tree(self, key: BucketKey) -> IntervalTree | None:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return None
+            if bucket.tree is None:
+                bucket.tree = bucket.build()
+            return bucket.tree
+
+    def match(self, city: str, deal_type: str, property_type: str, price) -> np.ndarray:
+        """
+        user_id арендаторов, чьим предпочтениям подходит объявление.
+        """
+        price = float(price)
+        found = []
+        for key in product((city, None), (deal_type, None), (property_type, None)):
+            tree = self._tree(key)
+            if tree is not None:
+                found.append(tree.stab(price))
+        return np.concatenate(found) if found else EMPTY
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "subscriptions": len(self._user_bucket),
+                "buckets": len(self._buckets),
+                "largest_bucket": max((len(b.ranges) for b in self._buckets.values()), default=0),
+                "synced_until": self._synced_until.isoformat() if self._synced_until else None,
+            }
+
+
+preference_index = PreferenceIndex(refresh_seconds=settings.listing_alerts_refresh_seconds)
+
+
+# --- задача ---
+
+
+def enqueue_listing_matches(db: Session, listing_ids: list[int]) -> None:
+    """
+    Ставит поиск подписчиков для объявлений в транзакции db (до commit).
+    """
+    if settings.listing_alerts_enabled and listing_ids:
+        job_queue.enqueue(db, MATCH_JOB, {"listing_ids": list(listing_ids)})
+
+
+def iter_listing_matches(db: Session, listing_ids: list[int]) -> Iterator[list[dict]]:
+    """
+    По объявлению: [{"user_id", "listing_id"}] для активных объявлений из
+    listing_ids, без владельца и тех, кто объявление уже свайпал.
+    """
+    preference_index.refresh(db)
+    listings = db.execute(
+        select(
+            Listing.id, Listing.owner_id, Listing.city,
+            Listing.deal_type, Listing.property_type, Listing.price,
+        ).where(Listing.id.in_(listing_ids), Listing.is_active.is_(True))
+    ).all()
+    if not listings:
+        return
+    # обновлённое объявление могли уже видеть в ленте
+    seen: dict[int, set[int]] = {}
+    for user_id, listing_id in db.execute(
+        select(FeedAction.user_id, FeedAction.listing_id).where(
+            FeedAction.listing_id.in_([row.id for row in listings])
+        )
+    ):
+        seen.setdefault(listing_id, set()).add(user_id)
+
+    for row in listings:
+        users = preference_index.match(row.city, row.deal_type, row.property_type, row.price)
+        skip = seen.get(row.id, set())
+        yield [
+            {"user_id": user_id, "listing_id": row.id}
+            for user_id in users.tolist()
+            if user_id != row.owner_id and user_id not in skip
+        ]
+
+
+@job_handler(MATCH_JOB)
+def run_listing_match_job(db: Session, payload: dict) -> None:
+    batch: list[dict] = []
+    for matches in iter_listing_matches(db, payload["listing_ids"]):
+        batch.extend(matches)
+        if len(batch) >= NOTIFY_BATCH:
+            notify_listing_matches(db, batch)
+            batch = []
+    notify_listing_matches(db, batch)
@@ -0,0 +1,196 @@
+"""
+Уведомления пользователей.
+
+Лиды: notify_new_leads вызывает зарегистрированные через @notifier
+получатели (по умолчанию — только лог). Вызывается из обработчика
+побочных эффектов свайпа ровно для тех лидов, которые он действительно
+вставил, поэтому повтор задачи не дублирует уведомление о том же лиде.
+
+Новые объявления под предпочтения арендатора (services.matching):
+notify_listing_matches вызывает получатели @match_notifier. Встроенный —
+очередь listing_alerts для Telegram-бота: бот забирает пачку
+(claim_alerts, строки арендуются на listing_alerts_lease_seconds) и
+подтверждает отправку (ack_alerts). Не подтверждённое вовремя выдаётся
+снова, после listing_alerts_max_attempts попыток — status=failed.
+"""
+import logging
+from collections.abc import Callable
+from datetime import timedelta
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.job import utcnow
+from ..models.listing import Listing
+from ..models.listing_alert import ListingAlert
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+# лид: {"id", "tenant_id", "listing_id", "owner_id"}
+Notifier = Callable[[Session, list[dict]], None]
+
+NOTIFIERS: list[Notifier] = []
+
+# совпадение: {"user_id", "listing_id"}
+MATCH_NOTIFIERS: list[Notifier] = []
+
+ALERT_INSERT_CHUNK = 5_000
+
+
+def notifier(fn: Notifier) -> Notifier:
+    NOTIFIERS.append(fn)
+    return fn
+
+
+def match_notifier(fn: Notifier) -> Notifier:
+    MATCH_NOTIFIERS.append(fn)
+    return fn
+
+
+def notify_new_leads(db: Session, leads: list[dict]) -> None:
+    leads = [lead for lead in leads if lead["owner_id"] is not None]
+    if not leads:
+        return
+    for fn in NOTIFIERS:
+        fn(db, leads)
+
+
+def notify_listing_matches(db: Session, matches: list[dict]) -> None:
+    if not matches:
+        return
+    for fn in MATCH_NOTIFIERS:
+        fn(db, matches)
+
+
+@notifier
+def log_new_leads(db: Session, leads: list[dict]) -> None:
+    for lead in leads:
+        logger.info(
+            "new lead #%s: tenant %s -> listing %s (owner %s)",
+            lead["id"], lead["tenant_id"], lead["listing_id"], lead["owner_id"],
+        )
+
+
+# --- оповещения о новых объявлениях (Telegram) ---
+
+
+def _insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    return (postgresql.insert if dialect == "postgresql" else sqlite.insert)(ListingAlert)
+
+
+@match_notifier
+def queue_telegram_alerts(db: Session, matches: list[dict]) -> None:
+    """
+    Совпадения пользователей с Telegram -> listing_alerts (повторы пары
+    пользователь/объявление отбрасываются).
+    """
+    queued = 0
+    for start in range(0, len(matches), ALERT_INSERT_CHUNK):
+        chunk = matches[start:start + ALERT_INSERT_CHUNK]
+        reachable = set(
+            db.execute(
+                select(User.id).where(
+                    User.id.in_({m["user_id"] for m in chunk}),
+                    User.telegram_id.is_not(None),
+                    User.is_active.is_(True),
+                )
+            ).scalars()
+        )
+        rows = [
+            {"user_id": m["user_id"], "listing_id": m["listing_id"], "available_at": utcnow()}
+            for m in chunk
+            if m["user_id"] in reachable
+        ]
+        if rows:
+            db.execute(
+                _insert(db).on_conflict_do_nothing(
+                    index_elements=[ListingAlert.user_id, ListingAlert.listing_id]
+                ),
+                rows,
+            )
+            queued += len(rows)
+    logger.info("listing alerts: %d of %d matches queued for telegram", queued, len(matches))
+
+
+def claim_alerts(db: Session, limit: int) -> list[dict]:
+    """
+    Берёт до limit готовых к отправке оповещений в аренду (без commit).
+    -> [{"id", "telegram_id", "listing"}]. Оповещения о снятых объявлениях
+    и недоступных пользователях закрываются со status=skipped.
+    """
+    now = utcnow()
+    alerts = (
+        db.execute(
+            select(ListingAlert)
+            .where(ListingAlert.status == "pending", ListingAlert.available_at <= now)
+            .order_by(ListingAlert.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        .scalars()
+        .all()
+    )
+    if not alerts:
+        return []
+    listings = {
+        listing.id: listing
+        for listing in db.execute(
+            select(Listing).where(
+                Listing.id.in_({a.listing_id for a in alerts}),
+                Listing.is_active.is_(True),
+            )
+        ).scalars()
+    }
+    telegram_ids = dict(
+        db.execute(
+            select(User.id, User.telegram_id).where(
+                User.id.in_({a.user_id for a in alerts}),
+                User.telegram_id.is_not(None),
+                User.is_active.is_(True),
+            )
+        ).all()
+    )
+
+    lease_until = now + timedelta(seconds=settings.listing_alerts_lease_seconds)
+    claimed = []
+    for alert in alerts:
+        listing = listings.get(alert.listing_id)
+        telegram_id = telegram_ids.get(alert.user_id)
+        if listing is None or telegram_id is None:
+            alert.status = "skipped"
+        elif alert.attempts >= settings.listing_alerts_max_attempts:
+            # бот брал строку, но так и не подтвердил
+            alert.status = "failed"
+        else:
+            alert.attempts += 1
+            alert.available_at = lease_until
+            claimed.append({"id": alert.id, "telegram_id": telegram_id, "listing": listing})
+    return claimed
+
+
+def ack_alerts(db: Session, sent: list[int], failed: list[int]) -> None:
+    """
+    Итог отправки арендованных оповещений (без commit): sent закрываются,
+    failed выдаются снова после паузы (удваивается с каждой попыткой).
+    """
+    ids = set(sent) | set(failed)
+    if not ids:
+        return
+    now = utcnow()
+    sent = set(sent)
+    alerts = db.execute(
+        select(ListingAlert).where(ListingAlert.id.in_(ids), ListingAlert.status == "pending")
+    ).scalars()
+    for alert in alerts:
+        if alert.id in sent:
+            alert.status = "sent"
+            alert.sent_at = now
+        elif alert.attempts >= settings.listing_alerts_max_attempts:
+            alert.status = "failed"
+        else:
+            delay = settings.listing_alerts_lease_seconds * 2 ** (alert.attempts - 1)
+            alert.available_at = now + timedelta(seconds=delay)
@@ -0,0 +1,166 @@
+"""
+Keyset-пагинация по (created_at, id) с непрозрачным курсором.
+
+Курсор — base64(json) с позицией последней отданной строки; клиенту его
+разбирать не нужно, он просто передаёт его обратно в ?cursor=.
+
+У ленты (/feed/batch) порядок задаёт ранжирование, а не (created_at, id),
+поэтому её курсор — id уже выданных объявлений (encode_ids_cursor).
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Iterator, Literal
+
+from fastapi import HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query as ORMQuery
+
+from ..db import SessionLocal
+from ..serialization import RowSchema
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+STREAM_BATCH_SIZE = 500
+# SQLite хранит время строкой: server_default (CURRENT_TIMESTAMP) — без долей
+# секунды и через пробел, курсор — isoformat; сравниваем в одном формате
+SQLITE_TIME_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+
+def _encode(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor",
+    )
+
+
+def encode_cursor(created_at: datetime, row_id: int, **extra) -> str:
+    return _encode({"c": created_at.isoformat(), "i": row_id, **extra})
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        data = _decode(cursor)
+        data["c"] = datetime.fromisoformat(data["c"])
+        data["i"] = int(data["i"])
+        return data
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise _invalid_cursor()
+
+
+def encode_ids_cursor(ids: list[int], max_ids: int) -> str:
+    """
+    Курсор из id уже выданных строк (не больше max_ids последних).
+    """
+    return _encode({"s": ids[-max_ids:]})
+
+
+def decode_ids_cursor(cursor: str) -> list[int]:
+    try:
+        return [int(i) for i in _decode(cursor)["s"]]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise _invalid_cursor()
+
+
+def after_cursor(query: ORMQuery, created_col, id_col, cursor: dict | None) -> ORMQuery:
+    """
+    Строки строго после позиции курсора при сортировке (created_at DESC, id DESC).
+    """
+    if cursor is None:
+        return query
+    created = cursor["c"]
+    if query.session is not None and query.session.get_bind().dialect.name == "sqlite":
+        created_col = func.strftime(SQLITE_TIME_FORMAT, created_col)
+        created = func.strftime(SQLITE_TIME_FORMAT, created.isoformat(" "))
+    return query.filter(
+        tuple_(created_col, id_col) < tuple_(created, cursor["i"])
+    )
+
+
+class PageParams:
+    """
+    Общие query-параметры для списков: ?limit=&cursor=&format=json|ndjson
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(default=100, ge=1, le=1000),
+        cursor: str | None = Query(default=None),
+        format: Literal["json", "ndjson"] = Query(default="json"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.format = format
+
+
+def page_rows(
+    query: ORMQuery,
+    created_col,
+    id_col,
+    page: PageParams,
+) -> tuple[list, str | None]:
+    """
+    Строки страницы (created_at DESC, id DESC) и курсор на следующую (или None).
+    """
+    position = decode_cursor(page.cursor) if page.cursor else None
+    rows = (
+        after_cursor(query, created_col, id_col, position)
+        .order_by(created_col.desc(), id_col.desc())
+        .add_columns(created_col, id_col)
+        .limit(page.limit)
+        .all()
+    )
+    next_cursor = None
+    if len(rows) == page.limit:
+        last_created, last_id = rows[-1][-2:]
+        next_cursor = encode_cursor(last_created, last_id)
+    return rows, next_cursor
+
+
+def paginate_rows(
+    query: ORMQuery,
+    created_col,
+    id_col,
+    page: PageParams,
+    rows: RowSchema,
+) -> Response:
+    """
+    Страница результата по (created_at DESC, id DESC); query выбирает
+    колонки rows.columns, строки сериализуются сразу в JSON (RowSchema).
+
+    - format=json: `limit` строк, курсор на продолжение — в X-Next-Cursor;
+    - format=ndjson: весь результат (начиная с курсора) потоком, по строке JSON
+      на объект, через серверный курсор — память не растёт с размером выборки.
+    """
+    if page.format == "ndjson":
+        position = decode_cursor(page.cursor) if page.cursor else None
+        query = after_cursor(query, created_col, id_col, position)
+        return StreamingResponse(
+            _stream_rows(query.order_by(created_col.desc(), id_col.desc()), rows),
+            media_type="application/x-ndjson",
+        )
+
+    result, next_cursor = page_rows(query, created_col, id_col, page)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(rows.dump(result), media_type="application/json", headers=headers)
+
+
+def _stream_rows(query: ORMQuery, rows: RowSchema) -> Iterator[bytes]:
+    # своя сессия: сессия из get_db может закрыться раньше, чем дочитается поток
+    db = SessionLocal()
+    try:
+        for row in query.with_session(db).yield_per(STREAM_BATCH_SIZE):
+            yield rows.dump_line(row)
+    finally:
+        db.close()
@@ -0,0 +1,358 @@
+"""
+Ранжирование кандидатов ленты: в каком порядке показывать объявления.
+
+Ранжировщик выбирается settings.feed_ranker:
+- "recency" — прежнее поведение: подходящие под все фильтры предпочтений,
+  от свежих к старым, а если таких нет — все подряд;
+- "score" — пул кандидатов собирается шире фильтров (точные совпадения +
+  весь город предпочтения + просто свежие), и каждый получает оценку —
+  взвешенную сумму признаков в [0, 1], посчитанных NumPy сразу по всей
+  пачке. Предпочтения становятся мягкими: совпадения идут первыми,
+  близкие варианты — следом, без резкого переключения на «всё подряд».
+  С CF_ENABLED в пул добавляются объявления, похожие на недавние лайки
+  пользователя (services.recommendations), и признак similar.
+
+С LISTING_INDEX_ENABLED оба ранжировщика берут кандидатов из колоночного
+индекса в памяти (services.listing_index) вместо запросов к listings.
+
+Признаки (@ranking_feature(name, weight)) — функции CandidateBatch ->
+np.ndarray той же длины. Веса переопределяются FEED_RANK_WEIGHTS
+(JSON, например {"popularity": 2.0}).
+"""
+import heapq
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..cache import MemoryCache
+from ..config import settings
+from ..models.feed_action import FeedAction
+from ..models.listing import Listing
+from ..models.preferences import TenantPreference
+from .feed import apply_preference_filters, candidate_listing_ids, unseen_active_listings
+from .listing_index import listing_index
+from .seen_sets import seen_ids
+from .recommendations import user_affinity
+
+# колонки пула кандидатов
+POOL_COLUMNS = (
+    Listing.id,
+    Listing.city,
+    Listing.deal_type,
+    Listing.property_type,
+    Listing.price,
+    Listing.created_at,
+)
+
+# цена дороже price_max на столько (доля) -> признак price = 1/e
+PRICE_TOLERANCE = 0.15
+
+Ranker = Callable[[Session, int, TenantPreference | None, int, set[int] | None], list[int]]
+
+RANKERS: dict[str, Ranker] = {}
+
+
+def ranker(name: str):
+    def register(fn: Ranker) -> Ranker:
+        RANKERS[name] = fn
+        return fn
+
+    return register
+
+
+def rank_candidates(
+    db: Session,
+    user_id: int,
+    pref: TenantPreference | None,
+    limit: int,
+    exclude: set[int] | None = None,
+) -> list[int]:
+    """
+    Следующие `limit` id для ленты пользователя в порядке показа.
+    exclude — просмотренные, но ещё не записанные в feed_actions.
+    """
+    try:
+        rank = RANKERS[settings.feed_ranker]
+    except KeyError:
+        raise ValueError(f"Unknown FEED_RANKER: {settings.feed_ranker}") from None
+    return rank(db, user_id, pref, limit, exclude)
+
+
+def _use_index(db: Session) -> bool:
+    if not listing_index.loaded:
+        return False
+    listing_index.refresh(db)
+    return True
+
+
+@ranker("recency")
+def rank_by_recency(db, user_id, pref, limit, exclude=None) -> list[int]:
+    if _use_index(db):
+        return listing_index.recent_ids(pref, limit, exclude=seen_ids(db, user_id, exclude))
+    return candidate_listing_ids(db, user_id, pref, limit, exclude=exclude)
+
+
+# --- скоринг ---
+
+
+@dataclass
+class CandidateBatch:
+    """
+    Пачка кандидатов в виде колонок NumPy (по элементу на объявление).
+    """
+
+    pref: TenantPreference | None
+    ids: np.ndarray            # int64
+    city: np.ndarray           # object (str)
+    deal_type: np.ndarray      # object (str)
+    property_type: np.ndarray  # object (str)
+    price: np.ndarray          # float64
+    created_ts: np.ndarray     # float64, unix time
+    age_days: np.ndarray       # float64
+    likes: np.ndarray          # float64, лайки + избранное
+    affinity: np.ndarray       # float64, похожесть на лайки пользователя (CF)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows,
+        pref: TenantPreference | None,
+        likes: dict[int, int],
+        affinity: dict[int, float] | None = None,
+        now: float | None = None,
+    ):
+        """
+        rows — строки с колонками POOL_COLUMNS (id, city, deal_type, property_type, price, created_at).
+        """
+        now = time.time() if now is None else now
+        n = len(rows)
+        ids, city, deal_type, property_type, price, created_at = zip(*rows) if n else ((),) * 6
+        columns = {
+            "ids": np.array(ids, dtype=np.int64),
+            "city": np.array(city, dtype=object),
+            "deal_type": np.array(deal_type, dtype=object),
+            "property_type": np.array(property_type, dtype=object),
+            "price": np.array(price, dtype=np.float64),
+            "created_ts": np.fromiter((_timestamp(c, now) for c in created_at), dtype=np.float64, count=n),
+        }
+        return cls.from_columns(columns, pref, likes, affinity, now)
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: dict[str, np.ndarray],
+        pref: TenantPreference | None,
+        likes: dict[int, int],
+        affinity: dict[int, float] | None = None,
+        now: float | None = None,
+    ):
+        """
+        columns — ids, city, deal_type, property_type, price, created_ts
+        (как у ListingIndex.pool).
+        """
+        now = time.time() if now is None else now
+        ids = columns["ids"]
+        n = len(ids)
+        return cls(
+            pref=pref,
+            **columns,
+            age_days=np.maximum(now - columns["created_ts"], 0.0) / 86400,
+            likes=np.fromiter((likes.get(i, 0) for i in ids.tolist()), dtype=np.float64, count=n),
+            affinity=np.fromiter(((affinity or {}).get(i, 0.0) for i in ids.tolist()), dtype=np.float64, count=n),
+        )
+
+
+def _timestamp(value: datetime | None, default: float) -> float:
+    if value is None:
+        return default
+    if value.tzinfo is None:  # SQLite отдаёт naive UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+FeatureFn = Callable[[CandidateBatch], np.ndarray]
+
+FEATURES: dict[str, tuple[float, FeatureFn]] = {}
+
+
+def ranking_feature(name: str, weight: float):
+    def register(fn: FeatureFn) -> FeatureFn:
+        FEATURES[name] = (weight, fn)
+        return fn
+
+    return register
+
+
+def _match(values: np.ndarray, wanted: str | None) -> np.ndarray:
+    if not wanted:
+        return np.ones(len(values))
+    return (values == wanted).astype(np.float64)
+
+
+@ranking_feature("city", 3.0)
+def city_match(batch: CandidateBatch) -> np.ndarray:
+    return _match(batch.city, batch.pref and batch.pref.city)
+
+
+@ranking_feature("deal_type", 3.0)
+def deal_type_match(batch: CandidateBatch) -> np.ndarray:
+    return _match(batch.deal_type, batch.pref and batch.pref.deal_type)
+
+
+@ranking_feature("property_type", 1.5)
+def property_type_match(batch: CandidateBatch) -> np.ndarray:
+    return _match(batch.property_type, batch.pref and batch.pref.property_type)
+
+
+@ranking_feature("price", 2.0)
+def price_closeness(batch: CandidateBatch) -> np.ndarray:
+    """
+    1 внутри [price_min, price_max], дальше — exp(-относительное отклонение / PRICE_TOLERANCE).
+    """
+    pref = batch.pref
+    distance = np.zeros(len(batch))
+    if pref is not None and pref.price_min is not None and pref.price_min > 0:
+        low = float(pref.price_min)
+        distance = np.maximum(distance, (low - batch.price) / low)
+    if pref is not None and pref.price_max is not None and pref.price_max > 0:
+        high = float(pref.price_max)
+        distance = np.maximum(distance, (batch.price - high) / high)
+    return np.exp(-distance / PRICE_TOLERANCE)
+
+
+@ranking_feature("freshness", 1.5)
+def freshness(batch: CandidateBatch) -> np.ndarray:
+    return np.exp2(-batch.age_days / settings.feed_rank_freshness_half_life_days)
+
+
+@ranking_feature("popularity", 1.0)
+def popularity(batch: CandidateBatch) -> np.ndarray:
+    scores = np.log1p(batch.likes)
+    top = scores.max(initial=0.0)
+    return scores / top if top > 0 else scores
+
+
+@ranking_feature("similar", 2.0)
+def similar_to_liked(batch: CandidateBatch) -> np.ndarray:
+    top = batch.affinity.max(initial=0.0)
+    return batch.affinity / top if top > 0 else batch.affinity
+
+
+def feature_weights() -> dict[str, float]:
+    return {name: settings.feed_rank_weights.get(name, weight) for name, (weight, _) in FEATURES.items()}
+
+
+def score_batch(batch: CandidateBatch, weights: dict[str, float] | None = None) -> np.ndarray:
+    weights = feature_weights() if weights is None else weights
+    scores = np.zeros(len(batch))
+    for name, (_, fn) in FEATURES.items():
+        weight = weights.get(name, 0.0)
+        if weight:
+            scores += weight * fn(batch)
+    return scores
+
+
+def order_batch(batch: CandidateBatch, scores: np.ndarray, limit: int) -> list[int]:
+    """
+    id по убыванию оценки, при равенстве — более свежие.
+    """
+    if len(batch) > limit:
+        # top-k за O(n), сортируем только их; равные k-й оценке берём все,
+        # иначе argpartition выбрал бы среди них произвольные, а не свежие
+        kth = np.partition(scores, len(batch) - limit)[len(batch) - limit]
+        top = np.flatnonzero(scores >= kth)
+    else:
+        top = np.arange(len(batch))
+    order = top[np.lexsort((-batch.created_ts[top], -scores[top]))][:limit]
+    return batch.ids[order].tolist()
+
+
+def candidate_pool(
+    db: Session,
+    user_id: int,
+    pref: TenantPreference | None,
+    size: int,
+    exclude: set[int] | None = None,
+    extra_ids: list[int] | None = None,
+) -> list:
+    """
+    Непросмотренные активные объявления для скоринга, до ~2.5 * size строк:
+    точные совпадения, весь город предпочтения и просто свежие.
+    Каждый срез идёт по своему индексу от свежих к старым.
+    extra_ids — ещё кандидаты вне этих срезов (похожие на лайки).
+    """
+    base = unseen_active_listings(db, user_id, *POOL_COLUMNS)
+    if exclude:
+        base = base.filter(~Listing.id.in_(exclude))
+    if pref is None:
+        queries = [base.limit(size)]
+    else:
+        queries = [apply_preference_filters(base, pref).limit(size)]
+        if pref.city:
+            queries.append(base.filter(Listing.city == pref.city).limit(size))
+        queries.append(base.limit(max(1, size // 2)))
+    if extra_ids:
+        queries.append(base.filter(Listing.id.in_(extra_ids)))
+
+    rows = {}
+    for query in queries:
+        for row in query:
+            rows.setdefault(row.id, row)
+    return list(rows.values())
+
+
+# лайки + избранное по объявлению; популярность меняется медленно
+_popularity = MemoryCache(max_size=200_000, ttl=settings.feed_rank_popularity_ttl_seconds)
+
+
+def listing_likes(db: Session, listing_ids: list[int]) -> dict[int, int]:
+    likes, missing = {}, []
+    for listing_id in listing_ids:
+        count = _popularity.get(str(listing_id))
+        if count is None:
+            missing.append(listing_id)
+        else:
+            likes[listing_id] = count
+    if missing:
+        counted = dict(
+            db.query(FeedAction.listing_id, func.count())
+            .filter(
+                FeedAction.listing_id.in_(missing),
+                FeedAction.action.in_(("like", "favorite")),
+            )
+            .group_by(FeedAction.listing_id)
+            .all()
+        )
+        for listing_id in missing:
+            likes[listing_id] = count = counted.get(listing_id, 0)
+            _popularity.set(str(listing_id), count)
+    return likes
+
+
+@ranker("score")
+def rank_by_score(db, user_id, pref, limit, exclude=None) -> list[int]:
+    size = settings.feed_rank_pool_size
+    affinity = user_affinity(db, user_id) if settings.cf_enabled else {}
+    similar = heapq.nlargest(size // 5, affinity, key=affinity.__getitem__)
+    if _use_index(db):
+        columns = listing_index.pool(pref, size, seen_ids(db, user_id, exclude), extra_ids=similar)
+        if not len(columns["ids"]):
+            return []
+        ids = columns["ids"].tolist()
+        batch = CandidateBatch.from_columns(columns, pref, listing_likes(db, ids), affinity)
+        return order_batch(batch, score_batch(batch), limit)
+
+    rows = candidate_pool(db, user_id, pref, size, exclude, extra_ids=similar)
+    if not rows:
+        return []
+    batch = CandidateBatch.from_rows(rows, pref, listing_likes(db, [r.id for r in rows]), affinity)
+    return order_batch(batch, score_batch(batch), limit)
+
@@ -0,0 +1,498 @@
+"""
+Рекомендации по истории свайпов: item-item collaborative filtering.
+
+Офлайн-задача (scripts.build_similarities, по cron) строит разреженную
+матрицу пользователь × объявление из положительных действий (like,
+favorite) и для каждого объявления считает top-K похожих:
+
+    sim(i, j) = c_ij / sqrt(n_i * n_j) * c_ij / (c_ij + cf_shrinkage)
+
+c_ij — сколько пользователей лайкнули оба объявления, n_i — сколько
+лайкнули i; второй множитель приглушает пары с малой поддержкой.
+Результат пишется в listing_similarities.
+
+Инкрементальный запуск читает только feed_actions новее водяного знака
+прошлого запуска; матрица и текущие top-K лежат в файле состояния
+(settings.cf_state_path, .npz). Строки объявлений с новыми лайками
+пересчитываются целиком, а их новые оценки вливаются в списки соседей
+(sim симметрична). Если оценка пары, уже стоявшей в чужом top-K,
+снизилась, её место мог занять кто-то вне списка — такие списки тоже
+пересчитываются целиком. Итог совпадает с полным пересчётом (с точностью
+до порядка равных оценок), а --full нужен, только если потеряно
+состояние или сменился K: без файла состояния запуск сам становится полным.
+
+Лента (services.ranking) держит списки в памяти процесса
+(SimilarityIndex: соседи объявления — поиск в dict) и раз в
+cf_refresh_seconds догружает изменённые списки по updated_at. Чего по
+updated_at не видно, пишется в журнал listing_similarity_builds: после
+полного пересчёта индекс перечитывается целиком, а списки, ставшие
+пустыми, из него удаляются.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.feed_action import FeedAction
+from ..models.listing_similarity import ListingSimilarity, ListingSimilarityBuild
+
+logger = logging.getLogger(__name__)
+
+POSITIVE_ACTIONS = ("like", "favorite")
+
+# повторно читаем столько последних id: транзакции с меньшим id могли
+# закоммититься после прошлого запуска (повтор лайка матрицу не меняет)
+WATERMARK_OVERLAP = 10_000
+READ_CHUNK = 100_000
+WRITE_CHUNK = 10_000
+
+
+# --- построение ---
+
+
+@dataclass
+class CFState:
+    watermark: int              # max feed_actions.id, учтённый в matrix
+    user_ids: np.ndarray        # int64: строка матрицы -> user_id
+    listing_ids: np.ndarray     # int64: столбец матрицы -> listing_id
+    matrix: sparse.csr_matrix   # users × listings, 1.0 — лайк/избранное
+    topk_ids: np.ndarray        # int32 (listings, K): столбцы соседей, -1 — пусто
+    topk_scores: np.ndarray     # float32 (listings, K)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            watermark=np.int64(self.watermark),
+            user_ids=self.user_ids,
+            listing_ids=self.listing_ids,
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape),
+            topk_ids=self.topk_ids,
+            topk_scores=self.topk_scores,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CFState | None":
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as f:
+            return cls(
+                watermark=int(f["watermark"]),
+                user_ids=f["user_ids"],
+                listing_ids=f["listing_ids"],
+                matrix=sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"])),
+                topk_ids=f["topk_ids"],
+                topk_scores=f["topk_scores"],
+            )
+
+
+def max_action_id(db: Session) -> int:
+    return db.execute(select(func.max(FeedAction.id))).scalar() or 0
+
+
+def read_positive_actions(db: Session, after_id: int, upto_id: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (user_id, listing_id) лайков/избранного с after_id < id <= upto_id.
+    """
+    stmt = (
+        select(FeedAction.user_id, FeedAction.listing_id)
+        .where(
+            FeedAction.id > after_id,
+            FeedAction.id <= upto_id,
+            FeedAction.action.in_(POSITIVE_ACTIONS),
+        )
+        .execution_options(yield_per=READ_CHUNK)
+    )
+    users, listings = [], []
+    for part in db.execute(stmt).partitions():
+        array = np.array(part, dtype=np.int64).reshape(-1, 2)
+        users.append(array[:, 0])
+        listings.append(array[:, 1])
+    if not users:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(users), np.concatenate(listings)
+
+
+def similarity_rows(matrix: sparse.csr_matrix, items: np.ndarray, chunk: int = 1_000):
+    """
+    Для каждого столбца i из items -> (i, столбцы соседей, sim) по всем
+    объявлениям, лайкнутым хотя бы cf_min_common общими пользователями.
+    """
+    by_item = matrix.T.tocsr()  # listings × users
+    counts = np.asarray(matrix.sum(axis=0), dtype=np.float64).ravel()
+    shrinkage = settings.cf_shrinkage
+    for start in range(0, len(items), chunk):
+        block = items[start:start + chunk]
+        common = (by_item[block] @ matrix).tocsr()  # c_ij: block × listings
+        for row, item in enumerate(block.tolist()):
+            lo, hi = common.indptr[row], common.indptr[row + 1]
+            cols = common.indices[lo:hi]
+            c = common.data[lo:hi].astype(np.float64)
+            keep = (cols != item) & (c >= settings.cf_min_common)
+            cols, c = cols[keep], c[keep]
+            yield item, cols, c / np.sqrt(counts[item] * counts[cols]) * c / (c + shrinkage)
+
+
+def _top_k(cols: np.ndarray, sims: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    if len(sims) > k:
+        top = np.argpartition(-sims, k - 1)[:k]
+        cols, sims = cols[top], sims[top]
+    order = np.argsort(-sims, kind="stable")
+    return cols[order], sims[order]
+
+
+def _set_row(state: CFState, item: int, cols: np.ndarray, sims: np.ndarray) -> None:
+    state.topk_ids[item] = -1
+    state.topk_scores[item] = 0.0
+    state.topk_ids[item, :len(cols)] = cols
+    state.topk_scores[item, :len(cols)] = sims
+
+
+def build_full(db: Session, k: int) -> tuple[CFState, np.ndarray]:
+    upto = max_action_id(db)
+    users, listings = read_positive_actions(db, 0, upto)
+    user_ids, rows = np.unique(users, return_inverse=True)
+    listing_ids, cols = np.unique(listings, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(user_ids), len(listing_ids)),
+    )
+    matrix.data[:] = 1.0  # повторы пары сложились при построении
+
+    state = CFState(
+        watermark=upto,
+        user_ids=user_ids,
+        listing_ids=listing_ids,
+        matrix=matrix,
+        topk_ids=np.full((len(listing_ids), k), -1, dtype=np.int32),
+        topk_scores=np.zeros((len(listing_ids), k), dtype=np.float32),
+    )
+    items = np.arange(len(listing_ids))
+    for item, nb_cols, sims in similarity_rows(matrix, items):
+        _set_row(state, item, *_top_k(nb_cols, sims, k))
+    return state, items
+
+
+def _extend(ids: np.ndarray, new_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Дописывает в ids отсутствующие значения -> (ids, индексы new_ids в них).
+    """
+    position = {v: i for i, v in enumerate(ids.tolist())}
+    extra = [v for v in dict.fromkeys(new_ids.tolist()) if v not in position]
+    for v in extra:
+        position[v] = len(position)
+    if extra:
+        ids = np.concatenate([ids, np.array(extra, dtype=np.int64)])
+    return ids, np.fromiter((position[v] for v in new_ids.tolist()), dtype=np.int64, count=len(new_ids))
+
+
+def update_incremental(db: Session, state: CFState) -> tuple[CFState, np.ndarray]:
+    """
+    Вливает новые лайки в состояние. -> (состояние, изменённые столбцы).
+    """
+    upto = max_action_id(db)
+    users, listings = read_positive_actions(db, max(0, state.watermark - WATERMARK_OVERLAP), upto)
+    state.watermark = upto
+    if not len(users):
+        return state, np.empty(0, dtype=np.int64)
+
+    state.user_ids, rows = _extend(state.user_ids, users)
+    old_listings = len(state.listing_ids)
+    state.listing_ids, cols = _extend(state.listing_ids, listings)
+    added = len(state.listing_ids) - old_listings
+    if added:
+        k = state.topk_ids.shape[1]
+        state.topk_ids = np.vstack([state.topk_ids, np.full((added, k), -1, dtype=np.int32)])
+        state.topk_scores = np.vstack([state.topk_scores, np.zeros((added, k), dtype=np.float32)])
+
+    matrix = state.matrix
+    matrix.resize((len(state.user_ids), len(state.listing_ids)))
+    pairs = np.unique(np.stack([rows, cols], axis=1), axis=0)
+    known = np.asarray(matrix[pairs[:, 0], pairs[:, 1]]).ravel()
+    fresh = pairs[known == 0]
+    if not len(fresh):
+        return state, np.empty(0, dtype=np.int64)
+    state.matrix = (
+        matrix + sparse.csr_matrix(
+            (np.ones(len(fresh), dtype=np.float32), (fresh[:, 0], fresh[:, 1])), shape=matrix.shape
+        )
+    ).tocsr()
+
+    affected = np.unique(fresh[:, 1])
+    affected_set = set(affected.tolist())
+    # (сосед j, объявление i, sim) для соседей вне affected
+    merge_j, merge_i, merge_s = [], [], []
+    k = state.topk_ids.shape[1]
+    for item, nb_cols, sims in similarity_rows(state.matrix, affected):
+        _set_row(state, item, *_top_k(nb_cols, sims, k))
+        outside = np.fromiter((c not in affected_set for c in nb_cols.tolist()), dtype=bool, count=len(nb_cols))
+        merge_j.append(nb_cols[outside])
+        merge_i.append(np.full(int(outside.sum()), item, dtype=np.int64))
+        merge_s.append(sims[outside])
+
+    changed = set(affected_set)
+    if merge_j:
+        merged, stale = _merge_neighbors(
+            state, np.concatenate(merge_j), np.concatenate(merge_i), np.concatenate(merge_s)
+        )
+        changed |= merged
+        for item, nb_cols, sims in similarity_rows(state.matrix, np.array(sorted(stale), dtype=np.int64)):
+            _set_row(state, item, *_top_k(nb_cols, sims, k))
+    return state, np.array(sorted(changed), dtype=np.int64)
+
+
+def _merge_neighbors(
+    state: CFState, js: np.ndarray, items: np.ndarray, sims: np.ndarray
+) -> tuple[set[int], set[int]]:
+    """
+    Обновляет top-K соседей j оценками sim(j, i).
+    -> (изменённые j, j для полного пересчёта: оценка из их списка снизилась).
+    """
+    if not len(js):
+        return set(), set()
+    current_ids = state.topk_ids[js]        # (P, K)
+    current_scores = state.topk_scores[js]
+    hit = current_ids == items[:, None]
+    in_list = hit.any(axis=1)
+    previous = np.where(hit, current_scores, np.inf).min(axis=1)
+    stale = set(js[in_list & (sims < previous - 1e-7)].tolist())
+    # пара уже в списке — обновить оценку; нет — претендует, если бьёт последнего
+    worst = np.where(current_ids[:, -1] < 0, -np.inf, current_scores[:, -1])
+    candidate = ~in_list & (sims > worst)
+    touched = in_list | candidate
+    if not touched.any():
+        return set(), stale
+
+    k = state.topk_ids.shape[1]
+    changed = set()
+    order = np.argsort(js[touched], kind="stable")
+    t_js, t_items, t_sims = js[touched][order], items[touched][order], sims[touched][order]
+    bounds = np.flatnonzero(np.diff(t_js)) + 1
+    for j_group, i_group, s_group in zip(
+        np.split(t_js, bounds), np.split(t_items, bounds), np.split(t_sims, bounds)
+    ):
+        j = int(j_group[0])
+        ids = state.topk_ids[j]
+        keep = (ids >= 0) & ~np.isin(ids, i_group)
+        cols = np.concatenate([ids[keep].astype(np.int64), i_group])
+        scores = np.concatenate([state.topk_scores[j][keep].astype(np.float64), s_group])
+        _set_row(state, j, *_top_k(cols, scores, k))
+        changed.add(j)
+    return changed, stale
+
+
+def write_similarities(db: Session, state: CFState, items: np.ndarray, full: bool) -> int:
+    """
+    Переписывает списки объявлений items в listing_similarities одной
+    транзакцией и отмечает запись в журнале listing_similarity_builds.
+    """
+    now = datetime.now(timezone.utc)
+    listing_ids = state.listing_ids[items].tolist()
+    if full:
+        db.execute(delete(ListingSimilarity))
+    else:
+        for start in range(0, len(listing_ids), WRITE_CHUNK):
+            db.execute(
+                delete(ListingSimilarity).where(
+                    ListingSimilarity.listing_id.in_(listing_ids[start:start + WRITE_CHUNK])
+                )
+            )
+
+    written = 0
+    batch = []
+    emptied = []
+    for item, listing_id in zip(items.tolist(), listing_ids):
+        if state.topk_ids[item, 0] < 0:
+            emptied.append(listing_id)
+        for col, score in zip(state.topk_ids[item].tolist(), state.topk_scores[item].tolist()):
+            if col < 0:
+                break
+            batch.append({
+                "listing_id": listing_id,
+                "similar_id": int(state.listing_ids[col]),
+                "score": score,
+                "updated_at": now,
+            })
+        if len(batch) >= WRITE_CHUNK:
+            db.execute(insert(ListingSimilarity), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(ListingSimilarity), batch)
+        written += len(batch)
+    build = ListingSimilarityBuild(full=full, emptied=[] if full else emptied, created_at=now)
+    db.add(build)
+    if full:
+        # воркеры, увидев полный пересчёт, перечитают всё — старый журнал не
+        # нужен; последнюю запись оставляем, чтобы id журнала не начался заново
+        db.flush()
+        db.execute(delete(ListingSimilarityBuild).where(ListingSimilarityBuild.id < build.id))
+    db.commit()
+    return written
+
+
+def rebuild_similarities(db: Session, full: bool = False) -> dict:
+    """
+    Полный или инкрементальный пересчёт + запись + сохранение состояния.
+    """
+    started = time.perf_counter()
+    k = settings.cf_top_k
+    state = None if full else CFState.load(settings.cf_state_path)
+    if state is not None and state.topk_ids.shape[1] != k:
+        state = None  # сменился K — только полный пересчёт
+    mode = "incremental" if state is not None else "full"
+    if state is None:
+        state, changed = build_full(db, k)
+    else:
+        state, changed = update_incremental(db, state)
+
+    rows = write_similarities(db, state, changed, full=mode == "full")
+    state.save(settings.cf_state_path)
+    return {
+        "mode": mode,
+        "watermark": state.watermark,
+        "users": len(state.user_ids),
+        "listings": len(state.listing_ids),
+        "interactions": int(state.matrix.nnz),
+        "updated_listings": len(changed),
+        "rows_written": rows,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+# --- выдача ---
+
+
+class SimilarityIndex:
+    """
+    listing_id -> (id соседей, оценки) в памяти процесса.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._neighbors: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        self._loaded_until: datetime | None = None
+        self._build_id: int | None = None  # последняя учтённая запись журнала
+        self._checked_at: float | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._neighbors)
+
+    def neighbors(self, listing_id: int) -> tuple[np.ndarray, np.ndarray] | None:
+        return self._neighbors.get(listing_id)
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        """
+        Догружает списки, изменённые после прошлой загрузки; после полного
+        пересчёта (или при первом вызове) перечитывает всё.
+        Одновременно грузит один поток, остальные работают со старыми данными.
+        """
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            # журнал — до строк: запись, закоммиченная между запросами,
+            # просто будет учтена в следующий раз
+            builds = db.execute(
+                select(ListingSimilarityBuild.id, ListingSimilarityBuild.full, ListingSimilarityBuild.emptied)
+                .where(ListingSimilarityBuild.id > (self._build_id or 0))
+                .order_by(ListingSimilarityBuild.id)
+            ).all()
+            reload = self._build_id is None or any(build.full for build in builds)
+
+            stmt = select(
+                ListingSimilarity.listing_id,
+                ListingSimilarity.similar_id,
+                ListingSimilarity.score,
+                ListingSimilarity.updated_at,
+            )
+            if not reload and self._loaded_until is not None:
+                stmt = stmt.where(ListingSimilarity.updated_at > self._loaded_until)
+            fresh: dict[int, list[tuple[int, float]]] = {}
+            latest = None if reload else self._loaded_until
+            for listing_id, similar_id, score, updated_at in db.execute(stmt):
+                fresh.setdefault(listing_id, []).append((similar_id, score))
+                if latest is None or updated_at > latest:
+                    latest = updated_at
+
+            neighbors = {} if reload else dict(self._neighbors)
+            dropped = 0
+            if not reload:
+                for build in builds:
+                    for listing_id in build.emptied:
+                        # список мог снова наполниться более поздним пересчётом
+                        if listing_id not in fresh and neighbors.pop(listing_id, None) is not None:
+                            dropped += 1
+            for listing_id, pairs in fresh.items():
+                pairs.sort(key=lambda p: -p[1])
+                neighbors[listing_id] = (
+                    np.array([p[0] for p in pairs], dtype=np.int64),
+                    np.array([p[1] for p in pairs], dtype=np.float32),
+                )
+            self._neighbors = neighbors
+            self._loaded_until = latest
+            if builds:
+                self._build_id = builds[-1].id
+            elif self._build_id is None:
+                self._build_id = 0
+            if fresh or dropped or reload:
+                logger.info(
+                    "similarity index: %s %d lists, dropped %d, %d total",
+                    "reloaded" if reload else "loaded", len(fresh), dropped, len(neighbors),
+                )
+        finally:
+            self._lock.release()
+
+    def affinity(self, liked: list[int]) -> dict[int, float]:
+        """
+        Сумма оценок похожести на лайкнутые объявления: listing_id -> вес.
+        """
+        found = [nb for nb in map(self._neighbors.get, liked) if nb is not None]
+        if not found:
+            return {}
+        ids = np.concatenate([nb[0] for nb in found])
+        scores = np.concatenate([nb[1] for nb in found])
+        unique, inverse = np.unique(ids, return_inverse=True)
+        return dict(zip(unique.tolist(), np.bincount(inverse, weights=scores).tolist()))
+
+
+similarity_index = SimilarityIndex(refresh_seconds=settings.cf_refresh_seconds)
+
+
+def recent_liked_ids(db: Session, user_id: int, limit: int) -> list[int]:
+    return list(
+        db.execute(
+            select(FeedAction.listing_id)
+            .where(FeedAction.user_id == user_id, FeedAction.action.in_(POSITIVE_ACTIONS))
+            .order_by(FeedAction.id.desc())
+            .limit(limit)
+        ).scalars()
+    )
+
+
+def user_affinity(db: Session, user_id: int) -> dict[int, float]:
+    """
+    Объявления, похожие на недавние лайки пользователя: listing_id -> вес.
+    """
+    similarity_index.refresh(db)
+    if not len(similarity_index):
+        return {}
+    return similarity_index.affinity(recent_liked_ids(db, user_id, settings.cf_user_history))
@@ -0,0 +1,244 @@
+"""
+Просмотренные пользователем объявления одним компактным значением.
+
+Лента исключает всё, что пользователь уже свайпал. Анти-join
+NOT IN (SELECT listing_id FROM feed_actions WHERE user_id = ...) растёт
+вместе с историей: у активного пользователя это тысячи строк на каждую
+пересборку очереди. С FEED_SEEN_SET_ENABLED множество хранится в
+user_seen_sets одной строкой на пользователя:
+
+- id отсортированы, записаны разностями соседних (uint32), байты
+  переставлены по разрядам (сначала все младшие, потом следующие...)
+  и сжаты zlib — тысяча просмотренных занимает пару килобайт;
+- свайп (feed_writer.insert_feed_actions) дописывает id в множество в
+  той же транзакции: строки блокируются SELECT ... FOR UPDATE, пачка
+  свайпов — фиксированное число запросов;
+- чтение (seen_ids) сверяет version строки с кэшем процесса и
+  распаковывает множество, только если оно изменилось.
+
+Множество нужно там, где кандидаты фильтруются в памяти: колоночный
+индекс ленты (services.listing_index) отбрасывает просмотренные по нему,
+не читая историю пользователя. Запросы к listings без индекса остаются с
+анти-join: выгрузить просмотренные строки в Python, чтобы выбросить их,
+дороже, чем анти-join в самой БД (см. scripts.bench_seen_sets).
+
+feed_actions остаётся источником истины: у пользователя без строки
+множество читается из feed_actions, а первая запись строит его оттуда же.
+Существующую историю один раз переносит scripts.backfill_seen_sets —
+его же нужно повторить, если FEED_SEEN_SET_ENABLED выключали (свайпы
+без флага в множества не попадают).
+"""
+import logging
+import zlib
+from collections.abc import Iterable
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..cache import MemoryCache
+from ..config import settings
+from ..models.feed_action import FeedAction
+from ..models.user_seen_set import UserSeenSet
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+COMPRESS_LEVEL = 6
+BACKFILL_CHUNK = 1_000
+
+EMPTY = np.zeros(0, dtype=np.int64)
+EMPTY.flags.writeable = False
+
+
+# --- формат ---
+
+
+def encode_ids(ids: Iterable[int] | np.ndarray) -> bytes:
+    """
+    id -> байты: версия формата + zlib(разности отсортированных uint32 по разрядам).
+    """
+    ids = np.unique(np.asarray(ids, dtype=np.int64))
+    deltas = np.diff(ids, prepend=0).astype("<u4")
+    # разряды подряд: у маленьких разностей старшие байты — сплошные нули
+    planes = deltas.view(np.uint8).reshape(-1, 4).T.tobytes()
+    return bytes([FORMAT_VERSION]) + zlib.compress(planes, COMPRESS_LEVEL)
+
+
+def decode_ids(data: bytes) -> np.ndarray:
+    """
+    Байты encode_ids -> отсортированные уникальные id (int64).
+    """
+    if not data:
+        return EMPTY
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"Unknown seen-set format: {data[0]}")
+    planes = np.frombuffer(zlib.decompress(data[1:]), dtype=np.uint8)
+    deltas = planes.reshape(4, -1).T.copy().view("<u4").ravel()
+    return np.cumsum(deltas, dtype=np.int64)
+
+
+# --- чтение ---
+
+# user_id -> (version, id); массивы только для чтения, общие для потоков
+_cache = MemoryCache(max_size=settings.feed_seen_cache_size)
+
+
+def _history(db: Session, user_ids: list[int]) -> dict[int, np.ndarray]:
+    """
+    Просмотренные из feed_actions: user_id -> отсортированные id.
+    """
+    rows = db.execute(
+        select(FeedAction.user_id, FeedAction.listing_id)
+        .where(FeedAction.user_id.in_(user_ids))
+        .order_by(FeedAction.user_id)
+    ).all()
+    if not rows:
+        return {}
+    users, listings = (np.array(column, dtype=np.int64) for column in zip(*rows))
+    bounds = np.flatnonzero(np.diff(users)) + 1
+    return {
+        int(group[0]): np.unique(ids)
+        for group, ids in zip(np.split(users, bounds), np.split(listings, bounds))
+    }
+
+
+def seen_ids(db: Session, user_id: int, pending: Iterable[int] | None = None) -> np.ndarray:
+    """
+    Отсортированные id объявлений, которые пользователь уже видел,
+    плюс pending (свайпы, ещё не записанные в БД).
+    """
+    if settings.feed_seen_set_enabled:
+        ids = _cached_set(db, user_id)
+    else:
+        ids = _history(db, [user_id]).get(user_id, EMPTY)
+    if pending:
+        ids = np.union1d(ids, np.fromiter(pending, dtype=np.int64))
+    return ids
+
+
+def _cached_set(db: Session, user_id: int) -> np.ndarray:
+    version = db.scalar(select(UserSeenSet.version).where(UserSeenSet.user_id == user_id))
+    if version is None:
+        # ещё не перенесён и не свайпал с тех пор
+        return _history(db, [user_id]).get(user_id, EMPTY)
+    key = str(user_id)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    data, version = db.execute(
+        select(UserSeenSet.listing_ids, UserSeenSet.version).where(UserSeenSet.user_id == user_id)
+    ).one()
+    ids = decode_ids(data)
+    ids.flags.writeable = False
+    _cache.set(key, (version, ids))
+    return ids
+
+
+# --- запись ---
+
+
+def _insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    return (postgresql.insert if dialect == "postgresql" else sqlite.insert)(UserSeenSet)
+
+
+def _lock_rows(db: Session, user_ids: Iterable[int]) -> dict[int, tuple[bytes, int]]:
+    # по возрастанию user_id — одинаковый порядок блокировок у всех транзакций
+    rows = db.execute(
+        select(UserSeenSet.user_id, UserSeenSet.listing_ids, UserSeenSet.version)
+        .where(UserSeenSet.user_id.in_(sorted(user_ids)))
+        .order_by(UserSeenSet.user_id)
+        .with_for_update()
+    ).all()
+    return {row.user_id: (row.listing_ids, row.version) for row in rows}
+
+
+def merge_seen(db: Session, additions: dict[int, np.ndarray], from_history: bool = True) -> int:
+    """
+    Добавляет id в множества пользователей (без commit). Строки, которых
+    ещё нет, создаются из всей истории feed_actions (from_history) или
+    прямо из additions, если это и есть вся история. -> число изменённых строк.
+    """
+    if not additions:
+        return 0
+    existing = _lock_rows(db, additions)
+    missing = sorted(set(additions) - set(existing))
+    changed = 0
+    if missing:
+        full = _history(db, missing) if from_history else additions
+        values = []
+        for user_id in missing:
+            ids = np.union1d(full.get(user_id, EMPTY), additions[user_id])
+            values.append({"user_id": user_id, "listing_ids": encode_ids(ids), "count": len(ids), "version": 1})
+        inserted = set(
+            db.execute(
+                _insert(db).on_conflict_do_nothing(index_elements=[UserSeenSet.user_id]).returning(UserSeenSet.user_id),
+                values,
+            ).scalars()
+        )
+        changed += len(inserted)
+        # строку успела создать параллельная транзакция — дописываем в неё
+        raced = [u for u in missing if u not in inserted]
+        if raced:
+            existing.update(_lock_rows(db, raced))
+
+    now = datetime.now(timezone.utc)
+    updates = []
+    for user_id, (data, version) in existing.items():
+        current = decode_ids(data)
+        merged = np.union1d(current, additions[user_id])
+        if len(merged) == len(current):
+            continue
+        updates.append({
+            "user_id": user_id,
+            "listing_ids": encode_ids(merged),
+            "count": len(merged),
+            "version": version + 1,
+            "updated_at": now,
+        })
+    if updates:
+        db.execute(update(UserSeenSet), updates)
+    return changed + len(updates)
+
+
+def add_seen(db: Session, pairs: Iterable[tuple[int, int]]) -> None:
+    """
+    Свайпы (user_id, listing_id) -> множества просмотренных, в транзакции свайпов.
+    """
+    by_user: dict[int, list[int]] = {}
+    for user_id, listing_id in pairs:
+        by_user.setdefault(user_id, []).append(listing_id)
+    merge_seen(db, {u: np.array(ids, dtype=np.int64) for u, ids in by_user.items()})
+
+
+def backfill_seen_sets(db: Session, chunk: int = BACKFILL_CHUNK) -> dict:
+    """
+    Переносит историю feed_actions в user_seen_sets для всех пользователей,
+    по `chunk` пользователей на транзакцию. Повторный запуск безопасен:
+    множества только дополняются.
+    """
+    users = rows = changed = 0
+    after = -1
+    while True:
+        user_ids = list(
+            db.execute(
+                select(FeedAction.user_id)
+                .where(FeedAction.user_id > after)
+                .group_by(FeedAction.user_id)
+                .order_by(FeedAction.user_id)
+                .limit(chunk)
+            ).scalars()
+        )
+        if not user_ids:
+            break
+        history = _history(db, user_ids)
+        changed += merge_seen(db, history, from_history=False)
+        db.commit()
+        users += len(user_ids)
+        rows += sum(len(ids) for ids in history.values())
+        after = user_ids[-1]
+        logger.info("seen sets: backfilled %d users", users)
+    return {"users": users, "listings": rows, "changed": changed}
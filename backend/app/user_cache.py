@@ -0,0 +1,41 @@
+"""
+Кэш активных пользователей для get_current_user, ключ — user id.
+
+Хранятся только поля, нужные роутам (без password_hash), в JSON-виде;
+из кэша отдаётся transient User, не привязанный к сессии. Запись
+сбрасывается при изменении пользователя (роль, is_active, telegram_id).
+"""
+from datetime import datetime
+
+from .cache import make_cache
+from .config import settings
+from .models.user import User
+
+USER_FIELDS = ("id", "role", "name", "email", "phone", "telegram_id", "is_active")
+
+user_cache = make_cache(
+    "user",
+    max_size=settings.user_cache_max_size,
+    ttl=settings.user_cache_ttl_seconds,
+)
+
+
+def get_cached_user(user_id: int) -> User | None:
+    data = user_cache.get(str(user_id))
+    if data is None:
+        return None
+    created_at = data.get("created_at")
+    return User(
+        **{field: data[field] for field in USER_FIELDS},
+        created_at=datetime.fromisoformat(created_at) if created_at else None,
+    )
+
+
+def cache_user(user: User) -> None:
+    data = {field: getattr(user, field) for field in USER_FIELDS}
+    data["created_at"] = user.created_at.isoformat() if user.created_at else None
+    user_cache.set(str(user.id), data)
+
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.delete(str(user_id))
@@ -0,0 +1,132 @@
+"""initial schema
+
+Схема, которую раньше создавал Base.metadata.create_all.
+Существующие базы без alembic_version init_db помечает этой ревизией.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('favorites',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('listing_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'listing_id', name='uq_favorites_user_listing')
+    )
+    op.create_index(op.f('ix_favorites_id'), 'favorites', ['id'], unique=False)
+    op.create_index(op.f('ix_favorites_listing_id'), 'favorites', ['listing_id'], unique=False)
+    op.create_index(op.f('ix_favorites_user_id'), 'favorites', ['user_id'], unique=False)
+    op.create_table('feed_actions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('listing_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(length=16), nullable=False),
+    sa.Column('source', sa.String(length=16), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_feed_actions_id'), 'feed_actions', ['id'], unique=False)
+    op.create_index(op.f('ix_feed_actions_listing_id'), 'feed_actions', ['listing_id'], unique=False)
+    op.create_index(op.f('ix_feed_actions_user_id'), 'feed_actions', ['user_id'], unique=False)
+    op.create_table('leads',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('listing_id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=32), server_default='new', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_leads_id'), 'leads', ['id'], unique=False)
+    op.create_index(op.f('ix_leads_listing_id'), 'leads', ['listing_id'], unique=False)
+    op.create_index(op.f('ix_leads_owner_id'), 'leads', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_leads_tenant_id'), 'leads', ['tenant_id'], unique=False)
+    op.create_table('listings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('city', sa.String(length=128), nullable=False),
+    sa.Column('deal_type', sa.String(length=16), nullable=False),
+    sa.Column('property_type', sa.String(length=32), nullable=False),
+    sa.Column('price', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('is_active', sa.Boolean(), server_default='true', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_listings_id'), 'listings', ['id'], unique=False)
+    op.create_index(op.f('ix_listings_owner_id'), 'listings', ['owner_id'], unique=False)
+    op.create_table('tenant_preferences',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('city', sa.String(length=128), nullable=True),
+    sa.Column('deal_type', sa.String(length=16), nullable=True),
+    sa.Column('property_type', sa.String(length=32), nullable=True),
+    sa.Column('price_min', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('price_max', sa.Numeric(precision=12, scale=2), nullable=True),
+    sa.Column('rooms_min', sa.Integer(), nullable=True),
+    sa.Column('rooms_max', sa.Integer(), nullable=True),
+    sa.Column('area_min', sa.Integer(), nullable=True),
+    sa.Column('area_max', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tenant_preferences_id'), 'tenant_preferences', ['id'], unique=False)
+    op.create_index(op.f('ix_tenant_preferences_user_id'), 'tenant_preferences', ['user_id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=32), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('phone', sa.String(length=32), nullable=True),
+    sa.Column('telegram_id', sa.String(length=64), nullable=True),
+    sa.Column('password_hash', sa.String(length=255), nullable=True),
+    sa.Column('is_active', sa.Boolean(), server_default='true', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_phone'), 'users', ['phone'], unique=True)
+    op.create_index(op.f('ix_users_telegram_id'), 'users', ['telegram_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_telegram_id'), table_name='users')
+    op.drop_index(op.f('ix_users_phone'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_tenant_preferences_user_id'), table_name='tenant_preferences')
+    op.drop_index(op.f('ix_tenant_preferences_id'), table_name='tenant_preferences')
+    op.drop_table('tenant_preferences')
+    op.drop_index(op.f('ix_listings_owner_id'), table_name='listings')
+    op.drop_index(op.f('ix_listings_id'), table_name='listings')
+    op.drop_table('listings')
+    op.drop_index(op.f('ix_leads_tenant_id'), table_name='leads')
+    op.drop_index(op.f('ix_leads_owner_id'), table_name='leads')
+    op.drop_index(op.f('ix_leads_listing_id'), table_name='leads')
+    op.drop_index(op.f('ix_leads_id'), table_name='leads')
+    op.drop_table('leads')
+    op.drop_index(op.f('ix_feed_actions_user_id'), table_name='feed_actions')
+    op.drop_index(op.f('ix_feed_actions_listing_id'), table_name='feed_actions')
+    op.drop_index(op.f('ix_feed_actions_id'), table_name='feed_actions')
+    op.drop_table('feed_actions')
+    op.drop_index(op.f('ix_favorites_user_id'), table_name='favorites')
+    op.drop_index(op.f('ix_favorites_listing_id'), table_name='favorites')
+    op.drop_index(op.f('ix_favorites_id'), table_name='favorites')
+    op.drop_table('favorites')
@@ -0,0 +1,89 @@
+"""composite and partial indexes for feed and listing queries
+
+Индексы под горячие запросы:
+- лента: активные объявления по city/deal_type/property_type + created_at;
+- публичный список и fallback ленты: активные по created_at;
+- анти-join feed_actions по (user_id, listing_id), лиды по (tenant_id, listing_id);
+- списки с keyset-пагинацией по (..., created_at, id).
+
+Одиночные индексы, которые стали префиксами составных, удаляются.
+На PostgreSQL индексы строятся CONCURRENTLY, без блокировки записи.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+ACTIVE = sa.text("is_active")
+
+INDEXES = [
+    ("ix_listings_active_feed", "listings",
+     ["city", "deal_type", "property_type", "created_at", "id"], ACTIVE),
+    ("ix_listings_active_city_created", "listings", ["city", "created_at", "id"], ACTIVE),
+    ("ix_listings_active_created", "listings", ["created_at", "id"], ACTIVE),
+    ("ix_listings_owner_created", "listings", ["owner_id", "created_at", "id"], None),
+    ("ix_feed_actions_user_listing", "feed_actions", ["user_id", "listing_id"], None),
+    ("ix_leads_tenant_listing", "leads", ["tenant_id", "listing_id"], None),
+    ("ix_leads_tenant_created", "leads", ["tenant_id", "created_at", "id"], None),
+    ("ix_leads_owner_created", "leads", ["owner_id", "created_at", "id"], None),
+    ("ix_favorites_user_created", "favorites", ["user_id", "created_at", "id"], None),
+    ("ix_users_created", "users", ["created_at", "id"], None),
+]
+
+# покрываются составными индексами выше
+REDUNDANT = [
+    ("ix_listings_owner_id", "listings", ["owner_id"]),
+    ("ix_feed_actions_user_id", "feed_actions", ["user_id"]),
+    ("ix_leads_tenant_id", "leads", ["tenant_id"]),
+    ("ix_leads_owner_id", "leads", ["owner_id"]),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_where=where,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, table, _ in REDUNDANT:
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REDUNDANT:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,28 @@
+"""listing external id for bulk import upserts
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('listings') as batch_op:
+        batch_op.add_column(sa.Column('external_id', sa.String(length=128), nullable=True))
+        batch_op.create_unique_constraint(
+            'uq_listings_owner_external_id', ['owner_id', 'external_id']
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('listings') as batch_op:
+        batch_op.drop_constraint('uq_listings_owner_external_id', type_='unique')
+        batch_op.drop_column('external_id')
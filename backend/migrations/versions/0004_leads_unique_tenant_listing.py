@@ -0,0 +1,40 @@
+"""unique lead per tenant and listing
+
+Лид на пару (tenant_id, listing_id) должен быть один: с уникальным
+ограничением пакетная запись свайпов делает INSERT ... ON CONFLICT DO NOTHING
+вместо SELECT-проверки на каждое действие. Накопившиеся дубли удаляются
+(остаётся самый ранний лид). Обычный индекс ix_leads_tenant_listing
+заменяется индексом ограничения.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(sa.text(
+        "DELETE FROM leads WHERE id NOT IN "
+        "(SELECT MIN(id) FROM leads GROUP BY tenant_id, listing_id)"
+    ))
+    op.drop_index('ix_leads_tenant_listing', table_name='leads', if_exists=True)
+    with op.batch_alter_table('leads') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_leads_tenant_listing', ['tenant_id', 'listing_id']
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('leads') as batch_op:
+        batch_op.drop_constraint('uq_leads_tenant_listing', type_='unique')
+    op.create_index(
+        'ix_leads_tenant_listing', 'leads', ['tenant_id', 'listing_id'], unique=False
+    )
@@ -0,0 +1,30 @@
+"""listing_similarities table for collaborative-filtering recommendations
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('listing_similarities',
+    sa.Column('listing_id', sa.Integer(), nullable=False),
+    sa.Column('similar_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('listing_id', 'similar_id', name='pk_listing_similarities')
+    )
+    op.create_index('ix_listing_similarities_updated', 'listing_similarities', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listing_similarities_updated', table_name='listing_similarities')
+    op.drop_table('listing_similarities')
@@ -0,0 +1,35 @@
+"""listing_alerts table: new-listing alerts for tenants, delivered by the bot
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('listing_alerts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('listing_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), server_default='pending', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'listing_id', name='uq_listing_alerts_user_listing')
+    )
+    op.create_index('ix_listing_alerts_status_available', 'listing_alerts', ['status', 'available_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listing_alerts_status_available', table_name='listing_alerts')
+    op.drop_table('listing_alerts')
@@ -0,0 +1,41 @@
+"""index on listings.updated_at for in-process index refresh
+
+services.listing_index раз в listing_index_refresh_seconds в каждом воркере
+догружает объявления по updated_at > водяной знак и на загрузке берёт
+max(updated_at); без индекса это полный проход по listings.
+На PostgreSQL индекс строится CONCURRENTLY, без блокировки записи.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_listings_updated_at',
+            'listings',
+            ['updated_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_listings_updated_at',
+            table_name='listings',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,41 @@
+"""index on tenant_preferences.updated_at for preference index refresh
+
+services.matching.PreferenceIndex раз в listing_alerts_refresh_seconds
+догружает предпочтения по updated_at > водяной знак и на загрузке берёт
+max(updated_at); без индекса это полный проход по tenant_preferences.
+На PostgreSQL индекс строится CONCURRENTLY, без блокировки записи.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tenant_preferences_updated_at',
+            'tenant_preferences',
+            ['updated_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_tenant_preferences_updated_at',
+            table_name='tenant_preferences',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
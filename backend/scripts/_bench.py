@@ -0,0 +1,89 @@
+"""
+Общие помощники для бенчмарков и нагрузочных скриптов.
+"""
+import statistics
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LatencyRecorder:
+    """
+    Копит длительности по именам (эндпоинт/операция) и печатает сводку.
+    """
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors[name] += 1
+            raise
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    def summary(self) -> dict:
+        """
+        Сводка по именам: count, errors, rps и перцентили в миллисекундах.
+        """
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for name, samples in sorted(self.samples.items()):
+            endpoints[name] = {
+                "count": len(samples),
+                "errors": self.errors[name],
+                "rps": round(len(samples) / elapsed, 1),
+                **{
+                    f"p{q}_ms": round(percentile(samples, q) * 1000, 2)
+                    for q in (50, 90, 95, 99)
+                },
+                "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+                "max_ms": round(max(samples) * 1000, 2),
+            }
+        total = sum(len(s) for s in self.samples.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "rps": round(total / elapsed, 1),
+            "endpoints": endpoints,
+        }
+
+    def report(self, title: str = "") -> str:
+        summary = self.summary()
+        lines = []
+        if title:
+            lines.append(title)
+        lines.append(
+            f"{'name':40} {'count':>7} {'err':>5} {'rps':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}"
+        )
+        for name, row in summary["endpoints"].items():
+            lines.append(
+                f"{name:40} {row['count']:7d} {row['errors']:5d} {row['rps']:8.1f} "
+                f"{row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['p99_ms']:8.2f} "
+                f"{row['mean_ms']:8.2f}"
+            )
+        lines.append(
+            f"total: {summary['requests']} requests in {summary['elapsed_s']:.2f}s, "
+            f"{summary['rps']:.1f} rps"
+        )
+        return "\n".join(lines)
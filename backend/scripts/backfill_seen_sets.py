@@ -0,0 +1,33 @@
+"""
+Перенос истории свайпов (feed_actions) в user_seen_sets (services.seen_sets).
+
+Запускать перед включением FEED_SEEN_SET_ENABLED, и ещё раз, если флаг
+выключали. Повторный запуск безопасен: множества только дополняются.
+
+    python -m scripts.backfill_seen_sets
+    python -m scripts.backfill_seen_sets --chunk 500
+"""
+import argparse
+import json
+import logging
+
+from app.db import SessionLocal, init_db
+from app.services.seen_sets import BACKFILL_CHUNK, backfill_seen_sets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk", type=int, default=BACKFILL_CHUNK, help="пользователей на транзакцию")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print(json.dumps(backfill_seen_sets(db, chunk=args.chunk)))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
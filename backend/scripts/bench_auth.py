@@ -0,0 +1,75 @@
+"""
+Микробенчмарк накладных расходов аутентификации (get_current_user).
+
+Сравнивает проверку JWT без кэша (python-jose и PyJWT, если установлен),
+decode_access_token с кэшем токенов и get_current_user целиком — холодный
+(кэши сброшены перед каждым вызовом) и тёплый.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m scripts.bench_auth
+"""
+import argparse
+import timeit
+
+from app import security
+from app.db import SessionLocal, init_db
+from app.deps import get_current_user
+from app.models.user import User
+from app.user_cache import user_cache
+
+BENCH_TELEGRAM_ID = "bench-auth"
+
+
+def ensure_user(db) -> User:
+    user = db.query(User).filter(User.telegram_id == BENCH_TELEGRAM_ID).first()
+    if user is None:
+        user = User(role="tenant", name="Bench", telegram_id=BENCH_TELEGRAM_ID, is_active=True)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    return user
+
+
+def report(name: str, seconds: float, number: int) -> None:
+    print(f"{name:44} {seconds / number * 1e6:9.1f} us/call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        user = ensure_user(db)
+        token = security.create_access_token({"sub": str(user.id)})
+        n = args.number
+
+        report("jwt verify: python-jose", timeit.timeit(lambda: security._decode_jose(token), number=n), n)
+        try:
+            import jwt  # noqa: F401
+
+            report("jwt verify: PyJWT", timeit.timeit(lambda: security._decode_pyjwt(token), number=n), n)
+        except ImportError:
+            print("jwt verify: PyJWT                            not installed")
+
+        security.decode_access_token(token)
+        report("decode_access_token (cached)", timeit.timeit(lambda: security.decode_access_token(token), number=n), n)
+
+        def cold() -> None:
+            security.token_cache.clear()
+            user_cache.clear()
+            get_current_user(token=token, db=db)
+
+        def warm() -> None:
+            get_current_user(token=token, db=db)
+
+        report("get_current_user: before (no caches)", timeit.timeit(cold, number=n), n)
+        warm()
+        report("get_current_user: after (token + user cache)", timeit.timeit(warm, number=n), n)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
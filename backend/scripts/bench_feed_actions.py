@@ -0,0 +1,114 @@
+"""
+Сравнение записи свайпов: по одному действию на транзакцию (как /feed/action)
+против пачек через write_feed_actions (/feed/actions/batch и буфер записи).
+Печатает действия/с и число SQL-запросов на действие.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m scripts.bench_feed_actions --actions 20000
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import event
+
+from app.db import SessionLocal, engine, init_db
+from app.models.listing import Listing
+from app.models.user import User
+from app.schemas import FeedActionCreate
+from app.services.feed import record_feed_action
+from app.services.feed_writer import write_feed_actions
+
+BENCH_TELEGRAM_ID = "bench-feed-actions"
+ACTIONS = ("like", "dislike", "favorite")
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+def ensure_listings(db, n: int) -> list[int]:
+    owner = db.query(User).filter(User.telegram_id == BENCH_TELEGRAM_ID).first()
+    if owner is None:
+        owner = User(role="landlord", name="Bench", telegram_id=BENCH_TELEGRAM_ID, is_active=True)
+        db.add(owner)
+        db.commit()
+    ids = [row.id for row in db.query(Listing.id).filter(Listing.owner_id == owner.id).limit(n)]
+    missing = n - len(ids)
+    if missing > 0:
+        db.add_all(
+            Listing(owner_id=owner.id, title=f"Bench {i}", city="Astana", price=100_000)
+            for i in range(missing)
+        )
+        db.commit()
+        ids = [row.id for row in db.query(Listing.id).filter(Listing.owner_id == owner.id).limit(n)]
+    return ids
+
+
+def make_events(n: int, listing_ids: list[int], first_user: int) -> list[tuple[int, FeedActionCreate]]:
+    rnd = random.Random(n)
+    return [
+        (
+            first_user + i % 100,
+            FeedActionCreate(listing_id=rnd.choice(listing_ids), action=rnd.choice(ACTIONS), source="bench"),
+        )
+        for i in range(n)
+    ]
+
+
+def run(name: str, n: int, fn) -> None:
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    started = time.perf_counter()
+    try:
+        fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(engine, "before_cursor_execute", counter)
+    print(f"{name:34} {n:8d} actions {elapsed:8.2f}s {n / elapsed:10.0f} actions/s "
+          f"{counter.count / n:6.2f} SQL/action")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--actions", type=int, default=20_000)
+    parser.add_argument("--single-actions", type=int, default=2_000,
+                        help="путь по одному медленный — меряем на меньшей выборке")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--listings", type=int, default=1_000)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        listing_ids = ensure_listings(db, args.listings)
+        # свежие user_id на каждый прогон, чтобы лиды/избранное реально вставлялись
+        first_user = int(time.time())
+        print(f"dialect: {db.get_bind().dialect.name}")
+
+        single = make_events(args.single_actions, listing_ids, first_user)
+
+        def one_by_one() -> None:
+            for user_id, action_in in single:
+                record_feed_action(db, user_id, action_in)
+                db.commit()
+
+        run("per action: insert + commit", len(single), one_by_one)
+
+        batched = make_events(args.actions, listing_ids, first_user + 1000)
+
+        def in_batches() -> None:
+            for i in range(0, len(batched), args.batch_size):
+                write_feed_actions(db, batched[i:i + args.batch_size])
+                db.commit()
+
+        run(f"batches of {args.batch_size}", len(batched), in_batches)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
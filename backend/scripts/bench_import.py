@@ -0,0 +1,109 @@
+"""
+Сравнение пропускной способности импорта объявлений:
+построчное создание через ORM (как POST /listings/: add + commit + refresh)
+против ListingImporter (COPY на PostgreSQL/psycopg2, многострочный upsert иначе).
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m scripts.bench_import --rows 20000
+"""
+import argparse
+import io
+import csv
+import time
+import uuid
+
+from app.db import SessionLocal, init_db
+from app.models.listing import Listing
+from app.models.user import User
+from app.schemas import ListingCreate
+from app.services.listing_import import DEFAULT_CHUNK_SIZE, ListingImporter
+
+BENCH_TELEGRAM_ID = "bench-import"
+CITIES = ("Astana", "Almaty", "Shymkent", "Karaganda")
+
+
+def ensure_owner(db) -> User:
+    user = db.query(User).filter(User.telegram_id == BENCH_TELEGRAM_ID).first()
+    if user is None:
+        user = User(role="landlord", name="Bench", telegram_id=BENCH_TELEGRAM_ID, is_active=True)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    return user
+
+
+def make_rows(n: int, prefix: str) -> list[dict]:
+    return [
+        {
+            "external_id": f"{prefix}-{i}",
+            "title": f"Bench listing {i}",
+            "city": CITIES[i % len(CITIES)],
+            "deal_type": "rent",
+            "property_type": "flat",
+            "price": str(100_000 + i % 300_000),
+        }
+        for i in range(n)
+    ]
+
+
+def to_csv_lines(rows: list[dict]) -> list[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().splitlines(keepends=True)
+
+
+def bench_orm(db, owner_id: int, rows: list[dict]) -> float:
+    started = time.perf_counter()
+    for row in rows:
+        listing = Listing(owner_id=owner_id, **ListingCreate.model_validate(row).model_dump(exclude={"owner_id"}))
+        db.add(listing)
+        db.commit()
+        db.refresh(listing)
+    return time.perf_counter() - started
+
+
+def bench_importer(db, owner_id: int, lines: list[str], chunk_size: int) -> float:
+    started = time.perf_counter()
+    importer = ListingImporter(db, owner_id, "csv", chunk_size=chunk_size)
+    for i in range(0, len(lines), chunk_size):
+        importer.add_lines(lines[i:i + chunk_size])
+    result = importer.finish()
+    assert result.failed == 0, result.errors[:5]
+    return time.perf_counter() - started
+
+
+def report(name: str, rows: int, seconds: float) -> None:
+    print(f"{name:34} {rows:8d} rows {seconds:8.2f}s {rows / seconds:10.0f} rows/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--orm-rows", type=int, default=2_000,
+                        help="построчный путь медленный — меряем на меньшей выборке")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        owner = ensure_owner(db)
+        run = uuid.uuid4().hex[:8]
+        print(f"dialect: {db.get_bind().dialect.name}")
+
+        report("ORM: add/commit/refresh per row", args.orm_rows,
+               bench_orm(db, owner.id, make_rows(args.orm_rows, f"orm-{run}")))
+
+        lines = to_csv_lines(make_rows(args.rows, f"imp-{run}"))
+        report("ListingImporter: insert", args.rows,
+               bench_importer(db, owner.id, lines, args.chunk_size))
+        # повторный прогон тех же external_id — путь обновления (upsert)
+        report("ListingImporter: upsert", args.rows,
+               bench_importer(db, owner.id, lines, args.chunk_size))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
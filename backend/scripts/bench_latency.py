@@ -0,0 +1,91 @@
+"""
+Бенчмарк горячих роутов под высокой конкуренцией: p50/p99 и rps.
+
+Сравнение sync- и async-стека — два прогона против одного и того же бэкенда,
+поднятого с ASYNC_DB_ENABLED=false и ASYNC_DB_ENABLED=true:
+
+    uvicorn app.main:app --port 8000                         # sync
+    ASYNC_DB_ENABLED=true uvicorn app.main:app --port 8000   # async
+    python -m scripts.bench_latency --base-url http://localhost:8000 \\
+        --users 50 --concurrency 200 --requests 5000
+
+Каждый виртуальный пользователь логинится через
+/auth/telegram/login-or-register, затем крутит цикл
+/feed/next -> /feed/action -> /listings/.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+
+import httpx
+
+from ._bench import LatencyRecorder
+
+ACTIONS = ("like", "dislike", "favorite")
+
+
+async def login(client: httpx.AsyncClient, recorder: LatencyRecorder, n: int) -> str:
+    payload = {"telegram_id": f"bench-{n}", "name": f"Bench {n}"}
+    with recorder.measure("POST /auth/telegram/login-or-register"):
+        resp = await client.post("/auth/telegram/login-or-register", json=payload)
+        resp.raise_for_status()
+    return resp.json()["access_token"]
+
+
+async def swipe(client: httpx.AsyncClient, recorder: LatencyRecorder, token: str) -> int:
+    headers = {"Authorization": f"Bearer {token}"}
+    with recorder.measure("GET /feed/next"):
+        resp = await client.get("/feed/next", headers=headers)
+        resp.raise_for_status()
+    listing = resp.json()
+    done = 1
+
+    if listing:
+        body = {"listing_id": listing["id"], "action": random.choice(ACTIONS), "source": "bench"}
+        with recorder.measure("POST /feed/action"):
+            resp = await client.post("/feed/action", headers=headers, json=body)
+            resp.raise_for_status()
+        done += 1
+
+    with recorder.measure("GET /listings/"):
+        resp = await client.get("/listings/", params={"limit": 20})
+        resp.raise_for_status()
+    return done + 1
+
+
+async def run(args) -> None:
+    recorder = LatencyRecorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0, limits=limits) as client:
+        tokens = [await login(client, recorder, n) for n in range(args.users)]
+        recorder = LatencyRecorder()  # логин прогрева в отчёт не идёт
+
+        budget = itertools.count()
+        token_cycle = itertools.cycle(tokens)
+
+        async def worker() -> None:
+            while next(budget) < args.requests:
+                try:
+                    await swipe(client, recorder, next(token_cycle))
+                except httpx.HTTPError:
+                    pass
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        recorder.stop()
+
+    print(recorder.report(f"{args.base_url}: concurrency={args.concurrency}, users={args.users}"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000, help="количество циклов свайпа")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Эффект кэша ответов на публичных GET /listings/ и GET /listings/{id}.
+
+Прогон в процессе (TestClient, без сети) одной и той же смеси запросов:
+кэш выключен / включён / включён + клиент шлёт If-None-Match (304).
+Доля --write-ratio запросов — изменение случайного объявления с
+инвалидацией, как в PUT /listings/{id}. Печатает p50/p99 и hit rate.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m scripts.bench_listing_cache --listings 5000
+"""
+import argparse
+import random
+
+from fastapi.testclient import TestClient
+
+from app import listing_cache
+from app.config import settings
+from app.db import SessionLocal
+from app.main import app
+from app.models.listing import Listing
+from app.models.user import User
+
+from ._bench import LatencyRecorder
+
+BENCH_TELEGRAM_ID = "bench-listing-cache"
+CITIES = ("Astana", "Almaty", "Shymkent", "Karaganda", "Aktobe")
+
+
+def ensure_listings(n: int) -> list[tuple[int, str]]:
+    db = SessionLocal()
+    try:
+        owner = db.query(User).filter(User.telegram_id == BENCH_TELEGRAM_ID).first()
+        if owner is None:
+            owner = User(role="landlord", name="Bench", telegram_id=BENCH_TELEGRAM_ID, is_active=True)
+            db.add(owner)
+            db.commit()
+        have = db.query(Listing).filter(Listing.owner_id == owner.id).count()
+        if have < n:
+            db.add_all(
+                Listing(
+                    owner_id=owner.id,
+                    title=f"Bench {i}",
+                    city=CITIES[i % len(CITIES)],
+                    price=100_000 + i,
+                )
+                for i in range(have, n)
+            )
+            db.commit()
+        return [
+            (row.id, row.city)
+            for row in db.query(Listing.id, Listing.city).filter(Listing.owner_id == owner.id).limit(n)
+        ]
+    finally:
+        db.close()
+
+
+def write(listings: list[tuple[int, str]], rnd: random.Random) -> None:
+    listing_id, city = rnd.choice(listings)
+    db = SessionLocal()
+    try:
+        db.query(Listing).filter(Listing.id == listing_id).update(
+            {Listing.price: rnd.randint(100_000, 500_000)}
+        )
+        db.commit()
+    finally:
+        db.close()
+    listing_cache.invalidate_listing(listing_id, [city])
+
+
+def run(client: TestClient, listings, args, title: str, conditional: bool) -> None:
+    rnd = random.Random(42)
+    etags: dict[str, str] = {}
+    recorder = LatencyRecorder()
+    before = listing_cache.stats.as_dict()
+
+    for _ in range(args.requests):
+        if rnd.random() < args.write_ratio:
+            write(listings, rnd)
+            continue
+        if rnd.random() < 0.5:
+            name = "GET /listings/?city="
+            url = f"/listings/?city={rnd.choice(CITIES)}&limit={args.limit}"
+        else:
+            name = "GET /listings/{id}"
+            # горячие объявления: 80% запросов на 10% id
+            hot = listings[: max(1, len(listings) // 10)]
+            url = f"/listings/{rnd.choice(hot if rnd.random() < 0.8 else listings)[0]}"
+
+        headers = {"If-None-Match": etags[url]} if conditional and url in etags else {}
+        with recorder.measure(name):
+            resp = client.get(url, headers=headers)
+        if resp.status_code == 200 and "etag" in resp.headers:
+            etags[url] = resp.headers["etag"]
+    recorder.stop()
+
+    after = listing_cache.stats.as_dict()
+    hits = after["hits"] - before["hits"]
+    lookups = hits + after["misses"] - before["misses"]
+    not_modified = after["not_modified"] - before["not_modified"]
+    print(recorder.report(title))
+    print(f"hit rate: {hits / lookups if lookups else 0:.1%}, 304: {not_modified}\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, default=5_000)
+    parser.add_argument("--requests", type=int, default=3_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--write-ratio", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        listings = ensure_listings(args.listings)
+
+        settings.listing_cache_enabled = False
+        run(client, listings, args, "cache off", conditional=False)
+
+        settings.listing_cache_enabled = True
+        listing_cache.listing_cache.clear()
+        run(client, listings, args, "cache on", conditional=False)
+        run(client, listings, args, "cache on + If-None-Match", conditional=True)
+
+
+if __name__ == "__main__":
+    main()
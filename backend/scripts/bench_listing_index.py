@@ -0,0 +1,150 @@
+"""
+Кандидаты ленты из колоночного индекса (services.listing_index) против
+запроса к БД: время и совпадение результатов.
+
+    python -m scripts.bench_listing_index --synthetic 300000
+    DATABASE_URL=sqlite:////tmp/load.db python -m scripts.bench_listing_index --db-users 200
+
+--synthetic — индекс из N случайных объявлений без БД: время маски и top-N
+при разных предпочтениях. --db-users — арендаторы scripts.seed_data:
+feed.candidate_listing_ids и ranking.candidate_pool против
+ListingIndex.recent_ids / pool на той же БД; расхождения печатаются.
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.config import settings
+from app.services.listing_index import ListingIndex
+
+from .seed_data import CITIES
+
+
+def _median_ms(samples: list[float]) -> float:
+    return statistics.median(samples) * 1000
+
+
+def synthetic_index(n: int, rnd: random.Random) -> ListingIndex:
+    index = ListingIndex(refresh_seconds=0)
+    now = datetime.now(timezone.utc)
+    cities = list(CITIES)
+    # как в проде: объявления добавляются от старых к свежим
+    ages = sorted((rnd.uniform(0, 90) for _ in range(n)), reverse=True)
+    with index._lock:
+        for i, age in enumerate(ages, start=1):
+            index._put(
+                i,
+                rnd.choice(cities),
+                rnd.choice(("rent", "rent", "rent", "sale")),
+                rnd.choice(("flat", "house", "room")),
+                Decimal(rnd.randrange(50_000, 400_000, 1000)),
+                now - timedelta(days=age),
+                True,
+            )
+    index._loaded = True
+    return index
+
+
+def bench_synthetic(n: int, repeat: int, limit: int, seen: int) -> None:
+    rnd = random.Random(1)
+    started = time.perf_counter()
+    index = synthetic_index(n, rnd)
+    print(f"synthetic index: {n} listings in {time.perf_counter() - started:.1f} s, {index.stats()['memory_bytes'] / 2**20:.1f} MiB")
+    # просмотренные — в основном свежие: лента показывает их первыми
+    exclude = np.array(rnd.sample(range(max(1, n - 10 * seen), n + 1), min(seen, n)), dtype=np.int64)
+    prefs = {
+        "none": None,
+        "city": SimpleNamespace(city="Astana", deal_type=None, property_type=None, price_min=None, price_max=None),
+        "full": SimpleNamespace(
+            city="Astana", deal_type="rent", property_type="flat",
+            price_min=Decimal(100_000), price_max=Decimal(250_000),
+        ),
+        "no match": SimpleNamespace(city="Nowhere", deal_type=None, property_type=None, price_min=None, price_max=None),
+    }
+    print(f"{'preferences':>12} {'recent ms':>10} {'pool ms':>9}")
+    for name, pref in prefs.items():
+        recent, pool = [], []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            index.recent_ids(pref, limit, exclude)
+            recent.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            index.pool(pref, settings.feed_rank_pool_size, exclude)
+            pool.append(time.perf_counter() - t)
+        print(f"{name:>12} {_median_ms(recent):10.3f} {_median_ms(pool):9.3f}")
+
+
+def bench_db(users: int, prefix: str, limit: int) -> None:
+    from app.db import SessionLocal
+    from app.models.user import User
+    from app.services.feed import candidate_listing_ids, get_preferences
+    from app.services.ranking import candidate_pool
+    from app.services.seen_sets import seen_ids
+
+    db = SessionLocal()
+    try:
+        ids = [row.id for row in db.query(User.id).filter(User.telegram_id.like(f"{prefix}-%")).limit(users)]
+        if not ids:
+            print(f"no users with prefix {prefix!r}: run scripts.seed_data first")
+            return
+        index = ListingIndex(refresh_seconds=0)
+        started = time.perf_counter()
+        index.load(db)
+        print(f"db index: {len(index)} listings in {time.perf_counter() - started:.2f} s")
+
+        size = settings.feed_rank_pool_size
+        timings = {"db recent": [], "index recent": [], "db pool": [], "index pool": [], "seen ids": []}
+        mismatches = 0
+        for user_id in ids:
+            pref = get_preferences(db, user_id)
+
+            t = time.perf_counter()
+            expected = candidate_listing_ids(db, user_id, pref, limit)
+            timings["db recent"].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            rows = candidate_pool(db, user_id, pref, size)
+            timings["db pool"].append(time.perf_counter() - t)
+
+            t = time.perf_counter()
+            seen = seen_ids(db, user_id)
+            timings["seen ids"].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            got = index.recent_ids(pref, limit, seen)
+            timings["index recent"].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            columns = index.pool(pref, size, seen)
+            timings["index pool"].append(time.perf_counter() - t)
+
+            if got != expected or set(columns["ids"].tolist()) != {r.id for r in rows}:
+                mismatches += 1
+        for name, samples in timings.items():
+            print(f"{name:>13}: median {_median_ms(samples):7.3f} ms, max {max(samples) * 1000:7.3f} ms")
+        print(f"users={len(ids)} mismatches={mismatches}")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="размер синтетического индекса")
+    parser.add_argument("--seen", type=int, default=2_000, help="просмотренных id в синтетическом прогоне")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=settings.feed_queue_size)
+    parser.add_argument("--db-users", type=int, default=0)
+    parser.add_argument("--prefix", default="seed")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        bench_synthetic(args.synthetic, args.repeat, args.limit, args.seen)
+    if args.db_users:
+        bench_db(args.db_users, args.prefix, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Обратный индекс предпочтений (services.matching): поиск подписчиков для
+новых объявлений против полного перебора всех предпочтений.
+
+    python -m scripts.bench_matching --preferences 200000 --listings 5000
+
+Предпочтения и объявления синтетические (города и цены — как в
+scripts.seed_data), БД не нужна. Результаты индекса сверяются с перебором,
+расхождения печатаются.
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from app.services.matching import PreferenceIndex
+
+from .seed_data import BASE_PRICE, CITIES, DEAL_TYPES, PROPERTY_TYPES, pick
+
+
+def synthetic_preferences(n: int, rnd: random.Random) -> list[tuple]:
+    cities = list(CITIES)
+    rows = []
+    for user_id in range(1, n + 1):
+        deal_type = pick(rnd, DEAL_TYPES) if rnd.random() < 0.6 else None
+        base = BASE_PRICE[deal_type or "rent"]
+        price_min = Decimal(round(base * rnd.uniform(0.3, 1.0), -3)) if rnd.random() < 0.3 else None
+        price_max = Decimal(round(base * rnd.uniform(1.0, 2.5), -3)) if rnd.random() < 0.7 else None
+        rows.append((
+            user_id,
+            rnd.choice(cities) if rnd.random() < 0.9 else None,
+            deal_type,
+            pick(rnd, PROPERTY_TYPES) if rnd.random() < 0.3 else None,
+            price_min,
+            price_max,
+        ))
+    return rows
+
+
+def synthetic_listings(n: int, rnd: random.Random) -> list[tuple]:
+    cities = list(CITIES)
+    rows = []
+    for _ in range(n):
+        city = rnd.choice(cities)
+        deal_type = pick(rnd, DEAL_TYPES)
+        price = BASE_PRICE[deal_type] * CITIES[city] * rnd.lognormvariate(0, 0.35)
+        rows.append((city, deal_type, pick(rnd, PROPERTY_TYPES), Decimal(round(price, -3))))
+    return rows
+
+
+class Scan:
+    """
+    Полный перебор колонками: то, что индекс заменяет.
+    """
+
+    def __init__(self, prefs: list[tuple]):
+        users, city, deal_type, property_type, price_min, price_max = zip(*prefs)
+        self.users = np.array(users, dtype=np.int64)
+        self.city = np.array(city, dtype=object)
+        self.deal_type = np.array(deal_type, dtype=object)
+        self.property_type = np.array(property_type, dtype=object)
+        self.lo = np.array([-np.inf if v is None else float(v) for v in price_min])
+        self.hi = np.array([np.inf if v is None else float(v) for v in price_max])
+        self.empty = (
+            (self.city == None) & (self.deal_type == None) & (self.property_type == None)  # noqa: E711
+            & np.isinf(self.lo) & np.isinf(self.hi)
+        )
+
+    def match(self, city, deal_type, property_type, price) -> np.ndarray:
+        price = float(price)
+        mask = (
+            ((self.city == None) | (self.city == city))  # noqa: E711
+            & ((self.deal_type == None) | (self.deal_type == deal_type))  # noqa: E711
+            & ((self.property_type == None) | (self.property_type == property_type))  # noqa: E711
+            & (self.lo <= price) & (self.hi >= price)
+            & ~self.empty
+        )
+        return self.users[mask]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preferences", type=int, default=200_000)
+    parser.add_argument("--listings", type=int, default=5_000)
+    parser.add_argument("--scan-listings", type=int, default=200, help="сколько объявлений прогнать перебором")
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    prefs = synthetic_preferences(args.preferences, rnd)
+    listings = synthetic_listings(args.listings, rnd)
+
+    index = PreferenceIndex(refresh_seconds=0)
+    started = time.perf_counter()
+    with index._lock:
+        for row in prefs:
+            index._put(*row)
+    index._loaded = True
+    for key in list(index._buckets):
+        index._tree(key)
+    print(f"index: {len(index)} subscriptions, {len(index._buckets)} buckets, built in {time.perf_counter() - started:.2f} s")
+
+    # для сверки храним только первые scan_listings результатов
+    matched, total = [], 0
+    started = time.perf_counter()
+    for i, listing in enumerate(listings):
+        users = index.match(*listing)
+        total += len(users)
+        if i < args.scan_listings:
+            matched.append(users)
+    elapsed = time.perf_counter() - started
+    print(
+        f"index: {len(listings)} listings in {elapsed * 1000:.0f} ms "
+        f"({elapsed / len(listings) * 1e6:.0f} us/listing), {total / len(listings):.0f} matches/listing"
+    )
+
+    scan = Scan(prefs)
+    sample = listings[: args.scan_listings]
+    started = time.perf_counter()
+    expected = [scan.match(*listing) for listing in sample]
+    elapsed = time.perf_counter() - started
+    print(f"scan:  {len(sample)} listings, {elapsed / len(sample) * 1e6:.0f} us/listing")
+
+    mismatches = sum(
+        not np.array_equal(np.sort(got), np.sort(want)) for got, want in zip(matched, expected)
+    )
+    print(f"checked={len(sample)} mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    main()
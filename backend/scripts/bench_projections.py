@@ -0,0 +1,155 @@
+"""
+ORM-сущности против выборки колонок (Row) на чтение: время и пик памяти.
+
+Сценарии (на каждом — одинаковый SQL, разница только в том, что материализуется):
+- страница списка (GET /listings/?city=) по --page строк;
+- кандидаты ленты (unseen_active_listings + фильтры предпочтений);
+- загрузка --bulk строк целиком (.all()) — стоимость identity map;
+- потоковый проход по всем активным объявлениям (yield_per, как ndjson).
+
+Данные: --rows объявлений (по умолчанию 1M), досоздаются при нехватке.
+
+    DATABASE_URL=postgresql://... python -m scripts.bench_projections --rows 1000000
+"""
+import argparse
+import time
+import tracemalloc
+from decimal import Decimal
+
+from sqlalchemy import func, insert
+
+from app.db import SessionLocal, init_db
+from app.models.listing import Listing
+from app.models.preferences import TenantPreference
+from app.models.user import User
+from app.serialization import LISTING_ROWS
+from app.services.feed import apply_preference_filters, unseen_active_listings
+
+BENCH_TELEGRAM_ID = "bench-projections"
+CITIES = ("Astana", "Almaty", "Shymkent", "Karaganda", "Aktobe")
+SEED_CHUNK = 10_000
+
+
+def ensure_listings(db, n: int) -> int:
+    owner = db.query(User).filter(User.telegram_id == BENCH_TELEGRAM_ID).first()
+    if owner is None:
+        owner = User(role="landlord", name="Bench", telegram_id=BENCH_TELEGRAM_ID, is_active=True)
+        db.add(owner)
+        db.commit()
+    have = db.query(func.count(Listing.id)).filter(Listing.owner_id == owner.id).scalar()
+    for start in range(have, n, SEED_CHUNK):
+        db.execute(
+            insert(Listing),
+            [
+                {
+                    "owner_id": owner.id,
+                    "title": f"Bench listing {i}",
+                    "city": CITIES[i % len(CITIES)],
+                    "deal_type": "rent" if i % 3 else "sale",
+                    "property_type": "flat",
+                    "price": Decimal(100_000 + i % 400_000),
+                    "is_active": i % 10 != 0,
+                }
+                for i in range(start, min(n, start + SEED_CHUNK))
+            ],
+        )
+        db.commit()
+        print(f"\rseeded {min(n, start + SEED_CHUNK)}/{n}", end="", flush=True)
+    if have < n:
+        print()
+    return owner.id
+
+
+def measure(fn, number: int) -> tuple[float, float]:
+    """
+    -> (среднее время, с; пик памяти, МБ). Память меряется отдельным прогоном.
+    """
+    fn()  # прогрев
+    started = time.perf_counter()
+    for _ in range(number):
+        fn()
+    elapsed = (time.perf_counter() - started) / number
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def compare(name: str, number: int, entities, rows) -> None:
+    e_time, e_mem = measure(entities, number)
+    r_time, r_mem = measure(rows, number)
+    print(
+        f"{name:34} entities {e_time * 1000:9.2f} ms {e_mem:8.2f} MB | "
+        f"rows {r_time * 1000:9.2f} ms {r_mem:8.2f} MB | "
+        f"x{e_time / r_time:4.1f} faster, x{e_mem / r_mem if r_mem else 0:4.1f} less memory"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--bulk", type=int, default=100_000)
+    parser.add_argument("--number", type=int, default=5)
+    parser.add_argument("--no-stream", action="store_true", help="пропустить проход по всей таблице")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        ensure_listings(db, args.rows)
+        print(f"dialect: {db.get_bind().dialect.name}, listings: {db.query(func.count(Listing.id)).scalar()}")
+        order = (Listing.created_at.desc(), Listing.id.desc())
+        pref = TenantPreference(user_id=0, city="Astana", deal_type="rent", price_max=Decimal(300_000))
+
+        def run(query_fn, method):
+            def call():
+                result = method(query_fn())
+                db.expunge_all()  # как в конце запроса: сессия закрывается
+                return result
+            return call
+
+        def listing_page(*cols):
+            return (
+                db.query(*cols)
+                .filter(Listing.is_active.is_(True), Listing.city == "Astana")
+                .order_by(*order)
+                .limit(args.page)
+            )
+
+        compare(
+            f"list page ({args.page})", args.number,
+            run(lambda: listing_page(Listing), lambda q: q.all()),
+            run(lambda: listing_page(*LISTING_ROWS.columns), lambda q: q.all()),
+        )
+        compare(
+            "feed candidates (100)", args.number,
+            run(lambda: apply_preference_filters(unseen_active_listings(db, 0), pref).limit(100), lambda q: q.all()),
+            run(lambda: apply_preference_filters(
+                unseen_active_listings(db, 0, *LISTING_ROWS.columns), pref).limit(100), lambda q: q.all()),
+        )
+        compare(
+            f"bulk load ({args.bulk})", 1,
+            run(lambda: db.query(Listing).order_by(Listing.id).limit(args.bulk), lambda q: q.all()),
+            run(lambda: db.query(*LISTING_ROWS.columns).order_by(Listing.id).limit(args.bulk), lambda q: q.all()),
+        )
+        if not args.no_stream:
+            def stream(q):
+                count = 0
+                for _ in q.yield_per(500):
+                    count += 1
+                return count
+
+            compare(
+                "stream all active (yield_per)", 1,
+                run(lambda: db.query(Listing).filter(Listing.is_active.is_(True)), stream),
+                run(lambda: db.query(*LISTING_ROWS.columns).filter(Listing.is_active.is_(True)), stream),
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Скоринг кандидатов ленты (services.ranking): NumPy по пачке против того же
+расчёта циклом по объявлениям, плюс полный rank_candidates на реальной БД.
+
+    python -m scripts.bench_ranking --sizes 500,2000,10000
+    DATABASE_URL=sqlite:////tmp/load.db python -m scripts.bench_ranking --db-users 50
+
+--db-users — сколько арендаторов scripts.seed_data прогнать через
+rank_candidates (пул из БД + популярность + скоринг).
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.config import settings
+from app.services.ranking import (
+    PRICE_TOLERANCE,
+    CandidateBatch,
+    feature_weights,
+    order_batch,
+    rank_candidates,
+    score_batch,
+)
+
+from .seed_data import CITIES
+
+
+def synthetic_rows(n: int, rnd: random.Random) -> list:
+    now = datetime.now(timezone.utc)
+    return [
+        (
+            i,
+            rnd.choice(list(CITIES)),
+            rnd.choice(("rent", "rent", "rent", "sale")),
+            rnd.choice(("flat", "house", "room")),
+            Decimal(rnd.randrange(50_000, 400_000, 1000)),
+            now - timedelta(days=rnd.uniform(0, 90)),
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def python_scores(rows, pref, likes, now: float) -> list[float]:
+    """
+    Тот же расчёт, что score_batch, но по одному объявлению — для сравнения.
+    """
+    w = feature_weights()
+    half_life = settings.feed_rank_freshness_half_life_days
+    top = max((math.log1p(likes.get(r[0], 0)) for r in rows), default=0.0)
+    scores = []
+    for listing_id, city, deal_type, property_type, price, created_at in rows:
+        price = float(price)
+        distance = 0.0
+        if pref.price_min:
+            distance = max(distance, (float(pref.price_min) - price) / float(pref.price_min))
+        if pref.price_max:
+            distance = max(distance, (price - float(pref.price_max)) / float(pref.price_max))
+        age = max(now - created_at.timestamp(), 0.0) / 86400
+        pop = math.log1p(likes.get(listing_id, 0))
+        scores.append(
+            w["city"] * (not pref.city or city == pref.city)
+            + w["deal_type"] * (not pref.deal_type or deal_type == pref.deal_type)
+            + w["property_type"] * (not pref.property_type or property_type == pref.property_type)
+            + w["price"] * math.exp(-distance / PRICE_TOLERANCE)
+            + w["freshness"] * 2 ** (-age / half_life)
+            + w["popularity"] * (pop / top if top else 0.0)
+        )
+    return scores
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def bench_scoring(sizes: list[int], repeat: int, limit: int) -> None:
+    rnd = random.Random(1)
+    pref = SimpleNamespace(
+        city="Astana", deal_type="rent", property_type="flat",
+        price_min=Decimal(100_000), price_max=Decimal(250_000),
+    )
+    print(f"{'candidates':>10} {'build ms':>9} {'numpy ms':>9} {'python ms':>10} {'speedup':>8}")
+    for n in sizes:
+        rows = synthetic_rows(n, rnd)
+        likes = {r[0]: int(rnd.paretovariate(1.2)) for r in rows}
+        now = time.time()
+        build = timed(lambda: CandidateBatch.from_rows(rows, pref, likes, now=now), repeat)
+        batch = CandidateBatch.from_rows(rows, pref, likes, now=now)
+        vector = timed(lambda: order_batch(batch, score_batch(batch), limit), repeat)
+        loop = timed(
+            lambda: sorted(zip(python_scores(rows, pref, likes, now), (r[0] for r in rows)), reverse=True)[:limit],
+            repeat,
+        )
+        print(f"{n:10d} {build:9.3f} {vector:9.3f} {loop:10.3f} {loop / vector:7.1f}x")
+
+
+def bench_db(users: int, prefix: str, limit: int) -> None:
+    from app.db import SessionLocal
+    from app.models.user import User
+    from app.services.feed import get_preferences
+
+    db = SessionLocal()
+    try:
+        ids = [
+            row.id for row in db.query(User.id).filter(User.telegram_id.like(f"{prefix}-%")).limit(users)
+        ]
+        if not ids:
+            print(f"no users with prefix {prefix!r}: run scripts.seed_data first")
+            return
+        for name in ("recency", "score"):
+            settings.feed_ranker = name
+            samples = []
+            for user_id in ids:
+                pref = get_preferences(db, user_id)
+                started = time.perf_counter()
+                rank_candidates(db, user_id, pref, limit)
+                samples.append(time.perf_counter() - started)
+            print(
+                f"rank_candidates[{name:7}] users={len(ids)} "
+                f"median {statistics.median(samples) * 1000:7.2f} ms, max {max(samples) * 1000:7.2f} ms"
+            )
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="500,2000,10000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=settings.feed_queue_size)
+    parser.add_argument("--db-users", type=int, default=0)
+    parser.add_argument("--prefix", default="seed")
+    args = parser.parse_args()
+
+    bench_scoring([int(s) for s in args.sizes.split(",")], args.repeat, args.limit)
+    if args.db_users:
+        bench_db(args.db_users, args.prefix, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Кандидаты ленты в зависимости от числа просмотренных:
+- anti-join: feed.candidate_listing_ids, NOT IN по feed_actions в SQL;
+- index + history: колоночный индекс (services.listing_index), история
+  пользователя читается из feed_actions;
+- index + seen-set: то же, просмотренные — из user_seen_sets (services.seen_sets);
+плюс размер множества, его распаковка и чтение из кэша процесса.
+
+    DATABASE_URL=sqlite:////tmp/load.db python -m scripts.bench_seen_sets
+    DATABASE_URL=... python -m scripts.bench_seen_sets --seen 0,1000,10000
+
+На каждое значение --seen заводится временный пользователь (без строки в
+users), который уже видел столько самых свежих объявлений — как после
+долгого листания ленты без фильтров. Его feed_actions и seen-set пишутся
+в БД из DATABASE_URL и удаляются в конце.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+
+from app.config import settings
+from app.db import SessionLocal, init_db
+from app.models.feed_action import FeedAction
+from app.models.listing import Listing
+from app.models.user_seen_set import UserSeenSet
+from app.services.feed import candidate_listing_ids
+from app.services.listing_index import ListingIndex
+from app.services.seen_sets import _cache, decode_ids, encode_ids, merge_seen, seen_ids
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def make_user(db, user_id: int, listing_ids: list[int]) -> None:
+    for start in range(0, len(listing_ids), 5_000):
+        db.execute(insert(FeedAction), [
+            {"user_id": user_id, "listing_id": lid, "action": "dislike", "source": "bench"}
+            for lid in listing_ids[start:start + 5_000]
+        ])
+    merge_seen(db, {user_id: np.array(listing_ids, dtype=np.int64)})
+    db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seen", default="0,100,1000,5000,15000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=settings.feed_queue_size)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    counts = [int(s) for s in args.seen.split(",")]
+    newest = list(
+        db.execute(
+            select(Listing.id)
+            .where(Listing.is_active.is_(True))
+            .order_by(Listing.created_at.desc(), Listing.id.desc())
+            .limit(max(counts))
+        ).scalars()
+    )
+    if len(newest) < max(counts):
+        print(f"only {len(newest)} active listings: run scripts.seed_data with more --listings")
+    base_id = (db.scalar(select(func.max(FeedAction.user_id))) or 0) + 1_000_000
+    users = {n: base_id + i for i, n in enumerate(counts)}
+    index = ListingIndex(refresh_seconds=0)
+    index.load(db)
+
+    print(
+        f"{'seen':>7} {'blob KiB':>9} {'decode ms':>10} {'cached ms':>10} "
+        f"{'anti-join ms':>13} {'index+history ms':>17} {'index+seen-set ms':>18}"
+    )
+    recent = lambda: index.recent_ids(None, args.limit, seen_ids(db, user_id))  # noqa: E731
+    try:
+        for n, user_id in users.items():
+            make_user(db, user_id, newest[:n])
+            blob = encode_ids(newest[:n])
+            decode = timed(lambda: decode_ids(blob), args.repeat)
+
+            anti_join = timed(lambda: candidate_listing_ids(db, user_id, None, args.limit), args.repeat)
+            expected = candidate_listing_ids(db, user_id, None, args.limit)
+
+            settings.feed_seen_set_enabled = False
+            history = timed(recent, args.repeat)
+
+            settings.feed_seen_set_enabled = True
+            _cache.clear()
+            # с кэшем процесса: проверка version + готовый массив
+            cached = timed(lambda: seen_ids(db, user_id), args.repeat)
+            seen_set = timed(recent, args.repeat)
+            assert recent() == expected
+
+            print(
+                f"{n:7d} {len(blob) / 1024:9.1f} {decode:10.3f} {cached:10.3f} "
+                f"{anti_join:13.3f} {history:17.3f} {seen_set:18.3f}"
+            )
+    finally:
+        user_ids = list(users.values())
+        db.rollback()
+        db.execute(delete(FeedAction).where(FeedAction.user_id.in_(user_ids)))
+        db.execute(delete(UserSeenSet).where(UserSeenSet.user_id.in_(user_ids)))
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
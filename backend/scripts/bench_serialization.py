@@ -0,0 +1,115 @@
+"""
+Стоимость сериализации строки списка объявлений (us/row), до и после.
+
+- serialize only: одна и та же страница в памяти —
+  ORM-сущности -> response_model (валидация + dump_json, как FastAPI),
+  то же через jsonable_encoder + json.dumps (старый путь FastAPI /
+  свой response_class), кортежи колонок -> RowSchema (orjson и без него);
+- query + serialize: выборка страницы из БД целиком (сущности vs колонки).
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m scripts.bench_serialization --rows 1000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from app import serialization
+from app.db import SessionLocal, init_db
+from app.models.listing import Listing
+from app.models.user import User
+from app.schemas import ListingRead
+from app.serialization import LISTING_ROWS
+
+BENCH_TELEGRAM_ID = "bench-serialization"
+
+listings_adapter = TypeAdapter(list[ListingRead])
+
+
+def make_entities(n: int) -> list[Listing]:
+    now = datetime.now(timezone.utc)
+    return [
+        Listing(
+            id=i, owner_id=1, title=f"Listing {i}", city="Astana", deal_type="rent",
+            property_type="flat", price=Decimal("250000.00"), is_active=True,
+            external_id=None, created_at=now, updated_at=now,
+        )
+        for i in range(n)
+    ]
+
+
+def as_rows(entities: list[Listing]) -> list[tuple]:
+    return [tuple(getattr(e, f) for f in LISTING_ROWS.fields) for e in entities]
+
+
+def ensure_listings(db, n: int) -> int:
+    owner = db.query(User).filter(User.telegram_id == BENCH_TELEGRAM_ID).first()
+    if owner is None:
+        owner = User(role="landlord", name="Bench", telegram_id=BENCH_TELEGRAM_ID, is_active=True)
+        db.add(owner)
+        db.commit()
+    have = db.query(Listing).filter(Listing.owner_id == owner.id).count()
+    if have < n:
+        db.add_all(
+            Listing(owner_id=owner.id, title=f"Bench {i}", city="Astana", price=100_000 + i)
+            for i in range(have, n)
+        )
+        db.commit()
+    return owner.id
+
+
+def report(name: str, seconds: float, rows: int) -> None:
+    print(f"{name:48} {seconds / rows * 1e6:8.2f} us/row")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000, help="строк на страницу")
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+    n, number = args.rows, args.number
+    total = n * number
+
+    entities = make_entities(n)
+    rows = as_rows(entities)
+    print(f"serialize only ({n} rows/page, orjson: {serialization.orjson is not None})")
+    report("response_model: validate + dump_json", timeit.timeit(
+        lambda: listings_adapter.dump_json(listings_adapter.validate_python(entities, from_attributes=True)),
+        number=number), total)
+    report("response_model: jsonable_encoder + json.dumps", timeit.timeit(
+        lambda: json.dumps(jsonable_encoder(listings_adapter.validate_python(entities, from_attributes=True))).encode(),
+        number=number), total)
+    report("RowSchema.dump (orjson)", timeit.timeit(lambda: LISTING_ROWS.dump(rows), number=number), total)
+    report("RowSchema rows -> pydantic_core.to_json", timeit.timeit(
+        lambda: to_json([LISTING_ROWS.to_dict(r) for r in rows]), number=number), total)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        owner_id = ensure_listings(db, n)
+        order = (Listing.created_at.desc(), Listing.id.desc())
+
+        def entities_page() -> bytes:
+            page = db.query(Listing).filter(Listing.owner_id == owner_id).order_by(*order).limit(n).all()
+            db.expunge_all()
+            return listings_adapter.dump_json(listings_adapter.validate_python(page, from_attributes=True))
+
+        def rows_page() -> bytes:
+            page = db.query(*LISTING_ROWS.columns).filter(Listing.owner_id == owner_id).order_by(*order).limit(n).all()
+            return LISTING_ROWS.dump(page)
+
+        assert entities_page() == rows_page()
+        print(f"\nquery + serialize ({db.get_bind().dialect.name})")
+        report("ORM entities + response_model", timeit.timeit(entities_page, number=number), total)
+        report("column tuples + RowSchema", timeit.timeit(rows_page, number=number), total)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
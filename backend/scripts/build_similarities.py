@@ -0,0 +1,34 @@
+"""
+Пересчёт похожих объявлений (item-item CF по лайкам, services.recommendations).
+
+По умолчанию инкрементально: только свайпы после прошлого запуска (состояние
+в CF_STATE_PATH); без файла состояния или с --full — полный пересчёт.
+Запускать по cron, например каждый час инкрементально и раз в неделю --full:
+
+    python -m scripts.build_similarities
+    python -m scripts.build_similarities --full
+"""
+import argparse
+import json
+import logging
+
+from app.db import SessionLocal, init_db
+from app.services.recommendations import rebuild_similarities
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="пересчитать всё с нуля")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print(json.dumps(rebuild_similarities(db, full=args.full)))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Массовый импорт объявлений из файла (CSV или NDJSON) от имени владельца.
+
+    DATABASE_URL=postgresql://... python -m scripts.import_listings listings.csv --owner-id 42
+
+Формат определяется по расширению файла (.csv / .ndjson / .jsonl), либо --format.
+"""
+import argparse
+import sys
+import time
+from itertools import islice
+
+from app.db import SessionLocal
+from app.models.user import User
+from app.services.listing_import import DEFAULT_CHUNK_SIZE, FORMATS, ListingImporter
+
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+def guess_format(path: str) -> str | None:
+    for ext, fmt in EXTENSIONS.items():
+        if path.lower().endswith(ext):
+            return fmt
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file")
+    parser.add_argument("--owner-id", type=int, required=True)
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or guess_format(args.file)
+    if fmt is None:
+        print("import_listings: не удалось определить формат, укажите --format")
+        return 2
+
+    db = SessionLocal()
+    try:
+        if db.get(User, args.owner_id) is None:
+            print(f"import_listings: пользователь {args.owner_id} не найден")
+            return 2
+
+        importer = ListingImporter(db, args.owner_id, fmt, chunk_size=args.chunk_size)
+        started = time.perf_counter()
+        with open(args.file, encoding="utf-8-sig", newline="") as f:
+            while lines := list(islice(f, args.chunk_size)):
+                importer.add_lines(lines)
+        result = importer.finish()
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    print(
+        f"processed: {result.processed}, imported: {result.imported}, "
+        f"failed: {result.failed} in {elapsed:.2f}s "
+        f"({result.processed / elapsed if elapsed else 0:.0f} rows/s)"
+    )
+    for error in result.errors:
+        print(f"  row {error.row}: {error.error}")
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Нагрузочный тест API по сценариям с заданной конкурентностью.
+
+Виртуальные пользователи логинятся через /auth/telegram/login-or-register
+под арендаторами из scripts.seed_data ("<prefix>-<n>"; на пустой БД они
+создаются при логине) и крутят взвешенную смесь сценариев:
+
+- swipe:     GET /feed/next -> POST /feed/action
+- browse:    GET /listings/?city= (+ следующая страница по X-Next-Cursor)
+- favorites: GET /favorites/
+- login:     POST /auth/telegram/login-or-register
+
+Без --base-url приложение поднимается в этом же процессе (httpx ASGI
+transport) на БД из DATABASE_URL — удобно для SQLite, но клиент и сервер
+делят один процесс. Для честных цифр — uvicorn с воркерами и --base-url:
+
+    DATABASE_URL=sqlite:////tmp/load.db python -m scripts.seed_data --users 2000 --listings 20000
+    DATABASE_URL=sqlite:////tmp/load.db python -m scripts.loadtest --duration 30 --concurrency 50
+    python -m scripts.loadtest --base-url http://localhost:8000 \\
+        --mix swipe=6,browse=3,favorites=1 --concurrency 200 --duration 60 --json result.json
+
+Печатает rps и перцентили задержки по каждому эндпоинту.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import time
+
+import httpx
+
+from ._bench import LatencyRecorder
+from .seed_data import CITIES
+
+ACTIONS = ("like", "dislike", "favorite")
+DEFAULT_MIX = "swipe=6,browse=3,favorites=1,login=0.5"
+
+
+class VirtualUser:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        recorder: LatencyRecorder,
+        telegram_id: str,
+        rnd: random.Random,
+        cities: list[str],
+    ):
+        self.client = client
+        self.recorder = recorder
+        self.telegram_id = telegram_id
+        self.rnd = rnd
+        self.cities = cities
+        self.headers: dict[str, str] = {}
+
+    async def request(self, method: str, path: str, name: str | None = None, **kwargs) -> httpx.Response:
+        with self.recorder.measure(name or f"{method} {path}"):
+            resp = await self.client.request(method, path, **kwargs)
+            resp.raise_for_status()
+        return resp
+
+    async def login(self) -> None:
+        payload = {"telegram_id": self.telegram_id, "name": f"Load {self.telegram_id}"}
+        resp = await self.request("POST", "/auth/telegram/login-or-register", json=payload)
+        self.headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    async def swipe(self) -> None:
+        resp = await self.request("GET", "/feed/next", headers=self.headers)
+        listing = resp.json()
+        if listing:
+            body = {"listing_id": listing["id"], "action": self.rnd.choice(ACTIONS), "source": "load"}
+            await self.request("POST", "/feed/action", headers=self.headers, json=body)
+
+    async def browse(self) -> None:
+        params = {"limit": 20}
+        if self.rnd.random() < 0.8:
+            params["city"] = self.rnd.choice(self.cities)
+        resp = await self.request("GET", "/listings/", params=params)
+        cursor = resp.headers.get("x-next-cursor")
+        if cursor and self.rnd.random() < 0.3:
+            await self.request("GET", "/listings/", name="GET /listings/ (next page)", params={**params, "cursor": cursor})
+
+    async def favorites(self) -> None:
+        await self.request("GET", "/favorites/", headers=self.headers, params={"limit": 20})
+
+
+SCENARIOS = {
+    "swipe": VirtualUser.swipe,
+    "browse": VirtualUser.browse,
+    "favorites": VirtualUser.favorites,
+    "login": VirtualUser.login,
+}
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, expected one of {sorted(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("scenario mix has no positive weights")
+    return mix
+
+
+@contextlib.asynccontextmanager
+async def make_client(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+            yield client
+        return
+
+    from app.main import app
+
+    # startup/shutdown приложения (init_db, воркеры очередей) — как под uvicorn
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            yield client
+
+
+async def run(args) -> dict:
+    rnd = random.Random(args.seed)
+    names, weights = zip(*args.mix.items())
+    cities = list(CITIES)[: args.cities]
+
+    async with make_client(args) as client:
+        warmup = LatencyRecorder()
+        users = [
+            VirtualUser(
+                client,
+                warmup,
+                f"{args.prefix}-{rnd.randrange(args.users)}",
+                random.Random(rnd.random()),
+                cities,
+            )
+            for _ in range(args.concurrency)
+        ]
+        # логин прогрева в отчёт не идёт
+        for chunk in range(0, len(users), 50):
+            await asyncio.gather(*(u.login() for u in users[chunk:chunk + 50]))
+
+        recorder = LatencyRecorder()
+        deadline = time.perf_counter() + args.duration
+        budget = iter(range(args.iterations)) if args.iterations else None
+
+        async def loop(user: VirtualUser) -> None:
+            user.recorder = recorder
+            while time.perf_counter() < deadline:
+                if budget is not None and next(budget, None) is None:
+                    return
+                scenario = user.rnd.choices(names, weights=weights)[0]
+                try:
+                    await SCENARIOS[scenario](user)
+                except httpx.HTTPError:
+                    pass
+
+        await asyncio.gather(*(loop(u) for u in users))
+        recorder.stop()
+
+    target = args.base_url or "in-process"
+    print(recorder.report(
+        f"{target}: concurrency={args.concurrency}, mix={','.join(f'{k}={v:g}' for k, v in args.mix.items())}"
+    ))
+    summary = recorder.summary()
+    summary["params"] = {
+        "target": target,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "iterations": args.iterations,
+        "mix": args.mix,
+        "users": args.users,
+    }
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="адрес запущенного API; без него — приложение в процессе")
+    parser.add_argument("--concurrency", type=int, default=50, help="число виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=30.0, help="длительность, секунд")
+    parser.add_argument("--iterations", type=int, default=0, help="ограничить число сценариев (0 — без ограничения)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"веса сценариев, по умолчанию {DEFAULT_MIX}")
+    parser.add_argument("--users", type=int, default=9_000, help="сколько арендаторов seed_data брать для логина")
+    parser.add_argument("--prefix", default="seed", help="префикс telegram_id из seed_data")
+    parser.add_argument("--cities", type=int, default=len(CITIES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="записать сводку в JSON-файл")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
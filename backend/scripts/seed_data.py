@@ -0,0 +1,281 @@
+"""
+Генератор синтетических данных для нагрузочных тестов и бенчмарков.
+
+N пользователей (из них --landlord-share арендодателей), M объявлений по
+городам/типам/ценам и K свайпов с реалистичным перекосом: города,
+активность пользователей и популярность объявлений распределены по Ципфу,
+большая часть свайпов — по объявлениям «своего» города арендатора.
+Из свайпов выводятся избранное (favorite) и лиды (like).
+
+Результат воспроизводим при одинаковых --seed и размерах. Пишется пачками
+в БД из DATABASE_URL (PostgreSQL или SQLite):
+
+    DATABASE_URL=sqlite:////tmp/load.db python -m scripts.seed_data \\
+        --users 10000 --listings 100000 --actions 1000000
+
+Арендаторы получают telegram_id "<prefix>-<n>", арендодатели —
+"<prefix>-owner-<n>": под ними логинится scripts.loadtest.
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+
+from app.db import SessionLocal, init_db
+from app.models.favorite import Favorite
+from app.models.feed_action import FeedAction
+from app.models.lead import Lead
+from app.models.listing import Listing
+from app.models.preferences import TenantPreference
+from app.models.user import User
+
+# город -> множитель цены
+CITIES = {
+    "Almaty": 1.3,
+    "Astana": 1.2,
+    "Shymkent": 0.8,
+    "Karaganda": 0.7,
+    "Aktobe": 0.7,
+    "Atyrau": 1.0,
+    "Pavlodar": 0.6,
+    "Ust-Kamenogorsk": 0.6,
+    "Kostanay": 0.6,
+    "Taraz": 0.5,
+    "Semey": 0.5,
+    "Kyzylorda": 0.5,
+}
+DEAL_TYPES = (("rent", 0.8), ("sale", 0.2))
+PROPERTY_TYPES = (("flat", 0.7), ("house", 0.12), ("room", 0.12), ("commercial", 0.06))
+BASE_PRICE = {"rent": 150_000, "sale": 30_000_000}
+# свайпы: большинство — дизлайки
+ACTIONS = (("dislike", 0.6), ("like", 0.25), ("favorite", 0.15))
+SOURCES = (("telegram", 0.7), ("web", 0.3))
+HOME_CITY_SHARE = 0.8
+HISTORY_DAYS = 90
+
+
+def zipf_weights(n: int, s: float = 1.1) -> list[float]:
+    """
+    Накопленные веса Ципфа для random.choices(cum_weights=...): ранг 1 самый частый.
+    """
+    return list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def pick(rnd: random.Random, choices: tuple[tuple[str, float], ...]) -> str:
+    return rnd.choices([c for c, _ in choices], weights=[w for _, w in choices])[0]
+
+
+def city_names(n: int) -> list[str]:
+    names = list(CITIES)[:n]
+    return names + [f"City {i}" for i in range(len(names) + 1, n + 1)]
+
+
+def random_moment(rnd: random.Random, now: datetime) -> datetime:
+    # уникальные до микросекунды метки: курсорная пагинация по (created_at, id)
+    return now - timedelta(seconds=rnd.uniform(0, HISTORY_DAYS * 86400))
+
+
+def bulk_insert(db, model, rows, chunk: int, label: str) -> int:
+    """
+    Пишет строки пачками по chunk (executemany), коммит после каждой.
+    """
+    total = 0
+    started = time.perf_counter()
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, chunk)):
+        db.execute(insert(model), batch)
+        db.commit()
+        total += len(batch)
+        print(f"\r{label:16} {total:>10}", end="", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    print(f"\r{label:16} {total:>10} rows in {elapsed:6.1f}s", file=sys.stderr)
+    return total
+
+
+def generate_users(rnd, args, now):
+    landlords = max(1, round(args.users * args.landlord_share))
+    for n in range(args.users - landlords):
+        yield {
+            "role": "tenant",
+            "name": f"Tenant {n}",
+            "telegram_id": f"{args.prefix}-{n}",
+            "is_active": True,
+            "created_at": random_moment(rnd, now),
+        }
+    for n in range(landlords):
+        yield {
+            "role": "landlord",
+            "name": f"Landlord {n}",
+            "telegram_id": f"{args.prefix}-owner-{n}",
+            "is_active": True,
+            "created_at": random_moment(rnd, now),
+        }
+
+
+def generate_preferences(rnd, tenants, home_city):
+    for user_id in tenants:
+        if rnd.random() > 0.7:  # часть арендаторов без предпочтений
+            continue
+        deal_type = pick(rnd, DEAL_TYPES) if rnd.random() < 0.6 else None
+        price_max = None
+        if deal_type:
+            price_max = Decimal(round(BASE_PRICE[deal_type] * rnd.uniform(0.8, 2.5), -3))
+        yield {
+            "user_id": user_id,
+            "city": home_city[user_id],
+            "deal_type": deal_type,
+            "property_type": "flat" if rnd.random() < 0.3 else None,
+            "price_max": price_max,
+        }
+
+
+def generate_listings(rnd, args, owners, cities, city_weights, now):
+    owner_weights = zipf_weights(len(owners), s=0.8)  # у агентств много объявлений
+    for n in range(args.listings):
+        city = rnd.choices(cities, cum_weights=city_weights)[0]
+        deal_type = pick(rnd, DEAL_TYPES)
+        property_type = pick(rnd, PROPERTY_TYPES)
+        price = BASE_PRICE[deal_type] * CITIES.get(city, 0.5) * rnd.lognormvariate(0, 0.35)
+        if property_type == "room":
+            price *= 0.4
+        yield {
+            "owner_id": rnd.choices(owners, cum_weights=owner_weights)[0],
+            "external_id": f"{args.prefix}-{n}",
+            "title": f"{property_type.capitalize()} in {city} #{n}",
+            "city": city,
+            "deal_type": deal_type,
+            "property_type": property_type,
+            "price": Decimal(round(price, -2)),
+            "is_active": rnd.random() < args.active_share,
+            "created_at": random_moment(rnd, now),
+        }
+
+
+def generate_actions(rnd, args, tenants, home_city, by_city, now, favorites, likes):
+    """
+    Свайпы без повторов пары (user, listing); favorite/like копятся
+    в favorites/likes для последующей вставки избранного и лидов.
+    """
+    user_weights = zipf_weights(len(tenants), s=0.9)
+    city_weights = {city: zipf_weights(len(ids)) for city, ids in by_city.items()}
+    all_ids = [lid for ids in by_city.values() for lid in ids]
+    all_weights = zipf_weights(len(all_ids))
+    seen: set[tuple[int, int]] = set()
+
+    attempts = 0
+    while len(seen) < args.actions and attempts < args.actions * 3:
+        attempts += 1
+        user_id = rnd.choices(tenants, cum_weights=user_weights)[0]
+        city = home_city[user_id]
+        if city in by_city and rnd.random() < HOME_CITY_SHARE:
+            listing_id = rnd.choices(by_city[city], cum_weights=city_weights[city])[0]
+        else:
+            listing_id = rnd.choices(all_ids, cum_weights=all_weights)[0]
+        if (user_id, listing_id) in seen:
+            continue
+        seen.add((user_id, listing_id))
+
+        action = pick(rnd, ACTIONS)
+        moment = random_moment(rnd, now)
+        if action == "favorite":
+            favorites.append((user_id, listing_id, moment))
+        elif action == "like":
+            likes.append((user_id, listing_id, moment))
+        yield {
+            "user_id": user_id,
+            "listing_id": listing_id,
+            "action": action,
+            "source": pick(rnd, SOURCES),
+            "created_at": moment,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--actions", type=int, default=1_000_000)
+    parser.add_argument("--cities", type=int, default=len(CITIES))
+    parser.add_argument("--landlord-share", type=float, default=0.1)
+    parser.add_argument("--active-share", type=float, default=0.9, help="доля активных объявлений")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="seed", help="префикс telegram_id и external_id")
+    parser.add_argument("--chunk", type=int, default=5_000)
+    args = parser.parse_args()
+    if args.users < 2:
+        parser.error("--users must be at least 2")
+
+    init_db()
+    rnd = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    cities = city_names(args.cities)
+    city_weights = zipf_weights(len(cities), s=0.9)
+
+    db = SessionLocal()
+    try:
+        if db.query(User.id).filter(User.telegram_id == f"{args.prefix}-0").first():
+            sys.exit(f"users with prefix {args.prefix!r} already exist: use a clean DB or another --prefix")
+
+        bulk_insert(db, User, generate_users(rnd, args, now), args.chunk, "users")
+        users = db.execute(
+            select(User.id, User.role).where(User.telegram_id.like(f"{args.prefix}-%"))
+        ).all()
+        tenants = sorted(u.id for u in users if u.role == "tenant")
+        owners = sorted(u.id for u in users if u.role == "landlord")
+        home_city = {u: rnd.choices(cities, cum_weights=city_weights)[0] for u in tenants}
+
+        bulk_insert(
+            db, TenantPreference, generate_preferences(rnd, tenants, home_city),
+            args.chunk, "preferences",
+        )
+        bulk_insert(
+            db, Listing, generate_listings(rnd, args, owners, cities, city_weights, now),
+            args.chunk, "listings",
+        )
+
+        by_city: dict[str, list[int]] = {}
+        owner_of: dict[int, int] = {}
+        rows = db.execute(
+            select(Listing.id, Listing.city, Listing.owner_id)
+            .where(Listing.external_id.like(f"{args.prefix}-%"), Listing.is_active)
+        )
+        for listing_id, city, owner_id in rows:
+            by_city.setdefault(city, []).append(listing_id)
+            owner_of[listing_id] = owner_id
+        if not by_city:
+            sys.exit("no active listings to swipe")
+        # популярность внутри города — случайный, но воспроизводимый порядок
+        for ids in by_city.values():
+            rnd.shuffle(ids)
+
+        favorites: list[tuple[int, int, datetime]] = []
+        likes: list[tuple[int, int, datetime]] = []
+        bulk_insert(
+            db, FeedAction,
+            generate_actions(rnd, args, tenants, home_city, by_city, now, favorites, likes),
+            args.chunk, "feed_actions",
+        )
+        bulk_insert(
+            db, Favorite,
+            ({"user_id": u, "listing_id": lid, "created_at": at} for u, lid, at in favorites),
+            args.chunk, "favorites",
+        )
+        bulk_insert(
+            db, Lead,
+            (
+                {"tenant_id": u, "listing_id": lid, "owner_id": owner_of[lid], "status": "new", "created_at": at}
+                for u, lid, at in likes
+            ),
+            args.chunk, "leads",
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
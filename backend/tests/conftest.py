@@ -0,0 +1,81 @@
+"""
+Тесты чистой логики (без PostgreSQL). Settings требует DATABASE_URL уже при
+импорте app.*, поэтому по умолчанию — SQLite в памяти.
+
+Фикстуры db и client дают каждому тесту свою пустую базу SQLite со схемой
+из моделей: на неё на время теста переключается app.db.SessionLocal (им
+пользуются и get_db, и фоновые задачи). client ходит в приложение через
+TestClient без startup-хуков.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def db_engine():
+    from app.models import Base
+
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_sessionmaker(db_engine):
+    from app.db import SessionLocal, engine
+
+    SessionLocal.configure(bind=db_engine)
+    yield SessionLocal
+    SessionLocal.configure(bind=engine)
+
+
+@pytest.fixture
+def db(db_sessionmaker):
+    session = db_sessionmaker()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db_sessionmaker):
+    from fastapi.testclient import TestClient
+
+    from app.listing_cache import invalidate_all
+    from app.main import app
+    from app.services.feed_queue import feed_queue
+    from app.user_cache import user_cache
+
+    # id пользователей и объявлений в каждой базе начинаются заново
+    user_cache.clear()
+    feed_queue.clear()
+    invalidate_all()
+    return TestClient(app)
+
+
+@pytest.fixture
+def login(client):
+    """
+    login(email, role) -> заголовки авторизации нового пользователя.
+    """
+
+    def _login(email: str, role: str = "tenant") -> dict:
+        client.post(
+            "/auth/register",
+            json={"role": role, "name": "Test", "email": email, "password": "secret"},
+        )
+        token = client.post(
+            "/auth/login", data={"username": email, "password": "secret"}
+        ).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    return _login
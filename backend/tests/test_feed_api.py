@@ -0,0 +1,82 @@
+from app.config import settings
+
+
+def _seed(client, login, n=30):
+    owner = login("owner@example.com", "landlord")
+    for i in range(n):
+        r = client.post(
+            "/listings/",
+            json={
+                "title": f"Flat {i}",
+                "city": "Almaty" if i % 3 else "Astana",
+                "price": str(100_000 + 7_000 * i),
+            },
+            headers=owner,
+        )
+        assert r.status_code == 200, r.text
+
+
+def _tenant(client, login, email):
+    headers = login(email)
+    r = client.post(
+        "/preferences/",
+        json={"city": "Almaty", "price_min": "100000", "price_max": "250000"},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    return headers
+
+
+def test_batch_pages_follow_feed_order(client, login, monkeypatch):
+    # мягкие предпочтения: в ленте все 30, без fallback после свайпов
+    monkeypatch.setattr(settings, "feed_ranker", "score")
+    _seed(client, login)
+    paging = _tenant(client, login, "paging@example.com")
+    swiping = _tenant(client, login, "swiping@example.com")
+
+    batched, cursor = [], None
+    while True:
+        params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/feed/batch", params=params, headers=paging).json()
+        batched += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    swiped = []
+    listing = client.get("/feed/next", headers=swiping).json()
+    while listing is not None:
+        swiped.append(listing["id"])
+        listing = client.post(
+            "/feed/action/next",
+            json={"listing_id": listing["id"], "action": "dislike"},
+            headers=swiping,
+        ).json()
+
+    assert len(batched) == len(set(batched)) == 30
+    assert batched == swiped
+
+
+def test_batch_skips_swiped_and_handed_out(client, login):
+    _seed(client, login)
+    headers = _tenant(client, login, "tenant@example.com")
+
+    first = client.get("/feed/batch", params={"limit": 5}, headers=headers).json()
+    ids = [item["id"] for item in first["items"]]
+    assert client.get("/feed/next", headers=headers).json()["id"] == ids[0]
+
+    client.post("/feed/action", json={"listing_id": ids[0], "action": "dislike"}, headers=headers)
+    # без курсора колода начинается заново, но без свайпнутого
+    again = client.get("/feed/batch", params={"limit": 5}, headers=headers).json()
+    assert [item["id"] for item in again["items"]][:4] == ids[1:]
+
+    second = client.get(
+        "/feed/batch", params={"limit": 5, "cursor": first["next_cursor"]}, headers=headers
+    ).json()
+    assert not {item["id"] for item in second["items"]} & set(ids)
+
+
+def test_batch_bad_cursor(client, login):
+    headers = login("tenant@example.com")
+    r = client.get("/feed/batch", params={"cursor": "nope"}, headers=headers)
+    assert r.status_code == 400
@@ -0,0 +1,54 @@
+import time
+
+from app.services.feed_queue import FeedQueue
+
+
+def _filled(queue: FeedQueue, user_id: int, ids: list[int]) -> None:
+    assert queue.begin_build(user_id)
+    queue.fill(user_id, ids)
+
+
+def test_least_recently_used_queue_is_evicted():
+    queue = FeedQueue(size=10, refill_threshold=2, max_users=2)
+    _filled(queue, 1, [10, 11])
+    _filled(queue, 2, [20, 21])
+    assert queue.head(1, 1) == [10]  # 1 свежее 2
+    _filled(queue, 3, [30, 31])
+
+    assert queue.head(1, 5) == [10, 11]
+    assert queue.head(2, 5) == []
+    assert queue.head(3, 5) == [30, 31]
+    # вытесненная очередь не мешает пересобрать её заново
+    _filled(queue, 2, [22])
+    assert queue.head(2, 5) == [22]
+
+
+def test_old_queue_expires():
+    queue = FeedQueue(size=10, refill_threshold=2, max_users=10, ttl=0.05)
+    _filled(queue, 1, [10, 11])
+    assert queue.head(1, 5) == [10, 11]
+    time.sleep(0.06)
+    assert queue.head(1, 5) == []
+    assert not queue.mark_seen(1, 10)
+
+
+def test_mark_seen_and_discard():
+    queue = FeedQueue(size=10, refill_threshold=3, max_users=10)
+    _filled(queue, 1, [10, 11, 12, 13])
+    _filled(queue, 2, [12, 20])
+
+    assert not queue.mark_seen(1, 10)
+    assert queue.mark_seen(1, 11)  # осталось 2 < refill_threshold — пора пополнить
+    queue.discard_listing(12)
+    assert queue.head(1, 5) == [13]
+    assert queue.head(2, 5) == [20]
+    assert queue.head(1, 5, skip={13}) == []
+
+
+def test_seen_during_build_is_not_returned():
+    queue = FeedQueue(size=10, refill_threshold=2, max_users=10)
+    assert queue.begin_build(1)
+    assert not queue.begin_build(1)
+    queue.mark_seen(1, 10)
+    queue.fill(1, [10, 11])
+    assert queue.head(1, 5) == [11]
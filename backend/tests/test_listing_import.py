@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+from app.services.listing_import import IMPORT_COLUMNS, detect_format, validate_rows
+
+
+def _row(**kw):
+    return {"title": "Flat", "city": "Moscow", "price": "1000", **kw}
+
+
+def test_valid_rows_keep_import_columns_only():
+    valid, errors = validate_rows([(1, _row(external_id="a", owner_id=99))])
+    assert errors == []
+    assert len(valid) == 1
+    assert set(valid[0]) == set(IMPORT_COLUMNS)
+    assert valid[0]["price"] == Decimal("1000")
+    assert valid[0]["deal_type"] == "rent"
+
+
+def test_invalid_rows_are_reported_with_numbers():
+    valid, errors = validate_rows(
+        [
+            (1, _row(price="much")),
+            (2, {"city": "Moscow", "price": "1"}),
+            (3, ValueError("bad CSV line")),
+            (4, _row()),
+        ]
+    )
+    assert len(valid) == 1
+    assert [e["row"] for e in errors] == [1, 2, 3]
+    assert errors[0]["error"].startswith("price:")
+    assert errors[1]["error"].startswith("title:")
+    assert errors[2]["error"] == "bad CSV line"
+
+
+def test_duplicate_external_id_last_row_wins():
+    valid, errors = validate_rows(
+        [
+            (1, _row(external_id="a", price="1")),
+            (2, _row(external_id="b", price="2")),
+            (3, _row(external_id="a", price="3")),
+        ]
+    )
+    assert errors == []
+    assert [(v["external_id"], v["price"]) for v in valid] == [
+        ("b", Decimal("2")),
+        ("a", Decimal("3")),
+    ]
+
+
+def test_rows_without_external_id_are_not_merged():
+    valid, _ = validate_rows([(1, _row()), (2, _row())])
+    assert len(valid) == 2
+
+
+def test_detect_format():
+    assert detect_format("text/csv; charset=utf-8") == "csv"
+    assert detect_format("application/x-ndjson") == "ndjson"
+    assert detect_format("application/json") == "ndjson"
+    assert detect_format("text/plain") is None
+    assert detect_format(None) is None
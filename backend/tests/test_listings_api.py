@@ -0,0 +1,38 @@
+def _listing(**kw):
+    return {"title": "Flat", "city": "Moscow", "price": "1000", **kw}
+
+
+def test_put_keeps_fields_it_does_not_send(client, login):
+    headers = login("owner@example.com", "landlord")
+    created = client.post("/listings/", json=_listing(external_id="ext-1"), headers=headers).json()
+
+    r = client.put(
+        f"/listings/{created['id']}",
+        json={"title": "Renamed", "city": "Moscow", "price": "1200"},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["title"] == "Renamed"
+    assert body["external_id"] == "ext-1"
+    assert body["owner_id"] == created["owner_id"]
+
+
+def test_duplicate_external_id_is_409(client, login):
+    headers = login("owner@example.com", "landlord")
+    assert client.post("/listings/", json=_listing(external_id="a"), headers=headers).status_code == 200
+    other = client.post("/listings/", json=_listing(external_id="b"), headers=headers).json()
+
+    r = client.post("/listings/", json=_listing(external_id="a"), headers=headers)
+    assert r.status_code == 409
+
+    r = client.put(f"/listings/{other['id']}", json=_listing(external_id="a"), headers=headers)
+    assert r.status_code == 409
+    assert client.get(f"/listings/{other['id']}").json()["external_id"] == "b"
+
+
+def test_same_external_id_for_different_owners(client, login):
+    first = login("first@example.com", "landlord")
+    second = login("second@example.com", "landlord")
+    assert client.post("/listings/", json=_listing(external_id="a"), headers=first).status_code == 200
+    assert client.post("/listings/", json=_listing(external_id="a"), headers=second).status_code == 200
@@ -0,0 +1,74 @@
+from itertools import product
+
+import numpy as np
+import pytest
+
+from app.services.matching import LEAF_SIZE, IntervalTree, PreferenceIndex
+
+
+def _random_intervals(rng, n):
+    lo = rng.integers(0, 1_000, size=n).astype(np.float64)
+    hi = lo + rng.integers(0, 300, size=n)
+    # часть интервалов открыта с одной или обеих сторон
+    lo[rng.random(n) < 0.1] = -np.inf
+    hi[rng.random(n) < 0.1] = np.inf
+    return np.arange(1, n + 1, dtype=np.int64), lo, hi
+
+
+@pytest.mark.parametrize("n", [0, 1, LEAF_SIZE, LEAF_SIZE + 1, 1_000])
+def test_stab_matches_brute_force(n):
+    rng = np.random.default_rng(n)
+    ids, lo, hi = _random_intervals(rng, n)
+    tree = IntervalTree(ids, lo, hi)
+    points = np.concatenate([rng.uniform(-100, 1_400, size=200), lo[np.isfinite(lo)], hi[np.isfinite(hi)]])
+    for x in points:
+        expected = sorted(ids[(lo <= x) & (hi >= x)].tolist())
+        assert sorted(tree.stab(x).tolist()) == expected, x
+
+
+def test_stab_all_unbounded():
+    n = LEAF_SIZE * 3
+    tree = IntervalTree(
+        np.arange(n, dtype=np.int64), np.full(n, -np.inf), np.full(n, np.inf)
+    )
+    assert len(tree.stab(0.0)) == n
+
+
+def test_stab_identical_points():
+    n = LEAF_SIZE * 3
+    tree = IntervalTree(np.arange(n, dtype=np.int64), np.full(n, 5.0), np.full(n, 5.0))
+    assert len(tree.stab(5.0)) == n
+    assert len(tree.stab(4.999)) == 0
+
+
+def test_preference_index_match_brute_force():
+    rng = np.random.default_rng(1)
+    cities, deals, types = ["A", "B", None], ["rent", None], ["flat", "room", None]
+    prefs = {}
+    index = PreferenceIndex(refresh_seconds=0)
+    for user_id in range(1, 2_001):
+        price_min = None if rng.random() < 0.2 else float(rng.integers(0, 1_000))
+        price_max = None if rng.random() < 0.2 else float(rng.integers(0, 1_500))
+        pref = (
+            cities[rng.integers(3)], deals[rng.integers(2)], types[rng.integers(3)],
+            price_min, price_max,
+        )
+        prefs[user_id] = pref
+        index._put(user_id, *pref)
+    # повторная запись переносит подписку в другую корзину
+    prefs[1] = ("B", "rent", "room", 0.0, 10.0)
+    index._put(1, *prefs[1])
+
+    def brute(city, deal, ptype, price):
+        return sorted(
+            u for u, (c, d, t, lo, hi) in prefs.items()
+            if not (c is None and d is None and t is None and lo is None and hi is None)
+            and c in (city, None) and d in (deal, None) and t in (ptype, None)
+            and (lo is None or lo <= price) and (hi is None or price <= hi)
+        )
+
+    for city, deal, ptype in product(["A", "B", "C"], ["rent", "sale"], ["flat", "room"]):
+        for price in (0, 5, 499.5, 1_000, 2_000):
+            got = index.match(city, deal, ptype, price).tolist()
+            assert len(got) == len(set(got))
+            assert sorted(got) == brute(city, deal, ptype, price)
@@ -0,0 +1,100 @@
+import base64
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.pagination import (
+    decode_cursor,
+    decode_ids_cursor,
+    encode_cursor,
+    encode_ids_cursor,
+)
+
+
+@pytest.mark.parametrize(
+    "created_at",
+    [
+        datetime(2026, 10, 18, 12, 30, 5),
+        datetime(2026, 10, 18, 12, 30, 5, 123456),
+        datetime(2026, 10, 18, 12, 30, 5, tzinfo=timezone.utc),
+    ],
+)
+def test_cursor_round_trip(created_at):
+    data = decode_cursor(encode_cursor(created_at, 42))
+    assert data["c"] == created_at
+    assert data["i"] == 42
+
+
+def test_cursor_keeps_extra_fields():
+    data = decode_cursor(encode_cursor(datetime(2026, 1, 1), 7, s=0.5))
+    assert data["s"] == 0.5
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor(datetime(2026, 1, 1), 10**12)
+    assert "=" not in cursor
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+def test_ids_cursor_keeps_last_ids():
+    assert decode_ids_cursor(encode_ids_cursor([1, 2, 3], max_ids=10)) == [1, 2, 3]
+    assert decode_ids_cursor(encode_ids_cursor(list(range(100)), max_ids=5)) == [95, 96, 97, 98, 99]
+
+
+@pytest.mark.parametrize("cursor", ["", "%%%", "eyJzIjo1fQ", "eyJjIjoxfQ"])
+def test_bad_ids_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_ids_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        "%%%",
+        _b64(b"not json"),
+        _b64(b"[1, 2]"),
+        _b64(b'{"i": 1}'),
+        _b64(b'{"c": "2026-01-01T00:00:00"}'),
+        _b64(b'{"c": "yesterday", "i": 1}'),
+        _b64(b'{"c": "2026-01-01T00:00:00", "i": "x"}'),
+        _b64(b'{"c": 5, "i": 1}'),
+    ],
+)
+def test_bad_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_pages_advance_on_sqlite_timestamps():
+    # CURRENT_TIMESTAMP в SQLite — строка без долей секунды: все строки с
+    # одинаковым created_at, курсор всё равно должен двигаться по id
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.models import Base
+    from app.models.listing import Listing
+    from app.services.pagination import PageParams, page_rows
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Listing.__table__])
+    with Session(engine) as db:
+        db.add_all(Listing(title=f"t{i}", city="A", price=100, owner_id=1) for i in range(5))
+        db.commit()
+
+        seen, cursor = [], None
+        for _ in range(5):
+            page = PageParams(limit=2, cursor=cursor, format="json")
+            rows, cursor = page_rows(db.query(Listing.id), Listing.created_at, Listing.id, page)
+            seen += [row.id for row in rows]
+            if cursor is None:
+                break
+    assert seen == [5, 4, 3, 2, 1]
@@ -0,0 +1,153 @@
+"""
+Регрессионная проверка планов горячих запросов (только PostgreSQL).
+
+Для каждого запроса ленты/списков снимаем EXPLAIN и падаем, если по одной из
+больших таблиц остался Seq Scan. Чтобы результат не зависел от объёма данных
+(на пустой базе планировщик и так выберет seq scan), проверка идёт с
+enable_seqscan = off: при наличии подходящего индекса план его использует,
+без индекса — Seq Scan остаётся, и это ловится.
+
+Нужна отдельная пустая база PostgreSQL, миграции тест накатывает сам:
+
+    TEST_POSTGRES_URL=postgresql+psycopg2://... python -m pytest -q tests/test_query_plans.py
+
+Без TEST_POSTGRES_URL тесты пропускаются.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Select, create_engine, func, select
+from sqlalchemy.orm import Query, Session
+
+from app.db import ALEMBIC_INI
+from app.models import Favorite, FeedAction, Lead, Listing, TenantPreference
+from app.services.feed import apply_preference_filters, unseen_active_listings
+from app.services.listing_index import INDEX_COLUMNS
+from app.services.matching import PREFERENCE_COLUMNS
+
+HOT_TABLES = {"listings", "feed_actions", "leads", "favorites", "tenant_preferences"}
+USER_ID = 1
+PAGE = 100
+SYNCED_UNTIL = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def hot_queries(db: Session) -> dict[str, Query | Select]:
+    pref = TenantPreference(
+        user_id=USER_ID,
+        city="Astana",
+        deal_type="rent",
+        property_type="flat",
+        price_min=Decimal("100000"),
+        price_max=Decimal("400000"),
+    )
+    by_city = TenantPreference(user_id=USER_ID, city="Astana")
+
+    return {
+        "feed: candidates by preferences": apply_preference_filters(
+            unseen_active_listings(db, USER_ID, Listing.id), pref
+        ).limit(PAGE),
+        "feed: candidates by city": apply_preference_filters(
+            unseen_active_listings(db, USER_ID, Listing.id), by_city
+        ).limit(PAGE),
+        "feed: fallback candidates": unseen_active_listings(
+            db, USER_ID, Listing.id
+        ).limit(PAGE),
+        "feed: seen probe": db.query(FeedAction.id).filter(
+            FeedAction.user_id == USER_ID, FeedAction.listing_id == 1
+        ),
+        "feed: existing lead probe": db.query(Lead.id).filter(
+            Lead.tenant_id == USER_ID, Lead.listing_id == 1
+        ),
+        "GET /listings/?city=": db.query(Listing)
+        .filter(Listing.is_active.is_(True), Listing.city == "Astana")
+        .order_by(Listing.created_at.desc(), Listing.id.desc())
+        .limit(PAGE),
+        "GET /listings/": db.query(Listing)
+        .filter(Listing.is_active.is_(True))
+        .order_by(Listing.created_at.desc(), Listing.id.desc())
+        .limit(PAGE),
+        "GET /listings/my": db.query(Listing)
+        .filter(Listing.owner_id == USER_ID)
+        .order_by(Listing.created_at.desc(), Listing.id.desc())
+        .limit(PAGE),
+        "GET /favorites/": db.query(Listing)
+        .join(Favorite, Favorite.listing_id == Listing.id)
+        .filter(Favorite.user_id == USER_ID, Listing.is_active.is_(True))
+        .order_by(Favorite.created_at.desc(), Favorite.id.desc())
+        .limit(PAGE),
+        "GET /leads/my": db.query(Lead)
+        .filter(Lead.tenant_id == USER_ID)
+        .order_by(Lead.created_at.desc(), Lead.id.desc())
+        .limit(PAGE),
+        "GET /leads/for-me": db.query(Lead)
+        .filter(Lead.owner_id == USER_ID)
+        .order_by(Lead.created_at.desc(), Lead.id.desc())
+        .limit(PAGE),
+        # ListingIndex.load / refresh — в каждом воркере раз в несколько секунд
+        "listing index: watermark": select(func.max(Listing.updated_at)),
+        "listing index: refresh": select(*INDEX_COLUMNS)
+        .where(Listing.updated_at > SYNCED_UNTIL)
+        .order_by(Listing.created_at, Listing.id),
+        # PreferenceIndex.load / refresh (LISTING_ALERTS_ENABLED)
+        "preference index: watermark": select(func.max(TenantPreference.updated_at)),
+        "preference index: refresh": select(*PREFERENCE_COLUMNS)
+        .where(TenantPreference.updated_at > SYNCED_UNTIL)
+        .order_by(TenantPreference.id.desc()),
+    }
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in HOT_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL не задан")
+    # задан, но недоступен — ошибка, а не пропуск: CI не должен молча зелениться
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        cfg = Config(str(ALEMBIC_INI))
+        cfg.attributes["configure_logger"] = False
+        cfg.attributes["connection"] = connection
+        command.upgrade(cfg, "head")
+        connection.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def plan_of(pg_engine):
+    db = Session(bind=pg_engine)
+    queries = hot_queries(db)
+    connection = pg_engine.connect()
+    connection.exec_driver_sql("SET enable_seqscan = off")
+
+    def explain(name: str) -> dict:
+        query = queries[name]
+        stmt = query.statement if isinstance(query, Query) else query
+        compiled = stmt.compile(dialect=pg_engine.dialect)
+        raw = connection.exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+        ).scalar()
+        return (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+
+    yield explain
+    connection.close()
+    db.close()
+
+
+@pytest.mark.parametrize("name", list(hot_queries(Session())))
+def test_hot_query_uses_index(plan_of, name):
+    assert seq_scans(plan_of(name)) == []
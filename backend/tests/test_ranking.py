@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.models import FeedAction, Listing, TenantPreference
+from app.services import ranking
+from app.services.ranking import (
+    CandidateBatch,
+    order_batch,
+    rank_by_score,
+    rank_candidates,
+    score_batch,
+)
+
+USER_ID = 1
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def score_settings(monkeypatch):
+    monkeypatch.setattr(settings, "feed_ranker", "score")
+    monkeypatch.setattr(settings, "cf_enabled", False)
+    monkeypatch.setattr(settings, "feed_rank_weights", {})
+    ranking._popularity.clear()
+
+
+def _listing(db, city="Almaty", price=150_000, age_days=1, is_active=True):
+    listing = Listing(
+        title="Flat",
+        city=city,
+        price=Decimal(price),
+        created_at=NOW - timedelta(days=age_days),
+        is_active=is_active,
+    )
+    db.add(listing)
+    db.commit()
+    return listing.id
+
+
+def _pref(**kw):
+    return TenantPreference(user_id=USER_ID, **kw)
+
+
+def _batch(rows, pref=None, likes=None):
+    """
+    rows — (id, city, price, age_days).
+    """
+    return CandidateBatch.from_rows(
+        [(i, city, "rent", "flat", price, NOW - timedelta(days=age)) for i, city, price, age in rows],
+        pref,
+        likes or {},
+        now=NOW.timestamp(),
+    )
+
+
+def test_hard_filters_drop_inactive_seen_and_excluded(db):
+    pref = _pref(city="Almaty")
+    visible = _listing(db)
+    inactive = _listing(db, is_active=False)
+    swiped = _listing(db)
+    excluded = _listing(db)
+    db.add(FeedAction(user_id=USER_ID, listing_id=swiped, action="dislike"))
+    db.commit()
+
+    ranked = rank_by_score(db, USER_ID, pref, 10, exclude={excluded})
+    assert ranked == [visible]
+    assert inactive not in rank_by_score(db, USER_ID, None, 10)
+
+
+def test_matches_go_first_then_close_variants(db):
+    pref = _pref(city="Almaty", price_max=Decimal("200000"))
+    other_city = _listing(db, city="Astana", age_days=0)
+    too_expensive = _listing(db, price=260_000, age_days=0)
+    slightly_over = _listing(db, price=205_000, age_days=0)
+    match = _listing(db, price=180_000, age_days=5)
+
+    assert rank_by_score(db, USER_ID, pref, 10) == [match, slightly_over, too_expensive, other_city]
+
+
+def test_weights_override(monkeypatch):
+    batch = _batch([(1, "Almaty", 100, 0), (2, "Almaty", 100, 30)], likes={2: 50})
+    assert order_batch(batch, score_batch(batch), 2) == [1, 2]
+
+    monkeypatch.setattr(settings, "feed_rank_weights", {"popularity": 10.0})
+    assert order_batch(batch, score_batch(batch), 2) == [2, 1]
+
+
+def test_zero_weight_disables_feature():
+    pref = _pref(city="Almaty")
+    batch = _batch([(1, "Astana", 100, 0), (2, "Almaty", 100, 0)], pref)
+    assert order_batch(batch, score_batch(batch), 2) == [2, 1]
+    scores = score_batch(batch, {**ranking.feature_weights(), "city": 0.0})
+    assert scores[0] == pytest.approx(scores[1])
+
+
+@pytest.mark.parametrize("limit", [1, 3, 5])
+def test_ties_break_by_freshness(limit):
+    # оценки равны — порядок только по created_at, в том числе на границе top-k
+    batch = _batch([(i, "Almaty", 100, age) for i, age in [(1, 3), (2, 1), (3, 4), (4, 0), (5, 2)]])
+    scores = np.ones(len(batch))
+    assert order_batch(batch, scores, limit) == [4, 2, 5, 1, 3][:limit]
+
+
+def test_unknown_ranker(db, monkeypatch):
+    monkeypatch.setattr(settings, "feed_ranker", "nope")
+    with pytest.raises(ValueError, match="FEED_RANKER"):
+        rank_candidates(db, USER_ID, None, 10)
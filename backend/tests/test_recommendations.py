@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+from app.config import settings
+from app.models import FeedAction
+from app.services.recommendations import (
+    SimilarityIndex,
+    build_full,
+    rebuild_similarities,
+    update_incremental,
+    write_similarities,
+)
+
+
+@pytest.fixture
+def cf_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "cf_state_path", str(tmp_path / "cf_state.npz"))
+    monkeypatch.setattr(settings, "cf_top_k", 3)
+    monkeypatch.setattr(settings, "cf_min_common", 1)
+    monkeypatch.setattr(settings, "cf_shrinkage", 1.0)
+
+
+def _like(db, pairs, action="like"):
+    db.execute(
+        insert(FeedAction),
+        [{"user_id": u, "listing_id": lid, "action": action} for u, lid in pairs],
+    )
+    db.commit()
+
+
+def _neighbors_by_listing(state):
+    """
+    listing_id -> {listing_id соседа: sim} по top-K состояния.
+    """
+    result = {}
+    for item, listing_id in enumerate(state.listing_ids.tolist()):
+        cols = state.topk_ids[item]
+        cols = cols[cols >= 0]
+        result[listing_id] = dict(
+            zip(state.listing_ids[cols].tolist(), state.topk_scores[item, :len(cols)].tolist())
+        )
+    return result
+
+
+def _neighbor_ids(index, listing_id):
+    found = index.neighbors(listing_id)
+    return None if found is None else set(found[0].tolist())
+
+
+def test_index_picks_up_new_lists(db, cf_settings):
+    _like(db, [(1, 10), (1, 11), (2, 10), (2, 11)])
+    rebuild_similarities(db, full=True)
+    index = SimilarityIndex(refresh_seconds=0)
+    index.refresh(db)
+    assert _neighbor_ids(index, 10) == {11}
+    assert _neighbor_ids(index, 12) is None
+
+    _like(db, [(3, 10), (3, 12)])
+    assert rebuild_similarities(db)["mode"] == "incremental"
+    index.refresh(db)
+    assert _neighbor_ids(index, 10) == {11, 12}
+    assert _neighbor_ids(index, 12) == {10}
+
+
+def test_full_rebuild_reloads_index(db, cf_settings, monkeypatch):
+    _like(db, [(1, 10), (1, 11), (2, 20), (2, 21)])
+    rebuild_similarities(db, full=True)
+    index = SimilarityIndex(refresh_seconds=0)
+    index.refresh(db)
+    assert len(index) == 4
+
+    # порог поднят — у 20/21 (один общий пользователь) списки пропадают
+    _like(db, [(3, 10), (3, 11)])
+    monkeypatch.setattr(settings, "cf_min_common", 2)
+    rebuild_similarities(db, full=True)
+    index.refresh(db)
+    assert _neighbor_ids(index, 10) == {11}
+    assert _neighbor_ids(index, 20) is None
+    assert len(index) == 2
+
+
+def test_emptied_list_is_dropped(db, cf_settings):
+    _like(db, [(1, 10), (1, 11), (1, 12)])
+    rebuild_similarities(db, full=True)
+    index = SimilarityIndex(refresh_seconds=0)
+    index.refresh(db)
+    assert _neighbor_ids(index, 12) == {10, 11}
+
+    # инкрементальная запись, после которой у 12 нет соседей (у 10 — остались)
+    state, _ = build_full(db, settings.cf_top_k)
+    item = int(np.flatnonzero(state.listing_ids == 12)[0])
+    state.topk_ids[item] = -1
+    items = np.flatnonzero(np.isin(state.listing_ids, [10, 12]))
+    write_similarities(db, state, items, full=False)
+
+    index.refresh(db)
+    assert _neighbor_ids(index, 12) is None
+    assert _neighbor_ids(index, 10) == {11, 12}
+    assert _neighbor_ids(index, 11) == {10, 12}
+
+
+def test_incremental_update_matches_full_build(db, cf_settings):
+    rng = np.random.default_rng(7)
+    pairs = [(int(u), int(lid)) for u, lid in zip(rng.integers(1, 40, 600), rng.integers(1, 60, 600))]
+    _like(db, pairs[:300])
+    state, _ = build_full(db, settings.cf_top_k)
+
+    # новые пользователи и объявления, повторы уже учтённых пар
+    for start in (300, 400, 500):
+        _like(db, pairs[start:start + 100] + [(100 + start, 70), (100 + start, pairs[0][1])], action="favorite")
+        state, _ = update_incremental(db, state)
+
+    full, _ = build_full(db, settings.cf_top_k)
+    incremental, expected = _neighbors_by_listing(state), _neighbors_by_listing(full)
+    assert incremental.keys() == expected.keys()
+    for listing_id, neighbors in expected.items():
+        got = incremental[listing_id]
+        assert np.allclose(sorted(got.values()), sorted(neighbors.values()), atol=1e-6), listing_id
+        # при равных sim на границе top-K порядок выбора соседей может отличаться
+        cutoff = min(neighbors.values(), default=0.0) + 1e-6
+        for neighbor, sim in neighbors.items():
+            if sim > cutoff:
+                assert got.get(neighbor) == pytest.approx(sim, abs=1e-6), (listing_id, neighbor)
+        for neighbor, sim in got.items():
+            assert neighbor in neighbors or sim <= cutoff, (listing_id, neighbor)
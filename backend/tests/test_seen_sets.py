@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from app.services.seen_sets import FORMAT_VERSION, decode_ids, encode_ids
+
+
+@pytest.mark.parametrize(
+    "ids",
+    [
+        [],
+        [1],
+        [5, 3, 9, 1],
+        [7, 7, 2, 2, 7],
+        [1, 2**31 - 1, 2**32 - 1],
+        list(range(1, 10_001)),
+    ],
+)
+def test_round_trip(ids):
+    decoded = decode_ids(encode_ids(ids))
+    assert decoded.dtype == np.int64
+    assert decoded.tolist() == sorted(set(ids))
+
+
+def test_round_trip_random_numpy():
+    ids = np.random.default_rng(0).integers(1, 5_000_000, size=20_000)
+    assert np.array_equal(decode_ids(encode_ids(ids)), np.unique(ids))
+
+
+def test_dense_ids_compress():
+    assert len(encode_ids(range(1, 10_001))) < 200
+
+
+def test_empty_bytes_is_empty_set():
+    assert decode_ids(b"").size == 0
+
+
+def test_unknown_format_version():
+    data = encode_ids([1, 2, 3])
+    with pytest.raises(ValueError):
+        decode_ids(bytes([FORMAT_VERSION + 1]) + data[1:])
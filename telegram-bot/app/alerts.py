@@ -0,0 +1,46 @@
+"""
+Доставка оповещений о новых объявлениях под фильтры пользователя.
+
+Бэкенд складывает совпадения в очередь (listing_alerts); бот забирает
+их пачками через /internal/alerts/claim, отправляет и подтверждает
+/internal/alerts/ack. Неподтверждённое (бот упал посреди пачки) бэкенд
+выдаст снова, поэтому отправка — «хотя бы один раз».
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+SendAlert = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+async def deliver_alerts(backend, send: SendAlert, batch_size: int) -> int:
+    """
+    Одна пачка: claim -> send по одному -> ack. -> число взятых оповещений.
+    """
+    alerts = await backend.claim_alerts(batch_size)
+    if not alerts:
+        return 0
+    # все сразу: лимиты соблюдает планировщик исходящих, чаты не ждут друг друга
+    results = await asyncio.gather(*(send(alert) for alert in alerts), return_exceptions=True)
+    sent, failed = [], []
+    for alert, result in zip(alerts, results):
+        if isinstance(result, Exception):
+            print("alert send error:", alert["id"], result)
+            failed.append(alert["id"])
+        else:
+            sent.append(alert["id"])
+    await backend.ack_alerts(sent, failed)
+    return len(alerts)
+
+
+async def deliver_alerts_forever(backend, send: SendAlert, batch_size: int, interval: float) -> None:
+    """
+    Фоновая задача: разбирает очередь, пока она не опустеет, потом ждёт interval.
+    """
+    while True:
+        try:
+            taken = await deliver_alerts(backend, send, batch_size)
+        except Exception as e:
+            print("alerts loop error:", e)
+            taken = 0
+        if taken < batch_size:
+            await asyncio.sleep(interval)
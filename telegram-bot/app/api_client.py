@@ -2,14 +2,44 @@ from typing import Any, Dict, List, Optional
 
 import httpx
 
+# списки бэкенда отдаются страницами по X-Next-Cursor; больше 1000 за раз нельзя
+PAGE_SIZE = 1000
+
 
 class BackendClient:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, internal_token: str = ""):
         self._client = httpx.AsyncClient(base_url=base_url, timeout=10.0)
+        self._internal_headers = {"X-Internal-Token": internal_token}
 
     async def close(self) -> None:
         await self._client.aclose()
 
+    async def _get_pages(
+        self, path: str, token: str, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Список с постраничной выдачей: идёт по X-Next-Cursor, пока не наберёт
+        limit элементов (None — весь список).
+        """
+        items: List[Dict[str, Any]] = []
+        cursor: Optional[str] = None
+        while True:
+            params: Dict[str, Any] = {
+                "limit": PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - len(items))
+            }
+            if cursor:
+                params["cursor"] = cursor
+            resp = await self._client.get(
+                path,
+                params=params,
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            resp.raise_for_status()
+            items.extend(resp.json())
+            cursor = resp.headers.get("X-Next-Cursor")
+            if not cursor or (limit is not None and len(items) >= limit):
+                return items
+
     # --- Auth / Telegram ---
 
     async def login_or_register_telegram(
@@ -30,6 +60,14 @@ class BackendClient:
         data = resp.json()
         return data["access_token"]
 
+    async def refresh_token(self, token: str) -> str:
+        resp = await self._client.post(
+            "/auth/refresh",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        resp.raise_for_status()
+        return resp.json()["access_token"]
+
     # --- Feed ---
 
     async def get_next_listing(self, token: str) -> Optional[Dict[str, Any]]:
@@ -60,22 +98,57 @@ class BackendClient:
         )
         resp.raise_for_status()
 
-    # --- Favorites ---
-
-    async def get_favorites(self, token: str) -> List[Dict[str, Any]]:
-        resp = await self._client.get(
-            "/favorites/",
+    async def send_feed_action_and_get_next(
+        self,
+        token: str,
+        listing_id: int,
+        action: str,
+        source: str = "telegram",
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Свайп за один запрос: сохраняет действие и возвращает следующее объявление.
+        """
+        payload = {
+            "listing_id": listing_id,
+            "action": action,
+            "source": source,
+        }
+        resp = await self._client.post(
+            "/feed/action/next",
             headers={"Authorization": f"Bearer {token}"},
+            json=payload,
         )
         resp.raise_for_status()
-        return resp.json()
+        return resp.json()  # либо dict, либо None
+
+    # --- Favorites ---
+
+    async def get_favorites(self, token: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self._get_pages("/favorites/", token, limit)
 
     # --- Leads ---
 
     async def get_my_leads(self, token: str) -> List[Dict[str, Any]]:
-        resp = await self._client.get(
-            "/leads/my",
-            headers={"Authorization": f"Bearer {token}"},
+        return await self._get_pages("/leads/my", token)
+
+    # --- Alerts (сервисные, X-Internal-Token) ---
+
+    async def claim_alerts(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Пачка оповещений о новых объявлениях: [{"id", "telegram_id", "listing"}].
+        """
+        resp = await self._client.post(
+            "/internal/alerts/claim",
+            headers=self._internal_headers,
+            params={"limit": limit},
         )
         resp.raise_for_status()
         return resp.json()
+
+    async def ack_alerts(self, sent: List[int], failed: List[int]) -> None:
+        resp = await self._client.post(
+            "/internal/alerts/ack",
+            headers=self._internal_headers,
+            json={"sent": sent, "failed": failed},
+        )
+        resp.raise_for_status()
@@ -3,5 +3,50 @@ import os
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 BACKEND_BASE_URL = os.getenv("BACKEND_BASE_URL", "http://localhost:8000")
 
+# Где хранить токены: memory:// | sqlite:///path/to/tokens.db | redis://host:6379/0
+TOKEN_STORE_URL = os.getenv("TOKEN_STORE_URL", "memory://")
+# За сколько секунд до exp продлевать токен и как часто это проверять
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "600"))
+TOKEN_REFRESH_INTERVAL_SECONDS = int(os.getenv("TOKEN_REFRESH_INTERVAL_SECONDS", "60"))
+
+# Оповещения о новых объявлениях под фильтры (на бэкенде — LISTING_ALERTS_ENABLED).
+# INTERNAL_API_TOKEN — общий с бэкендом секрет для /internal/*; пустой — опрос выключен
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", "")
+ALERTS_POLL_INTERVAL_SECONDS = float(os.getenv("ALERTS_POLL_INTERVAL_SECONDS", "5"))
+ALERTS_BATCH_SIZE = int(os.getenv("ALERTS_BATCH_SIZE", "50"))
+
+# Исходящие сообщения (outbound.OutboundScheduler): сообщений в секунду на бота
+# и на чат (у Telegram ~30 и 1), сколько жетонов рассылка оставляет ответам
+# пользователям, параллельных запросов к Bot API; 0 — не печатать статистику
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "25"))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_BULK_RESERVE = float(os.getenv("OUTBOUND_BULK_RESERVE", "5"))
+OUTBOUND_MAX_IN_FLIGHT = int(os.getenv("OUTBOUND_MAX_IN_FLIGHT", "16"))
+OUTBOUND_STATS_INTERVAL_SECONDS = float(os.getenv("OUTBOUND_STATS_INTERVAL_SECONDS", "60"))
+
+# Получение обновлений: polling | webhook (webhook.run_webhook, за nginx).
+# WEBHOOK_URL — публичный https-адрес nginx: если задан, бот сам регистрирует
+# webhook при старте; WEBHOOK_SECRET сверяется с X-Telegram-Bot-Api-Secret-Token
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8081"))
+# сколько обновлений (разных пользователей) обрабатывать одновременно
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "64"))
+# при остановке: сколько ждать обработки уже принятых обновлений
+WEBHOOK_DRAIN_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT_SECONDS", "15"))
+# очередь пользователя и отсев повторов в Redis — обязательно при нескольких
+# репликах бота; по умолчанию тот же Redis, что у TOKEN_STORE_URL
+WEBHOOK_REDIS_URL = os.getenv(
+    "WEBHOOK_REDIS_URL",
+    TOKEN_STORE_URL if TOKEN_STORE_URL.startswith(("redis://", "rediss://", "unix://")) else "",
+)
+
 if not TELEGRAM_BOT_TOKEN:
     raise RuntimeError("TELEGRAM_BOT_TOKEN is not set")
+if BOT_MODE not in ("polling", "webhook"):
+    raise RuntimeError(f"Unknown BOT_MODE: {BOT_MODE}")
+if BOT_MODE == "webhook" and not WEBHOOK_SECRET:
+    raise RuntimeError("WEBHOOK_SECRET is not set")
@@ -0,0 +1,152 @@
+"""
+Telegram Bot API в процессе — для проверки исходящих сообщений без сети.
+
+FakeTelegram.send_message ведёт себя как Bot API под нагрузкой: задержка
+ответа и лимиты (global_rate сообщений за секунду на бота, chat_rate на
+чат); сверх лимита — FloodError с retry_after, как TelegramRetryAfter в
+aiogram. Все принятые сообщения — в .sent.
+
+    python -m app.fake_telegram --chats 200 --bulk 1500 --interactive 300
+
+Прогоняет один и тот же сценарий (рассылка оповещений + ответы
+пользователям посреди неё) дважды: напрямую, как раньше слали хендлеры,
+и через OutboundScheduler; печатает 429, время и задержки по полосам.
+--scale ускоряет часы: лимиты и там и там умножаются на него.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .outbound import BULK, INTERACTIVE, OutboundScheduler
+
+
+class FloodError(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Too Many Requests: retry after {retry_after:g}")
+        self.retry_after = retry_after
+
+
+class FakeTelegram:
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        latency: float = 0.05,
+        retry_after: float = 1.0,
+    ) -> None:
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.latency = latency
+        self.retry_after = retry_after
+
+        self._global: Deque[float] = deque()
+        self._chats: Dict[int, Deque[float]] = defaultdict(deque)
+        self.sent: List[Tuple[int, str, float]] = []
+        self.flood_errors = 0
+
+    @staticmethod
+    def _over(window: Deque[float], now: float, rate: float) -> bool:
+        # скользящее окно в секунду: не больше rate отправок
+        while window and window[0] <= now - 1.0:
+            window.popleft()
+        return len(window) >= max(1, int(rate))
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> dict:
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        chat = self._chats[chat_id]
+        if self._over(self._global, now, self.global_rate) or self._over(chat, now, self.chat_rate):
+            self.flood_errors += 1
+            raise FloodError(self.retry_after)
+        self._global.append(now)
+        chat.append(now)
+        self.sent.append((chat_id, text, now))
+        return {"message_id": len(self.sent), "chat": {"id": chat_id}, "text": text}
+
+
+# --- сценарий ---
+
+
+def scenario(args, rnd: random.Random) -> List[Tuple[float, int, int, str]]:
+    """
+    -> [(момент отправки от старта, lane, chat_id, text)]: рассылка в начале,
+    ответы пользователям равномерно по ходу.
+    """
+    events = [(0.0, BULK, rnd.randrange(args.chats), f"alert {i}") for i in range(args.bulk)]
+    events += [
+        (rnd.uniform(0, args.duration), INTERACTIVE, rnd.randrange(args.chats), f"reply {i}")
+        for i in range(args.interactive)
+    ]
+    return sorted(events, key=lambda e: e[0])
+
+
+async def run(args, events, scheduler: Optional[OutboundScheduler]) -> None:
+    api = FakeTelegram(
+        global_rate=30 * args.scale,
+        chat_rate=args.scale,
+        latency=args.latency,
+        retry_after=1 / args.scale,
+    )
+    latencies: Dict[int, List[float]] = defaultdict(list)
+    failed = 0
+
+    async def deliver(at: float, lane: int, chat_id: int, text: str) -> None:
+        nonlocal failed
+        await asyncio.sleep(max(0.0, started + at - time.monotonic()))
+        queued = time.monotonic()
+        try:
+            if scheduler is None:
+                await api.send_message(chat_id, text)
+            else:
+                await scheduler.send(chat_id, lambda: api.send_message(chat_id, text), lane)
+            latencies[lane].append(time.monotonic() - queued)
+        except Exception:
+            failed += 1
+
+    if scheduler is not None:
+        await scheduler.start()
+    started = time.monotonic()
+    await asyncio.gather(*(deliver(*event) for event in events))
+    elapsed = time.monotonic() - started
+    if scheduler is not None:
+        await scheduler.stop()
+
+    name = "direct" if scheduler is None else "scheduler"
+    print(f"{name}: sent {len(api.sent)}, failed {failed}, 429 {api.flood_errors}, {elapsed:.1f} s")
+    for lane, label in ((INTERACTIVE, "interactive"), (BULK, "bulk")):
+        values = sorted(latencies[lane])
+        if values:
+            p50 = values[len(values) // 2] * 1000
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))] * 1000
+            print(f"  {label:>11}: {len(values)} delivered, p50 {p50:.0f} ms, p95 {p95:.0f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--bulk", type=int, default=1500)
+    parser.add_argument("--interactive", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=5.0, help="за сколько секунд приходят ответы")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--scale", type=float, default=10.0)
+    args = parser.parse_args()
+
+    events = scenario(args, random.Random(1))
+    asyncio.run(run(args, events, None))
+    scheduler = OutboundScheduler(
+        global_rate=25 * args.scale,
+        global_burst=25,
+        chat_rate=args.scale,
+        chat_burst=1,
+        bulk_reserve=5,
+        max_in_flight=64,
+    )
+    asyncio.run(run(args, events, scheduler))
+    print(scheduler.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,11 @@ from aiogram.types import (
 )
 
 from . import config
+from .alerts import deliver_alerts_forever
 from .api_client import BackendClient
+from .outbound import BULK, INTERACTIVE, OutboundScheduler, log_stats_forever
+from .webhook import run_webhook
+from . import token_store
 from .token_store import get_token, set_token
 
 # ---------- Глобальные объекты ----------
@@ -25,10 +29,32 @@ from .token_store import get_token, set_token
 bot: Bot  # инициализируем в main()
 dp: Dispatcher = Dispatcher()  # <--- ВАЖНО: создаём dp сразу
 backend: Optional[BackendClient] = None  # создадим в main()
+# все исходящие в чаты — через планировщик с лимитами Telegram (см. outbound)
+outbound = OutboundScheduler(
+    global_rate=config.OUTBOUND_GLOBAL_RATE,
+    global_burst=config.OUTBOUND_GLOBAL_RATE,
+    chat_rate=config.OUTBOUND_CHAT_RATE,
+    bulk_reserve=config.OUTBOUND_BULK_RESERVE,
+    max_in_flight=config.OUTBOUND_MAX_IN_FLIGHT,
+)
 
 
 # ---------- Вспомогалки ----------
 
+# callback.answer() идёт напрямую: это ответ на нажатие, а не сообщение в чат
+
+async def send_text(chat_id: int, text: str, lane: int = INTERACTIVE, **kwargs) -> Message:
+    return await outbound.send(chat_id, lambda: bot.send_message(chat_id, text, **kwargs), lane)
+
+
+async def reply(message: Message, text: str, **kwargs) -> Message:
+    return await outbound.send(message.chat.id, lambda: message.answer(text, **kwargs))
+
+
+async def edit_text(message: Message, text: str, **kwargs) -> Any:
+    return await outbound.send(message.chat.id, lambda: message.edit_text(text, **kwargs))
+
+
 def build_contact_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -80,11 +106,12 @@ def build_listing_keyboard(listing_id: int) -> InlineKeyboardMarkup:
 
 async def ensure_token_for_user(message: Message) -> Optional[str]:
     tg_id = message.from_user.id
-    token = get_token(tg_id)
+    token = await get_token(tg_id)
     if token:
         return token
 
-    await message.answer(
+    await reply(
+        message,
         "Сначала нужно зарегистрироваться. "
         "Нажми кнопку ниже и отправь свой номер телефона 👇",
         reply_markup=build_contact_keyboard(),
@@ -95,12 +122,12 @@ async def ensure_token_for_user(message: Message) -> Optional[str]:
 async def send_next_listing(chat_id: int, tg_user_id: int) -> None:
     global backend
     if backend is None:
-        await bot.send_message(chat_id, "Сервис временно недоступен.")
+        await send_text(chat_id, "Сервис временно недоступен.")
         return
 
-    token = get_token(tg_user_id)
+    token = await get_token(tg_user_id)
     if not token:
-        await bot.send_message(
+        await send_text(
             chat_id,
             "Токен не найден. Нажми /start и отправь номер ещё раз.",
         )
@@ -108,7 +135,7 @@ async def send_next_listing(chat_id: int, tg_user_id: int) -> None:
 
     listing = await backend.get_next_listing(token)
     if not listing:
-        await bot.send_message(
+        await send_text(
             chat_id,
             "Подходящих объявлений больше нет. Попробуй изменить фильтры на сайте.",
         )
@@ -116,7 +143,20 @@ async def send_next_listing(chat_id: int, tg_user_id: int) -> None:
 
     text = listing_to_text(listing)
     kb = build_listing_keyboard(listing["id"])
-    await bot.send_message(chat_id, text, reply_markup=kb)
+    await send_text(chat_id, text, reply_markup=kb)
+
+
+async def send_alert(alert: Dict[str, Any]) -> None:
+    """
+    Новое объявление под фильтры пользователя (см. alerts).
+    """
+    listing = alert["listing"]
+    await send_text(
+        int(alert["telegram_id"]),
+        "🔔 <b>Новое объявление по твоим фильтрам</b>\n\n" + listing_to_text(listing),
+        lane=BULK,
+        reply_markup=build_listing_keyboard(listing["id"]),
+    )
 
 
 # ---------- Handlers ----------
@@ -124,7 +164,8 @@ async def send_next_listing(chat_id: int, tg_user_id: int) -> None:
 @dp.message(CommandStart())
 async def cmd_start(message: Message) -> None:
     tg_user = message.from_user
-    await message.answer(
+    await reply(
+        message,
         f"Привет, {tg_user.first_name or 'друг'}! 👋\n\n"
         "Я помогу подобрать жильё.\n"
         "Для начала отправь свой номер телефона, чтобы мы тебя идентифицировали.",
@@ -136,7 +177,7 @@ async def cmd_start(message: Message) -> None:
 async def contact_received(message: Message) -> None:
     global backend
     if backend is None:
-        await message.answer("Сервис временно недоступен, попробуй чуть позже.")
+        await reply(message, "Сервис временно недоступен, попробуй чуть позже.")
         return
 
     if not message.contact:
@@ -154,7 +195,8 @@ async def contact_received(message: Message) -> None:
             name=name,
         )
     except Exception as e:
-        await message.answer(
+        await reply(
+            message,
             "Не удалось зарегистрировать/авторизовать тебя 😔\n"
             "Попробуй позже или свяжись с поддержкой.",
             reply_markup=ReplyKeyboardRemove(),
@@ -162,9 +204,10 @@ async def contact_received(message: Message) -> None:
         print("auth error:", e)
         return
 
-    set_token(tg_id, token)
+    await set_token(tg_id, token)
 
-    await message.answer(
+    await reply(
+        message,
         "Готово! ✅\n\n"
         "Теперь можешь искать жильё командой /search.\n"
         "Также доступны:\n"
@@ -186,7 +229,7 @@ async def cmd_search(message: Message) -> None:
 async def cmd_favorites(message: Message) -> None:
     global backend
     if backend is None:
-        await message.answer("Сервис временно недоступен.")
+        await reply(message, "Сервис временно недоступен.")
         return
 
     token = await ensure_token_for_user(message)
@@ -194,19 +237,20 @@ async def cmd_favorites(message: Message) -> None:
         return
 
     try:
-        favorites = await backend.get_favorites(token)
+        favorites = await backend.get_favorites(token, limit=5)
     except Exception as e:
-        await message.answer("Не удалось получить избранное 😔")
+        await reply(message, "Не удалось получить избранное 😔")
         print("favorites error:", e)
         return
 
     if not favorites:
-        await message.answer("У тебя пока нет избранных объявлений ⭐")
+        await reply(message, "У тебя пока нет избранных объявлений ⭐")
         return
 
     text_parts = [listing_to_text(listing) for listing in favorites[:5]]
 
-    await message.answer(
+    await reply(
+        message,
         "⭐ <b>Твои избранные объекты:</b>\n\n" + "\n".join(text_parts)
     )
 
@@ -215,7 +259,7 @@ async def cmd_favorites(message: Message) -> None:
 async def cmd_leads(message: Message) -> None:
     global backend
     if backend is None:
-        await message.answer("Сервис временно недоступен.")
+        await reply(message, "Сервис временно недоступен.")
         return
 
     token = await ensure_token_for_user(message)
@@ -225,15 +269,15 @@ async def cmd_leads(message: Message) -> None:
     try:
         leads = await backend.get_my_leads(token)
     except Exception as e:
-        await message.answer("Не удалось получить список твоих откликов 😔")
+        await reply(message, "Не удалось получить список твоих откликов 😔")
         print("leads error:", e)
         return
 
     if not leads:
-        await message.answer("Пока нет ни одного отклика (лайка) 👍")
+        await reply(message, "Пока нет ни одного отклика (лайка) 👍")
         return
 
-    await message.answer(f"У тебя {len(leads)} откликов на объявления.")
+    await reply(message, f"У тебя {len(leads)} откликов на объявления.")
 
 
 @dp.callback_query(F.data.startswith(("like:", "dislike:", "favorite:")))
@@ -244,7 +288,7 @@ async def on_feed_action(callback: CallbackQuery) -> None:
         return
 
     tg_id = callback.from_user.id
-    token = get_token(tg_id)
+    token = await get_token(tg_id)
     if not token:
         await callback.answer("Нужно заново авторизоваться через /start", show_alert=True)
         return
@@ -257,7 +301,7 @@ async def on_feed_action(callback: CallbackQuery) -> None:
         return
 
     try:
-        await backend.send_feed_action(
+        next_listing = await backend.send_feed_action_and_get_next(
             token=token,
             listing_id=listing_id,
             action=action,
@@ -268,10 +312,9 @@ async def on_feed_action(callback: CallbackQuery) -> None:
         await callback.answer("Ошибка при сохранении действия", show_alert=True)
         return
 
-    next_listing = await backend.get_next_listing(token)
-
     if not next_listing:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "Больше нет подходящих объявлений. "
             "Попробуй позже или измени фильтры на сайте.",
         )
@@ -281,7 +324,7 @@ async def on_feed_action(callback: CallbackQuery) -> None:
     new_text = listing_to_text(next_listing)
     new_kb = build_listing_keyboard(next_listing["id"])
 
-    await callback.message.edit_text(new_text, reply_markup=new_kb)
+    await edit_text(callback.message, new_text, reply_markup=new_kb)
     await callback.answer("Действие сохранено")
 
 
@@ -295,11 +338,57 @@ async def main() -> None:
     default=DefaultBotProperties(parse_mode="HTML"),
 )
 
-    backend = BackendClient(config.BACKEND_BASE_URL)
+    backend = BackendClient(config.BACKEND_BASE_URL, internal_token=config.INTERNAL_API_TOKEN)
+    token_store.configure(config.TOKEN_STORE_URL)
+    refresher = asyncio.create_task(
+        token_store.refresh_tokens_forever(
+            backend,
+            margin=config.TOKEN_REFRESH_MARGIN_SECONDS,
+            interval=config.TOKEN_REFRESH_INTERVAL_SECONDS,
+        )
+    )
+
+    await outbound.start()
+    stats = asyncio.create_task(log_stats_forever(outbound, config.OUTBOUND_STATS_INTERVAL_SECONDS))
+
+    alerts = None
+    if config.INTERNAL_API_TOKEN:
+        alerts = asyncio.create_task(
+            deliver_alerts_forever(
+                backend,
+                send_alert,
+                batch_size=config.ALERTS_BATCH_SIZE,
+                interval=config.ALERTS_POLL_INTERVAL_SECONDS,
+            )
+        )
 
     try:
-        await dp.start_polling(bot)
+        if config.BOT_MODE == "webhook":
+            await run_webhook(
+                bot,
+                dp,
+                url=config.WEBHOOK_URL,
+                path=config.WEBHOOK_PATH,
+                secret=config.WEBHOOK_SECRET,
+                host=config.WEBHOOK_HOST,
+                port=config.WEBHOOK_PORT,
+                max_concurrency=config.WEBHOOK_MAX_CONCURRENCY,
+                drain_timeout=config.WEBHOOK_DRAIN_TIMEOUT_SECONDS,
+                redis_url=config.WEBHOOK_REDIS_URL,
+                extra_stats=outbound.stats,
+            )
+        else:
+            # после webhook-режима getUpdates не работает, пока webhook не снят
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
     finally:
+        refresher.cancel()
+        if alerts is not None:
+            alerts.cancel()
+        # дожидаемся отправки уже поставленных сообщений
+        await outbound.stop()
+        stats.cancel()
+        await token_store.store.close()
         await backend.close()
 
 
@@ -0,0 +1,302 @@
+"""
+Исходящие сообщения бота через один планировщик с лимитами Telegram.
+
+Telegram ограничивает бота примерно 30 сообщениями в секунду на всех и
+одним в секунду на чат; сверх лимита отвечает 429 с retry_after, и если
+слать напрямую из хендлеров, рассылка оповещений тормозит и ответы
+пользователям. OutboundScheduler:
+
+- глобальное и початовые token bucket'ы: сообщение уходит, только когда
+  есть жетон и там и там;
+- полосы приоритета: INTERACTIVE (ответы на действия пользователя) всегда
+  раньше BULK (оповещения); BULK не берёт последние bulk_reserve жетонов
+  глобального ведра — они остаются интерактиву;
+- чат, упёршийся в свой лимит, не задерживает сообщения других чатов;
+  внутри чата порядок сохраняется (одно сообщение чата в полёте);
+- 429: все отправки на паузе до retry_after, сообщение возвращается в
+  начало своей полосы (до max_retries раз);
+- stats(): глубина полос, в полёте, отправлено/повторов/ошибок, задержка
+  от постановки до отправки (p50/p95/max по последним сообщениям).
+
+send(chat_id, call, lane) ставит вызов Bot API в очередь и ждёт его
+результата; без start() вызывает сразу.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+INTERACTIVE = 0
+BULK = 1
+LANE_NAMES = ("interactive", "bulk")
+
+# сколько сообщений полосы просматривать в поиске готового чата
+SCAN_LIMIT = 1000
+# початовые ведра, полные и без сообщений, чистим сверх этого числа
+MAX_IDLE_BUCKETS = 10_000
+LATENCY_WINDOW = 1000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _fill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float, reserve: float = 0.0) -> float:
+        """
+        Через сколько секунд будет жетон сверх reserve (0 — уже есть).
+        """
+        self._fill(now)
+        missing = 1.0 + reserve - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, now: float) -> None:
+        self._fill(now)
+        self.tokens -= 1.0
+
+    def full(self, now: float) -> bool:
+        self._fill(now)
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class Outgoing:
+    chat_id: int
+    call: Callable[[], Awaitable[Any]]
+    lane: int
+    future: asyncio.Future
+    enqueued_at: float
+    attempts: int = 0
+
+
+@dataclass
+class LaneStats:
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    sent: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        values = sorted(self.latencies)
+        if not values:
+            return {"sent": self.sent, "p50_ms": None, "p95_ms": None, "max_ms": None}
+
+        def pct(q: float) -> float:
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+
+        return {"sent": self.sent, "p50_ms": pct(0.5), "p95_ms": pct(0.95), "max_ms": round(values[-1] * 1000, 1)}
+
+
+class OutboundScheduler:
+    def __init__(
+        self,
+        global_rate: float = 25.0,
+        global_burst: float = 25.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 1.0,
+        bulk_reserve: float = 5.0,
+        max_in_flight: int = 16,
+        max_retries: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.bulk_reserve = bulk_reserve
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self._clock = clock
+
+        self._lanes: List[Deque[Outgoing]] = [deque() for _ in LANE_NAMES]
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        self._chats: Dict[int, TokenBucket] = {}
+        self._busy: Set[int] = set()  # чаты с сообщением в полёте
+        self._paused_until = 0.0
+        self._in_flight = 0
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+        self.lane_stats = [LaneStats() for _ in LANE_NAMES]
+        self.retried = 0
+        self.failed = 0
+        self.flood_waits = 0
+
+    # --- API ---
+
+    async def send(self, chat_id: int, call: Callable[[], Awaitable[Any]], lane: int = INTERACTIVE) -> Any:
+        """
+        Ставит call (вызов Bot API в этот чат) в очередь и ждёт его результата.
+        """
+        if self._task is None:
+            return await call()
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[lane].append(Outgoing(chat_id, call, lane, future, self._clock()))
+        self._wakeup.set()
+        return await future
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Дожидается (ограниченно) отправки очереди, остальное отменяет.
+        """
+        if self._task is None:
+            return
+        deadline = self._clock() + timeout
+        while (self.depth() or self._in_flight) and self._clock() < deadline:
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(self._task, *self._running, return_exceptions=True)
+        self._task = None
+        for lane in self._lanes:
+            while lane:
+                item = lane.popleft()
+                if not item.future.done():
+                    item.future.cancel()
+
+    def depth(self) -> int:
+        return sum(len(lane) for lane in self._lanes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": {name: len(lane) for name, lane in zip(LANE_NAMES, self._lanes)},
+            "in_flight": self._in_flight,
+            "retried": self.retried,
+            "failed": self.failed,
+            "flood_waits": self.flood_waits,
+            "paused_for_s": round(max(0.0, self._paused_until - self._clock()), 1),
+            "lanes": {name: s.as_dict() for name, s in zip(LANE_NAMES, self.lane_stats)},
+        }
+
+    # --- планирование ---
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_IDLE_BUCKETS:
+                self._prune(now)
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        waiting = {item.chat_id for lane in self._lanes for item in lane} | self._busy
+        for chat_id in [c for c, b in self._chats.items() if c not in waiting and b.full(now)]:
+            del self._chats[chat_id]
+
+    def _pick(self, now: float):
+        """
+        -> (сообщение к отправке или None, сколько ждать до следующей попытки).
+        """
+        if now < self._paused_until:
+            return None, self._paused_until - now
+        wait = math.inf
+        for lane_no, lane in enumerate(self._lanes):
+            if not lane:
+                continue
+            reserve = self.bulk_reserve if lane_no == BULK else 0.0
+            global_wait = self._global.delay(now, reserve)
+            if global_wait > 0:
+                wait = min(wait, global_wait)
+                continue
+            blocked: Set[int] = set()
+            for i, item in enumerate(lane):
+                if i >= SCAN_LIMIT:
+                    break
+                chat_id = item.chat_id
+                if chat_id in blocked or chat_id in self._busy:
+                    blocked.add(chat_id)
+                    continue
+                chat_wait = self._chat_bucket(chat_id, now).delay(now)
+                if chat_wait <= 0:
+                    del lane[i]
+                    return item, 0.0
+                wait = min(wait, chat_wait)
+                blocked.add(chat_id)
+        return None, wait
+
+    async def _dispatch(self) -> None:
+        while True:
+            # сбрасываем до выбора: send() после этой строки разбудит ожидание ниже
+            self._wakeup.clear()
+            wait = math.inf
+            if self._in_flight < self.max_in_flight:
+                now = self._clock()
+                item, wait = self._pick(now)
+                if item is not None:
+                    if item.future.cancelled():
+                        continue  # отправитель уже не ждёт
+                    self._global.take(now)
+                    self._chats[item.chat_id].take(now)
+                    self._busy.add(item.chat_id)
+                    self._in_flight += 1
+                    task = asyncio.create_task(self._run(item))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+                    continue
+            # таймер вместо asyncio.wait_for: в 3.11 wait_for теряет cancel(),
+            # пришедший одновременно с set(), и stop() зависает
+            timer = None
+            if not math.isinf(wait):
+                timer = asyncio.get_running_loop().call_later(wait, self._wakeup.set)
+            try:
+                await self._wakeup.wait()
+            finally:
+                if timer is not None:
+                    timer.cancel()
+
+    async def _run(self, item: Outgoing) -> None:
+        try:
+            result = await item.call()
+        except asyncio.CancelledError:
+            item.future.cancel()
+            raise
+        except Exception as e:
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after is not None:
+                self.flood_waits += 1
+                self._paused_until = max(self._paused_until, self._clock() + float(retry_after))
+            if retry_after is not None and item.attempts < self.max_retries:
+                item.attempts += 1
+                self.retried += 1
+                self._lanes[item.lane].appendleft(item)
+            else:
+                self.failed += 1
+                if not item.future.done():
+                    item.future.set_exception(e)
+        else:
+            stats = self.lane_stats[item.lane]
+            stats.sent += 1
+            stats.latencies.append(self._clock() - item.enqueued_at)
+            if not item.future.done():
+                item.future.set_result(result)
+        finally:
+            self._busy.discard(item.chat_id)
+            self._in_flight -= 1
+            self._wakeup.set()
+
+
+async def log_stats_forever(scheduler: OutboundScheduler, interval: float) -> None:
+    """
+    Фоновая задача: раз в interval печатает stats(), если было что отправлять.
+    """
+    if interval <= 0:
+        return
+    last = None
+    while True:
+        await asyncio.sleep(interval)
+        stats = scheduler.stats()
+        if stats != last:
+            print("outbound:", stats)
+        last = stats
@@ -1,11 +1,296 @@
-from typing import Dict, Optional
+"""
+Хранилище JWT пользователей бота: telegram_id -> (token, exp).
 
-_tokens: Dict[int, str] = {}
+Бэкенды:
+- memory://               — словарь в процессе (как раньше, для разработки);
+- sqlite:///path/to.db    — файл, токены переживают рестарт бота;
+- redis://host:6379/0     — общее хранилище для нескольких реплик бота.
 
+Токены продлеваются заранее (refresh_tokens_forever), поэтому хендлеры
+никогда не ждут повторной авторизации. В общем хранилище (sqlite, redis)
+продлевает одна реплика — та, что держит аренду (acquire_refresh_lease);
+если она упала, аренду через lease_ttl забирает другая.
+"""
+import abc
+import asyncio
+import base64
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
 
-def set_token(telegram_id: int, token: str) -> None:
-    _tokens[telegram_id] = token
 
+def token_exp(token: str) -> float:
+    """
+    exp из payload JWT (подпись не проверяем — это делает бэкенд).
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, ValueError):
+        return 0.0
 
-def get_token(telegram_id: int) -> Optional[str]:
-    return _tokens.get(telegram_id)
+
+class TokenStore(abc.ABC):
+    @abc.abstractmethod
+    async def get(self, telegram_id: int) -> Optional[Tuple[str, float]]:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, telegram_id: int, token: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, telegram_id: int) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def expiring_before(self, ts: float) -> List[Tuple[int, str]]:
+        """
+        Токены, у которых exp раньше ts (кандидаты на продление).
+        """
+
+    @abc.abstractmethod
+    async def acquire_refresh_lease(self, owner: str, ttl: float) -> bool:
+        """
+        Берёт или продлевает на ttl секунд аренду продления токенов.
+        False — аренда у другой реплики, продлевать не нужно.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryTokenStore(TokenStore):
+    def __init__(self) -> None:
+        self._tokens: Dict[int, Tuple[str, float]] = {}
+
+    async def get(self, telegram_id: int) -> Optional[Tuple[str, float]]:
+        return self._tokens.get(telegram_id)
+
+    async def set(self, telegram_id: int, token: str) -> None:
+        self._tokens[telegram_id] = (token, token_exp(token))
+
+    async def delete(self, telegram_id: int) -> None:
+        self._tokens.pop(telegram_id, None)
+
+    async def expiring_before(self, ts: float) -> List[Tuple[int, str]]:
+        return [
+            (telegram_id, token)
+            for telegram_id, (token, exp) in self._tokens.items()
+            if exp < ts
+        ]
+
+    async def acquire_refresh_lease(self, owner: str, ttl: float) -> bool:
+        return True  # хранилище одного процесса
+
+
+class SqliteTokenStore(TokenStore):
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = asyncio.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            " telegram_id INTEGER PRIMARY KEY,"
+            " token TEXT NOT NULL,"
+            " exp REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_tokens_exp ON tokens (exp)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " name TEXT PRIMARY KEY,"
+            " owner TEXT NOT NULL,"
+            " expires REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    async def _run(self, sql: str, params: tuple = (), commit: bool = False) -> list:
+        return await self._execute(sql, params, commit, lambda cursor: cursor.fetchall())
+
+    async def _execute(self, sql: str, params: tuple, commit: bool, result):
+        def run():
+            value = result(self._conn.execute(sql, params))
+            if commit:
+                self._conn.commit()
+            return value
+
+        async with self._lock:
+            return await asyncio.to_thread(run)
+
+    async def get(self, telegram_id: int) -> Optional[Tuple[str, float]]:
+        rows = await self._run(
+            "SELECT token, exp FROM tokens WHERE telegram_id = ?", (telegram_id,)
+        )
+        return (rows[0][0], rows[0][1]) if rows else None
+
+    async def set(self, telegram_id: int, token: str) -> None:
+        await self._run(
+            "INSERT INTO tokens (telegram_id, token, exp) VALUES (?, ?, ?) "
+            "ON CONFLICT (telegram_id) DO UPDATE SET token = excluded.token, exp = excluded.exp",
+            (telegram_id, token, token_exp(token)),
+            commit=True,
+        )
+
+    async def delete(self, telegram_id: int) -> None:
+        await self._run("DELETE FROM tokens WHERE telegram_id = ?", (telegram_id,), commit=True)
+
+    async def expiring_before(self, ts: float) -> List[Tuple[int, str]]:
+        rows = await self._run("SELECT telegram_id, token FROM tokens WHERE exp < ?", (ts,))
+        return [(row[0], row[1]) for row in rows]
+
+    async def acquire_refresh_lease(self, owner: str, ttl: float) -> bool:
+        now = time.time()
+        # один оператор: чужая живая аренда не обновляется (rowcount 0)
+        changed = await self._execute(
+            "INSERT INTO leases (name, owner, expires) VALUES ('refresh', ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE leases.owner = excluded.owner OR leases.expires < ?",
+            (owner, now + ttl, now),
+            True,
+            lambda cursor: cursor.rowcount,
+        )
+        return changed == 1
+
+    async def close(self) -> None:
+        self._conn.close()
+
+
+class RedisTokenStore(TokenStore):
+    """
+    Hash с токенами + sorted set по exp для выборки «скоро истекают».
+    """
+
+    TOKENS_KEY = "tg:tokens"
+    EXP_KEY = "tg:tokens:exp"
+    LEASE_KEY = "tg:tokens:refresh_lease"
+
+    def __init__(self, url: str = "", client=None) -> None:
+        if client is None:
+            import redis.asyncio as redis  # опциональная зависимость
+
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self._redis = client
+
+    async def get(self, telegram_id: int) -> Optional[Tuple[str, float]]:
+        token = await self._redis.hget(self.TOKENS_KEY, str(telegram_id))
+        if token is None:
+            return None
+        return token, token_exp(token)
+
+    async def set(self, telegram_id: int, token: str) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.TOKENS_KEY, str(telegram_id), token)
+            pipe.zadd(self.EXP_KEY, {str(telegram_id): token_exp(token)})
+            await pipe.execute()
+
+    async def delete(self, telegram_id: int) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hdel(self.TOKENS_KEY, str(telegram_id))
+            pipe.zrem(self.EXP_KEY, str(telegram_id))
+            await pipe.execute()
+
+    async def expiring_before(self, ts: float) -> List[Tuple[int, str]]:
+        ids = await self._redis.zrangebyscore(self.EXP_KEY, "-inf", ts)
+        if not ids:
+            return []
+        tokens = await self._redis.hmget(self.TOKENS_KEY, ids)
+        return [
+            (int(telegram_id), token)
+            for telegram_id, token in zip(ids, tokens)
+            if token is not None
+        ]
+
+    async def acquire_refresh_lease(self, owner: str, ttl: float) -> bool:
+        from redis.exceptions import WatchError
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(self.LEASE_KEY)
+                holder = await pipe.get(self.LEASE_KEY)
+                if holder is not None and holder != owner:
+                    return False
+                pipe.multi()
+                pipe.set(self.LEASE_KEY, owner, px=int(ttl * 1000))
+                await pipe.execute()
+            except WatchError:
+                return False  # аренду только что взяла другая реплика
+        return True
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_token_store(url: str) -> TokenStore:
+    if url.startswith("memory://"):
+        return MemoryTokenStore()
+    if url.startswith("sqlite:///"):
+        return SqliteTokenStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisTokenStore(url)
+    raise ValueError(f"Unsupported TOKEN_STORE_URL: {url}")
+
+
+store: TokenStore = MemoryTokenStore()  # заменяется в main() через configure()
+
+
+def configure(url: str) -> None:
+    global store
+    store = create_token_store(url)
+
+
+async def set_token(telegram_id: int, token: str) -> None:
+    await store.set(telegram_id, token)
+
+
+async def get_token(telegram_id: int) -> Optional[str]:
+    item = await store.get(telegram_id)
+    if item is None:
+        return None
+    token, exp = item
+    if exp and exp <= time.time():
+        return None  # протух и не успел продлиться — нужен новый логин
+    return token
+
+
+def replica_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def refresh_tokens_forever(
+    backend, margin: float, interval: float, owner: Optional[str] = None
+) -> None:
+    """
+    Фоновая задача: продлевает токены, которым до exp осталось меньше margin.
+    Работает в каждой реплике, но продлевает только держатель аренды.
+    """
+    owner = owner or replica_id()
+    lease_ttl = interval * 3
+    while True:
+        try:
+            if not await store.acquire_refresh_lease(owner, lease_ttl):
+                await asyncio.sleep(interval)
+                continue
+            expiring = await store.expiring_before(time.time() + margin)
+            for telegram_id, token in expiring:
+                # длинный проход продлевает аренду; потеряли — дальше продлит другая реплика
+                if not await store.acquire_refresh_lease(owner, lease_ttl):
+                    break
+                if token_exp(token) <= time.time():
+                    # уже протух — продлевать нечем, пользователь залогинится заново
+                    await store.delete(telegram_id)
+                    continue
+                try:
+                    new_token = await backend.refresh_token(token)
+                except Exception as e:
+                    print("token refresh error:", telegram_id, e)
+                    if getattr(getattr(e, "response", None), "status_code", None) == 401:
+                        await store.delete(telegram_id)
+                    continue
+                await store.set(telegram_id, new_token)
+        except Exception as e:
+            print("token refresh loop error:", e)
+        await asyncio.sleep(interval)
@@ -0,0 +1,373 @@
+"""
+Режим webhook (BOT_MODE=webhook): Telegram сам присылает обновления
+POST-запросами через nginx, без long polling.
+
+- запрос проверяется по X-Telegram-Bot-Api-Secret-Token (WEBHOOK_SECRET)
+  и подтверждается сразу, обработка идёт в фоне;
+- обновления одного пользователя обрабатываются строго по возрастанию
+  update_id (два быстрых нажатия не обгонят друг друга), разных
+  пользователей — параллельно, не больше max_concurrency одновременно;
+- повторная доставка того же update_id (Telegram не дождался ответа)
+  отбрасывается;
+- SIGTERM/SIGINT: новые обновления получают 503 (Telegram доставит их
+  позже), принятые дообрабатываются до drain_timeout; не успевшие
+  отменяются, их update_id пишутся в лог.
+
+Очередь пользователя и отсев повторов — в Sequencer:
+- LocalSequencer: в памяти процесса, только для одной реплики бота;
+- RedisSequencer (WEBHOOK_REDIS_URL): общий для реплик, которым nginx
+  раздаёт обновления по кругу.
+"""
+import abc
+import asyncio
+import hmac
+import heapq
+import signal
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# сколько последних update_id помнить для отсева повторов (LocalSequencer)
+SEEN_UPDATES = 10_000
+
+Job = Callable[[], Awaitable[Any]]
+
+
+def update_key(update: Update) -> int:
+    """
+    Ключ порядка: пользователь (иначе чат) события; у событий без них —
+    свой update_id, то есть без ограничений.
+    """
+    try:
+        event = update.event
+    except Exception:  # тип обновления, неизвестный этой версии aiogram
+        return -update.update_id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, "chat", None)
+    if chat is not None:
+        return chat.id
+    return -update.update_id
+
+
+# --- очередь пользователя ---
+
+
+class Sequencer(abc.ABC):
+    """
+    enter() — при приёме (до ответа Telegram): False, если update_id уже был;
+    иначе обновление встаёт в очередь ключа. wait_turn() ждёт, пока оно
+    станет первым (наименьший update_id), leave() — после обработки.
+    """
+
+    @abc.abstractmethod
+    async def enter(self, key: int, update_id: int) -> bool:
+        ...
+
+    @abc.abstractmethod
+    async def wait_turn(self, key: int, update_id: int) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def leave(self, key: int, update_id: int) -> None:
+        ...
+
+    @asynccontextmanager
+    async def hold(self, update_id: int) -> AsyncIterator[None]:
+        yield
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalSequencer(Sequencer):
+    def __init__(self) -> None:
+        self._queues: Dict[int, List[int]] = {}  # key -> куча update_id
+        self._turns: Dict[int, asyncio.Condition] = {}
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+
+    async def enter(self, key: int, update_id: int) -> bool:
+        if update_id in self._seen:
+            return False
+        self._seen[update_id] = None
+        if len(self._seen) > SEEN_UPDATES:
+            self._seen.popitem(last=False)
+        heapq.heappush(self._queues.setdefault(key, []), update_id)
+        return True
+
+    async def wait_turn(self, key: int, update_id: int) -> None:
+        turn = self._turns.setdefault(key, asyncio.Condition())
+        async with turn:
+            await turn.wait_for(lambda: self._queues[key][0] == update_id)
+
+    async def leave(self, key: int, update_id: int) -> None:
+        queue = self._queues[key]
+        queue.remove(update_id)
+        heapq.heapify(queue)
+        turn = self._turns.get(key)
+        if not queue:
+            del self._queues[key]
+            self._turns.pop(key, None)
+        if turn is not None:
+            async with turn:
+                turn.notify_all()
+
+
+class RedisSequencer(Sequencer):
+    """
+    Очередь ключа — sorted set по update_id, обрабатывается только голова.
+    Запись жива, пока у неё есть ключ ALIVE (TTL alive_ttl), который
+    принявшая реплика продлевает; голову без него (реплика упала)
+    ожидающие снимают сами. Повторы — SET NX на update_id.
+    """
+
+    SEEN_KEY = "tg:webhook:seen:{}"
+    QUEUE_KEY = "tg:webhook:queue:{}"
+    ALIVE_KEY = "tg:webhook:alive:{}"
+
+    def __init__(
+        self,
+        url: str = "",
+        client=None,
+        alive_ttl: float = 30.0,
+        poll_interval: float = 0.02,
+        seen_ttl: int = 24 * 3600,
+    ) -> None:
+        if client is None:
+            import redis.asyncio as redis  # опциональная зависимость
+
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self._redis = client
+        self.alive_ttl = alive_ttl
+        self.poll_interval = poll_interval
+        self.seen_ttl = seen_ttl
+
+    async def enter(self, key: int, update_id: int) -> bool:
+        seen_key = self.SEEN_KEY.format(update_id)
+        if not await self._redis.set(seen_key, 1, nx=True, ex=self.seen_ttl):
+            return False
+        queue_key = self.QUEUE_KEY.format(key)
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.set(self.ALIVE_KEY.format(update_id), 1, px=int(self.alive_ttl * 1000))
+                pipe.zadd(queue_key, {str(update_id): update_id})
+                pipe.expire(queue_key, self.seen_ttl)
+                await pipe.execute()
+        except Exception:
+            # не встали в очередь — повторная доставка не должна считаться дублем
+            await self._redis.delete(seen_key)
+            raise
+        return True
+
+    async def wait_turn(self, key: int, update_id: int) -> None:
+        queue_key = self.QUEUE_KEY.format(key)
+        while True:
+            head = await self._redis.zrange(queue_key, 0, 0)
+            if not head or int(head[0]) == update_id:
+                return
+            if not await self._redis.exists(self.ALIVE_KEY.format(head[0])):
+                await self._redis.zrem(queue_key, head[0])
+                continue
+            await asyncio.sleep(self.poll_interval)
+
+    async def leave(self, key: int, update_id: int) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.QUEUE_KEY.format(key), str(update_id))
+            pipe.delete(self.ALIVE_KEY.format(update_id))
+            await pipe.execute()
+
+    @asynccontextmanager
+    async def hold(self, update_id: int) -> AsyncIterator[None]:
+        async def keep_alive() -> None:
+            while True:
+                await asyncio.sleep(self.alive_ttl / 3)
+                await self._redis.pexpire(self.ALIVE_KEY.format(update_id), int(self.alive_ttl * 1000))
+
+        task = asyncio.create_task(keep_alive())
+        try:
+            yield
+        finally:
+            task.cancel()
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_sequencer(redis_url: str) -> Sequencer:
+    return RedisSequencer(redis_url) if redis_url else LocalSequencer()
+
+
+# --- обработка ---
+
+
+class UpdateRunner:
+    def __init__(self, sequencer: Sequencer, max_concurrency: int) -> None:
+        self.sequencer = sequencer
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Dict[asyncio.Task, int] = {}  # задача -> update_id
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+
+    def submit(self, key: int, update_id: int, job: Job) -> None:
+        task = asyncio.create_task(self._run(key, update_id, job))
+        self._tasks[task] = update_id
+        task.add_done_callback(self._tasks.pop)
+
+    async def _run(self, key: int, update_id: int, job: Job) -> None:
+        try:
+            async with self.sequencer.hold(update_id):
+                await self.sequencer.wait_turn(key, update_id)
+                # слот берётся после очереди: ждущие своей очереди его не занимают
+                async with self._semaphore:
+                    self.running += 1
+                    try:
+                        await job()
+                        self.processed += 1
+                    except Exception as e:
+                        self.failed += 1
+                        print("update error:", update_id, e)
+                    finally:
+                        self.running -= 1
+        finally:
+            await self.sequencer.leave(key, update_id)
+
+    async def drain(self, timeout: float) -> List[int]:
+        """
+        Ждёт обработки принятого до timeout, остальное отменяет.
+        -> update_id отменённых (уже подтверждённых Telegram, то есть потерянных).
+        """
+        if not self._tasks:
+            return []
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        dropped = sorted(self._tasks[task] for task in pending)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._tasks),
+            "running": self.running,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+
+class WebhookReceiver:
+    def __init__(
+        self,
+        bot: Bot,
+        dp: Dispatcher,
+        secret: str,
+        sequencer: Sequencer,
+        max_concurrency: int,
+        extra_stats: Optional[Callable[[], Dict[str, Any]]] = None,
+    ) -> None:
+        self.bot = bot
+        self.dp = dp
+        self.secret = secret
+        self.runner = UpdateRunner(sequencer, max_concurrency)
+        self.extra_stats = extra_stats
+        self.stopping = False
+        self.duplicates = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        received = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(received, self.secret):
+            return web.Response(status=401)
+        if self.stopping:
+            return web.Response(status=503)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except ValueError as e:
+            print("webhook: bad update:", e)
+            return web.Response(status=400)
+        key = update_key(update)
+        # место в очереди — до ответа: следующее обновление пользователя,
+        # принятое другой репликой, встанет за этим
+        if not await self.runner.sequencer.enter(key, update.update_id):
+            self.duplicates += 1
+            return web.Response()
+        self.runner.submit(key, update.update_id, lambda: self.dp.feed_update(self.bot, update))
+        return web.Response()
+
+    async def health(self, request: web.Request) -> web.Response:
+        stats = {
+            "stopping": self.stopping,
+            "sequencer": type(self.runner.sequencer).__name__,
+            "duplicates": self.duplicates,
+            **self.runner.stats(),
+        }
+        if self.extra_stats is not None:
+            stats["outbound"] = self.extra_stats()
+        return web.json_response(stats, status=503 if self.stopping else 200)
+
+
+async def run_webhook(
+    bot: Bot,
+    dp: Dispatcher,
+    *,
+    url: str,
+    path: str,
+    secret: str,
+    host: str,
+    port: int,
+    max_concurrency: int,
+    drain_timeout: float,
+    redis_url: str = "",
+    extra_stats: Optional[Callable[[], Dict[str, Any]]] = None,
+) -> None:
+    """
+    Поднимает HTTP-сервер обновлений и работает до SIGTERM/SIGINT.
+    url — публичный адрес nginx: если задан, регистрирует webhook в Telegram.
+    """
+    sequencer = create_sequencer(redis_url)
+    receiver = WebhookReceiver(bot, dp, secret, sequencer, max_concurrency, extra_stats)
+    app = web.Application()
+    app.router.add_post(path, receiver.handle)
+    app.router.add_get("/healthz", receiver.health)
+
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+
+    await dp.emit_startup(bot=bot)
+    if url:
+        await bot.set_webhook(
+            url.rstrip("/") + path,
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=min(100, max_concurrency),
+        )
+    print(f"webhook: listening on {host}:{port}{path} ({type(sequencer).__name__})")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(sig)
+        receiver.stopping = True
+        started = time.monotonic()
+        dropped = await receiver.runner.drain(drain_timeout)
+        if dropped:
+            print(
+                f"webhook: {len(dropped)} accepted updates not processed "
+                f"in {time.monotonic() - started:.0f} s, dropped: {dropped}"
+            )
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot)
+        await sequencer.close()
@@ -0,0 +1,143 @@
+import asyncio
+from collections import defaultdict
+
+import pytest
+
+from app.fake_telegram import FakeTelegram, FloodError
+from app.outbound import BULK, INTERACTIVE, OutboundScheduler, TokenBucket
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 30))
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2.0, capacity=3.0, now=0.0)
+    assert bucket.full(0.0)
+    for _ in range(3):
+        assert bucket.delay(0.0) == 0.0
+        bucket.take(0.0)
+    assert bucket.delay(0.0) == pytest.approx(0.5)
+    assert bucket.delay(0.25) == pytest.approx(0.25)
+    # reserve: жетон сверх последних reserve (к 0.5 с набралось 1.0)
+    assert bucket.delay(0.5, reserve=1.0) == pytest.approx(0.5)
+    assert bucket.delay(100.0) == 0.0
+    assert bucket.tokens == 3.0
+
+
+def test_send_without_start_calls_directly():
+    api = FakeTelegram(latency=0)
+
+    async def scenario():
+        scheduler = OutboundScheduler()
+        return await scheduler.send(7, lambda: api.send_message(7, "hi"))
+
+    assert run(scenario())["text"] == "hi"
+    assert [(c, t) for c, t, _ in api.sent] == [(7, "hi")]
+
+
+def test_per_chat_order_and_retry_after():
+    # планировщик шлёт быстрее, чем пускает FakeTelegram: будут 429
+    api = FakeTelegram(global_rate=200, chat_rate=20, latency=0.001, retry_after=0.05)
+    scheduler = OutboundScheduler(
+        global_rate=400, global_burst=50, chat_rate=50, chat_burst=5,
+        bulk_reserve=0, max_in_flight=32, max_retries=100,
+    )
+    chats, per_chat = 10, 30
+
+    async def scenario():
+        await scheduler.start()
+        try:
+            await asyncio.gather(*(
+                scheduler.send(chat, lambda chat=chat, i=i: api.send_message(chat, str(i)), BULK)
+                for i in range(per_chat)
+                for chat in range(chats)
+            ))
+        finally:
+            await scheduler.stop()
+
+    run(scenario())
+    received = defaultdict(list)
+    for chat, text, _ in api.sent:
+        received[chat].append(int(text))
+    assert received == {chat: list(range(per_chat)) for chat in range(chats)}
+    assert api.flood_errors > 0
+    assert scheduler.flood_waits == api.flood_errors
+    assert scheduler.retried == api.flood_errors
+    assert scheduler.failed == 0
+    assert scheduler.lane_stats[BULK].sent == chats * per_chat
+
+
+def test_interactive_goes_before_bulk():
+    api = FakeTelegram(global_rate=1000, chat_rate=1000, latency=0)
+    scheduler = OutboundScheduler(
+        global_rate=100, global_burst=1, chat_rate=1000, chat_burst=10, bulk_reserve=0,
+    )
+
+    async def scenario():
+        await scheduler.start()
+        try:
+            bulk = [
+                asyncio.create_task(scheduler.send(i, lambda i=i: api.send_message(i, "bulk"), BULK))
+                for i in range(30)
+            ]
+            await asyncio.sleep(0)
+            replies = [
+                scheduler.send(100 + i, lambda i=i: api.send_message(100 + i, "reply"), INTERACTIVE)
+                for i in range(5)
+            ]
+            await asyncio.gather(*replies, *bulk)
+        finally:
+            await scheduler.stop()
+
+    run(scenario())
+    texts = [text for _, text, _ in api.sent]
+    assert len(texts) == 35
+    assert max(i for i, text in enumerate(texts) if text == "reply") < 8
+
+
+def test_bulk_keeps_reserve_for_interactive():
+    api = FakeTelegram(global_rate=1000, chat_rate=1000, latency=0)
+    now = [0.0]
+    scheduler = OutboundScheduler(
+        global_rate=1, global_burst=5, chat_rate=1000, chat_burst=10,
+        bulk_reserve=2, clock=lambda: now[0],
+    )
+
+    async def scenario():
+        await scheduler.start()
+        try:
+            for i in range(5):
+                asyncio.create_task(scheduler.send(i, lambda i=i: api.send_message(i, "bulk"), BULK))
+            await asyncio.sleep(0.05)
+            assert len(api.sent) == 3  # два жетона остались интерактиву
+            await scheduler.send(99, lambda: api.send_message(99, "reply"), INTERACTIVE)
+            assert len(api.sent) == 4
+        finally:
+            await scheduler.stop(timeout=0)
+
+    run(scenario())
+
+
+def test_other_errors_reach_sender():
+    async def broken():
+        raise RuntimeError("chat not found")
+
+    async def flood():
+        raise FloodError(0.01)
+
+    scheduler = OutboundScheduler(chat_rate=100, max_retries=2)
+
+    async def scenario():
+        await scheduler.start()
+        try:
+            with pytest.raises(RuntimeError):
+                await scheduler.send(1, broken)
+            with pytest.raises(FloodError):
+                await scheduler.send(2, flood)
+        finally:
+            await scheduler.stop()
+
+    run(scenario())
+    assert scheduler.failed == 2
+    assert scheduler.retried == 2
@@ -0,0 +1,98 @@
+import asyncio
+import base64
+import json
+import time
+
+import pytest
+
+from app import token_store
+from app.token_store import MemoryTokenStore, RedisTokenStore, SqliteTokenStore
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 30))
+
+
+def make_token(exp: float) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+def sqlite_replicas(tmp_path):
+    path = str(tmp_path / "tokens.db")
+    return SqliteTokenStore(path), SqliteTokenStore(path)
+
+
+def redis_replicas(tmp_path):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    return tuple(
+        RedisTokenStore(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+        for _ in range(2)
+    )
+
+
+SHARED_STORES = [sqlite_replicas, redis_replicas]
+
+
+@pytest.mark.parametrize("make", SHARED_STORES)
+def test_refresh_lease_has_one_holder(make, tmp_path):
+    first, second = make(tmp_path)
+
+    async def scenario():
+        assert await first.acquire_refresh_lease("a", ttl=0.2)
+        assert not await second.acquire_refresh_lease("b", ttl=0.2)
+        assert await first.acquire_refresh_lease("a", ttl=0.2)  # продление своей
+        await asyncio.sleep(0.3)
+        # держатель пропал — аренду забирает другая реплика
+        assert await second.acquire_refresh_lease("b", ttl=0.2)
+        assert not await first.acquire_refresh_lease("a", ttl=0.2)
+        await first.close()
+        await second.close()
+
+    run(scenario())
+
+
+def test_memory_store_always_holds_lease():
+    store = MemoryTokenStore()
+    assert run(store.acquire_refresh_lease("a", ttl=1))
+    assert run(store.acquire_refresh_lease("b", ttl=1))
+
+
+class SlowBackend:
+    def __init__(self):
+        self.refreshed = []
+
+    async def refresh_token(self, token):
+        self.refreshed.append(token)
+        await asyncio.sleep(0.02)
+        return make_token(time.time() + 3600)
+
+
+@pytest.mark.parametrize("make", SHARED_STORES)
+def test_only_lease_holder_refreshes(make, tmp_path, monkeypatch):
+    replicas = make(tmp_path)
+    backend = SlowBackend()
+
+    async def scenario():
+        for telegram_id in range(5):
+            await replicas[0].set(telegram_id, make_token(time.time() + 60))
+
+        # аренда различает реплики по owner, хранилище у задач общее
+        monkeypatch.setattr(token_store, "store", replicas[0])
+        tasks = [
+            asyncio.create_task(
+                token_store.refresh_tokens_forever(backend, margin=600, interval=0.01, owner=owner)
+            )
+            for owner in ("a", "b")
+        ]
+        await asyncio.sleep(0.5)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert await replicas[1].expiring_before(time.time() + 600) == []
+        for store in replicas:
+            await store.close()
+
+    run(scenario())
+    assert len(backend.refreshed) == 5
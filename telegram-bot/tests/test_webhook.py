@@ -0,0 +1,126 @@
+import asyncio
+import random
+from collections import defaultdict
+
+import pytest
+
+from app.webhook import LocalSequencer, RedisSequencer, UpdateRunner
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 30))
+
+
+def local_sequencer():
+    return LocalSequencer()
+
+
+def redis_sequencer():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisSequencer(client=fakeredis.FakeAsyncRedis(decode_responses=True), poll_interval=0.001)
+
+
+SEQUENCERS = [local_sequencer, redis_sequencer]
+
+
+@pytest.mark.parametrize("make", SEQUENCERS)
+def test_updates_of_one_key_run_in_order(make):
+    sequencer = make()
+    rnd = random.Random(1)
+    done = defaultdict(list)
+    active = set()
+    overlap = []
+
+    async def scenario():
+        runner = UpdateRunner(sequencer, max_concurrency=8)
+
+        async def handle(key, update_id):
+            overlap.append(key in active)
+            active.add(key)
+            await asyncio.sleep(rnd.random() / 1000)
+            active.discard(key)
+            done[key].append(update_id)
+
+        for update_id in range(1, 201):
+            key = update_id % 5
+            assert await sequencer.enter(key, update_id)
+            runner.submit(key, update_id, lambda k=key, u=update_id: handle(k, u))
+        assert await runner.drain(timeout=20) == []
+        assert runner.stats()["processed"] == 200
+
+    run(scenario())
+    assert not any(overlap)
+    assert {k: v for k, v in done.items()} == {
+        key: [u for u in range(1, 201) if u % 5 == key] for key in range(5)
+    }
+
+
+@pytest.mark.parametrize("make", SEQUENCERS)
+def test_duplicate_update_is_rejected(make):
+    sequencer = make()
+
+    async def scenario():
+        assert await sequencer.enter(1, 10)
+        assert not await sequencer.enter(1, 10)
+        assert not await sequencer.enter(2, 10)
+        await sequencer.leave(1, 10)
+        assert not await sequencer.enter(1, 10)
+
+    run(scenario())
+
+
+@pytest.mark.parametrize("make", SEQUENCERS)
+def test_late_lower_update_goes_first(make):
+    # 7 принят раньше, но 5 пришёл до начала обработки 7 — 5 первым
+    sequencer = make()
+    order = []
+
+    async def scenario():
+        runner = UpdateRunner(sequencer, max_concurrency=4)
+        await sequencer.enter(1, 7)
+        await sequencer.enter(1, 5)
+
+        async def handle(update_id):
+            order.append(update_id)
+
+        runner.submit(1, 7, lambda: handle(7))
+        runner.submit(1, 5, lambda: handle(5))
+        assert await runner.drain(timeout=5) == []
+
+    run(scenario())
+    assert order == [5, 7]
+
+
+def test_drain_returns_dropped_updates():
+    sequencer = LocalSequencer()
+
+    async def scenario():
+        runner = UpdateRunner(sequencer, max_concurrency=4)
+        for update_id in (1, 2, 3):
+            await sequencer.enter(1, update_id)
+        await sequencer.enter(2, 4)
+        runner.submit(1, 1, lambda: asyncio.sleep(10))
+        runner.submit(1, 2, lambda: asyncio.sleep(0))
+        runner.submit(1, 3, lambda: asyncio.sleep(0))
+        runner.submit(2, 4, lambda: asyncio.sleep(0))
+        return runner, await runner.drain(timeout=0.1)
+
+    runner, dropped = run(scenario())
+    assert dropped == [1, 2, 3]
+    assert runner.stats() == {"pending": 0, "running": 0, "processed": 1, "failed": 0}
+
+
+def test_redis_stale_head_is_skipped():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    # «упавшая» реплика приняла 1 и не продлевает его
+    crashed = RedisSequencer(client=client, alive_ttl=0.05, poll_interval=0.001)
+    alive = RedisSequencer(client=client, alive_ttl=5, poll_interval=0.001)
+
+    async def scenario():
+        await crashed.enter(1, 1)
+        await alive.enter(1, 2)
+        await alive.wait_turn(1, 2)
+        assert await client.zrange(RedisSequencer.QUEUE_KEY.format(1), 0, -1) == ["2"]
+
+    run(scenario())